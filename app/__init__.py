@@ -0,0 +1,4 @@
+import time
+
+# When this process started importing the app, for app.metrics.report_startup
+IMPORT_STARTED = time.perf_counter()
@@ -0,0 +1,178 @@
+"""Archival of old finished tasks.
+
+A Celery beat task moves tasks submitted more than ``ARCHIVE_AFTER_DAYS`` ago
+and no longer pending or running out of the ``tasks`` table, in batches of
+``ARCHIVE_BATCH_SIZE``. Each batch becomes one gzip JSON Lines file under
+``ARCHIVE_DIR`` (``YYYY/MM/tasks-<timestamp>-<suffix>.jsonl.gz``), written in
+blocks of ``_BLOCK_ROWS`` rows that are separate gzip members. The file is
+complete on disk before the rows are deleted, and the ``archived_tasks`` index
+rows go in with the same commit as the delete, so a crash leaves at worst an
+unreferenced file.
+
+``archived_tasks`` maps each id to its file and block, so :func:`lookup`
+decompresses one block rather than the whole file. The API falls back to it
+when an id is not in ``tasks``.
+"""
+import asyncio
+import base64
+import gzip
+import json
+import logging
+import os
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import undefer
+
+from .celery_app import celery
+from .compression import stored_qasm
+from .config import settings
+from .db import ArchivedTask, AsyncSessionLocal, SessionLocal, Task, TaskStatus
+from .metrics import ARCHIVED_TASKS
+from .stats import record_removed
+
+logger = logging.getLogger("archive")
+
+_BLOCK_ROWS = 64
+# Bounds one run; a backlog is worked off over several runs
+_MAX_BATCHES_PER_RUN = 50
+_FINISHED = (TaskStatus.COMPLETED, TaskStatus.ERROR, TaskStatus.CANCELLED)
+# Everything but qc_qpy, which is derived from qc_qasm3 (written as text, whichever column held it)
+_COLUMNS = (
+	"id", "status", "submitted_at", "updated_at", "qc_qasm3", "result_json", "result_blob", "error_msg",
+	"circuit_hash", "batch_id", "batch_index", "sim_method", "sim_cost", "cost_estimate", "queue",
+	"timings_json", "shots", "seed", "parameter_binds", "observables",
+)
+_DATETIMES = ("submitted_at", "updated_at")
+
+
+def serialize(task: Task) -> Dict[str, Any]:
+	row = {column: getattr(task, column) for column in _COLUMNS}
+	row["qc_qasm3"] = stored_qasm(getattr(task, "qc_qasm3_zst", None), task.qc_qasm3)
+	for column in _DATETIMES:
+		row[column] = row[column].isoformat() if row[column] else None
+	if row["result_blob"] is not None:
+		row["result_blob"] = base64.b64encode(row["result_blob"]).decode("ascii")
+	return row
+
+
+def deserialize(row: Dict[str, Any]) -> Dict[str, Any]:
+	row = dict(row)
+	for column in _DATETIMES:
+		row[column] = datetime.fromisoformat(row[column]) if row[column] else None
+	if row["result_blob"] is not None:
+		row["result_blob"] = base64.b64decode(row["result_blob"])
+	return row
+
+
+def write_archive(directory: str, rows: Sequence[Dict[str, Any]]) -> Tuple[str, List[Tuple[str, int, int]]]:
+	"""Write serialized ``rows`` to a new archive file.
+
+	Returns the file's path relative to ``directory`` and ``(id, offset,
+	length)`` of the block holding each row.
+	"""
+	now = datetime.utcnow()
+	relative = os.path.join(f"{now:%Y}", f"{now:%m}", f"tasks-{now:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.jsonl.gz")
+	path = os.path.join(directory, relative)
+	os.makedirs(os.path.dirname(path), exist_ok=True)
+	entries = []
+	tmp = path + ".tmp"
+	with open(tmp, "wb") as fh:
+		for start in range(0, len(rows), _BLOCK_ROWS):
+			block = rows[start:start + _BLOCK_ROWS]
+			data = gzip.compress("".join(json.dumps(row, separators=(",", ":")) + "\n" for row in block).encode())
+			offset = fh.tell()
+			fh.write(data)
+			entries.extend((row["id"], offset, len(data)) for row in block)
+		fh.flush()
+		os.fsync(fh.fileno())
+	os.replace(tmp, path)
+	return relative, entries
+
+
+def read_archived(directory: str, relative: str, offset: int, length: int, task_id: str) -> Optional[Dict[str, Any]]:
+	with open(os.path.join(directory, relative), "rb") as fh:
+		fh.seek(offset)
+		data = gzip.decompress(fh.read(length))
+	for line in data.splitlines():
+		row = json.loads(line)
+		if row["id"] == task_id:
+			return deserialize(row)
+	return None
+
+
+def archive_batch(session, cutoff: datetime, limit: int, directory: str) -> int:
+	"""Archive up to ``limit`` finished tasks submitted before ``cutoff``; returns how many."""
+	tasks = session.scalars(
+		select(Task)
+		.options(undefer(Task.result_blob), undefer(Task.qc_qasm3_zst), undefer(Task.parameter_binds), undefer(Task.observables))
+		.where(Task.submitted_at < cutoff, Task.status.in_(_FINISHED))
+		.order_by(Task.submitted_at, Task.id)
+		.limit(limit)
+		# Concurrent archivers take disjoint batches
+		.with_for_update(skip_locked=True)
+	).all()
+	if not tasks:
+		session.rollback()
+		return 0
+	relative, entries = write_archive(directory, [serialize(task) for task in tasks])
+	session.execute(insert(ArchivedTask), [
+		{"id": task_id, "archive_file": relative, "block_offset": offset, "block_length": length}
+		for task_id, offset, length in entries
+	])
+	removed = Counter(task.status for task in tasks)
+	session.execute(delete(Task).where(Task.id.in_([task.id for task in tasks])))
+	session.commit()
+	ARCHIVED_TASKS.inc(len(tasks))
+	record_removed(removed)
+	logger.info("tasks_archived", extra={"count": len(tasks), "file": relative})
+	return len(tasks)
+
+
+@celery.task
+def archive_tasks() -> Dict[str, Any]:
+	if settings.archive_after_days <= 0:
+		return {"archived": 0}
+	cutoff = datetime.utcnow() - timedelta(days=settings.archive_after_days)
+	started = time.perf_counter()
+	archived = 0
+	session = SessionLocal()
+	try:
+		for _ in range(_MAX_BATCHES_PER_RUN):
+			count = archive_batch(session, cutoff, settings.archive_batch_size, settings.archive_dir)
+			archived += count
+			if count < settings.archive_batch_size:
+				break
+	finally:
+		session.close()
+	logger.info("archive_run_finished", extra={"archived": archived, "seconds": time.perf_counter() - started})
+	return {"archived": archived}
+
+
+async def lookup(task_id: str) -> Optional[Dict[str, Any]]:
+	"""The archived row of ``task_id`` (``Task`` column names), or None."""
+	async with AsyncSessionLocal() as session:
+		entry = await session.get(ArchivedTask, task_id)
+	if entry is None:
+		return None
+	try:
+		return await asyncio.to_thread(
+			read_archived, settings.archive_dir, entry.archive_file, entry.block_offset, entry.block_length, task_id,
+		)
+	except OSError:
+		logger.exception("archive_read_failed", extra={"task_id": task_id, "file": entry.archive_file})
+		return None
+
+
+def main() -> None:
+	"""One archiving pass, e.g. from cron: ``python -m app.archive``."""
+	logging.basicConfig(level=settings.log_level)
+	print(json.dumps(archive_tasks()))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,182 @@
+"""Content-addressed result cache and in-flight deduplication.
+
+Identical submissions (same canonical circuit, shots and seed) map to one
+``Task`` row. Redis holds two kinds of pointers to task ids:
+
+- ``qcache:inflight:<key>``: the task currently executing for ``key``.
+  Concurrent submissions attach to it instead of starting a new simulation;
+  ``qcache:attached:<task id>`` counts them, so that cancelling a shared task
+  only withdraws one submission (see :func:`detach_submission`).
+- ``qcache:result:<key>``: a completed task whose result can be served as is.
+  Entries expire after ``result_cache_ttl_s`` and the ``qcache:lru`` sorted set
+  bounds their number to ``result_cache_max_entries`` (least recently used
+  entries are evicted first).
+
+Redis is an accelerator only: every helper degrades to a cache miss / no-op
+when Redis is unavailable, so submissions never fail because of the cache.
+"""
+import hashlib
+import logging
+import re
+import time
+from typing import Optional
+
+from redis.exceptions import RedisError
+
+from .config import settings
+from .redis_client import get_async_redis, get_redis
+
+logger = logging.getLogger("cache")
+
+_RESULT_PREFIX = "qcache:result:"
+_INFLIGHT_PREFIX = "qcache:inflight:"
+_ATTACHED_PREFIX = "qcache:attached:"
+_LRU_KEY = "qcache:lru"
+
+_COMMENT_RE = re.compile(r"//[^\n]*|/\*.*?\*/", re.DOTALL)
+_WS_RE = re.compile(r"\s+")
+_PUNCT_WS_RE = re.compile(r"\s*([;,(){}\[\]=])\s*")
+
+
+def canonical_qasm(qasm: str) -> str:
+	"""Strip comments and insignificant whitespace so cosmetic edits hash equally."""
+	text = _COMMENT_RE.sub("", qasm)
+	text = _WS_RE.sub(" ", text)
+	text = _PUNCT_WS_RE.sub(r"\1", text)
+	return text.strip()
+
+
+def circuit_hash(qasm: str) -> str:
+	return hashlib.sha256(canonical_qasm(qasm).encode("utf-8")).hexdigest()
+
+
+def result_key(circ_hash: str, shots: int, seed: Optional[int] = None) -> str:
+	raw = f"{circ_hash}|shots={shots}|seed={'' if seed is None else seed}"
+	return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _decode(value) -> Optional[str]:
+	if value is None:
+		return None
+	return value.decode() if isinstance(value, bytes) else str(value)
+
+
+async def lookup_result(key: str) -> Optional[str]:
+	"""Return the id of a completed task for ``key`` and refresh its LRU position."""
+	if not settings.result_cache_enabled:
+		return None
+	try:
+		r = get_async_redis()
+		task_id = _decode(await r.get(_RESULT_PREFIX + key))
+		if task_id is not None:
+			await r.zadd(_LRU_KEY, {key: time.time()})
+		return task_id
+	except RedisError:
+		logger.warning("result_cache_unavailable", exc_info=True)
+		return None
+
+
+def store_result(key: str, task_id: str) -> None:
+	"""Record ``task_id`` as the cached result for ``key`` and apply size/TTL eviction."""
+	if not settings.result_cache_enabled:
+		return
+	try:
+		r = get_redis()
+		now = time.time()
+		pipe = r.pipeline()
+		pipe.set(_RESULT_PREFIX + key, task_id, ex=settings.result_cache_ttl_s)
+		pipe.zadd(_LRU_KEY, {key: now})
+		# Entries whose TTL already lapsed only need their index slot cleared
+		pipe.zremrangebyscore(_LRU_KEY, "-inf", now - settings.result_cache_ttl_s)
+		pipe.zcard(_LRU_KEY)
+		size = pipe.execute()[-1]
+
+		overflow = size - settings.result_cache_max_entries
+		if overflow > 0:
+			evicted = [_decode(k) for k, _ in r.zpopmin(_LRU_KEY, overflow)]
+			if evicted:
+				r.delete(*(_RESULT_PREFIX + k for k in evicted))
+				logger.info("result_cache_evicted", extra={"count": len(evicted)})
+	except RedisError:
+		logger.warning("result_cache_unavailable", exc_info=True)
+
+
+async def claim_inflight(key: str, task_id: str) -> Optional[str]:
+	"""Try to register ``task_id`` as the execution for ``key``.
+
+	Returns ``None`` when the claim succeeded (the caller must execute the task),
+	or the id of the task that is already in flight for the same key.
+	"""
+	if not settings.result_cache_enabled:
+		return None
+	try:
+		r = get_async_redis()
+		if await r.set(_INFLIGHT_PREFIX + key, task_id, nx=True, ex=settings.inflight_ttl_s):
+			return None
+		existing = _decode(await r.get(_INFLIGHT_PREFIX + key))
+		# The marker may have been released between SET and GET; run it ourselves
+		if existing is None or existing == task_id:
+			return None
+		pipe = r.pipeline(transaction=False)
+		pipe.incr(_ATTACHED_PREFIX + existing)
+		pipe.expire(_ATTACHED_PREFIX + existing, settings.inflight_ttl_s)
+		await pipe.execute()
+		return existing
+	except RedisError:
+		logger.warning("result_cache_unavailable", exc_info=True)
+		return None
+
+
+def release_inflight(key: str, task_id: str) -> None:
+	if not settings.result_cache_enabled:
+		return
+	name = _INFLIGHT_PREFIX + key
+
+	def _compare_and_delete(pipe) -> None:
+		# Only drop the marker if it still points at this task
+		if _decode(pipe.get(name)) == task_id:
+			pipe.multi()
+			pipe.delete(name)
+
+	try:
+		get_redis().transaction(_compare_and_delete, name)
+	except RedisError:
+		logger.warning("result_cache_unavailable", exc_info=True)
+
+
+async def release_inflight_async(key: str, task_id: str) -> None:
+	"""API-side variant of :func:`release_inflight` (submission rolled back)."""
+	if not settings.result_cache_enabled:
+		return
+	name = _INFLIGHT_PREFIX + key
+
+	async def _compare_and_delete(pipe) -> None:
+		if _decode(await pipe.get(name)) == task_id:
+			pipe.multi()
+			pipe.delete(name)
+
+	try:
+		await get_async_redis().transaction(_compare_and_delete, name)
+	except RedisError:
+		logger.warning("result_cache_unavailable", exc_info=True)
+
+
+async def detach_submission(task_id: str) -> Optional[int]:
+	"""Withdraw one of the submissions attached to ``task_id``.
+
+	Returns how many attached submissions remain, or ``None`` when none was
+	attached: the task then belongs to the caller alone and may be cancelled.
+	"""
+	if not settings.result_cache_enabled:
+		return None
+	name = _ATTACHED_PREFIX + task_id
+	try:
+		r = get_async_redis()
+		remaining = await r.decr(name)
+		if remaining < 0:
+			await r.delete(name)
+			return None
+		return remaining
+	except RedisError:
+		logger.warning("result_cache_unavailable", exc_info=True)
+		return None
@@ -1,20 +1,185 @@
+import logging
+import math
+import multiprocessing
+import os
+import time
+from typing import Optional
+
 from celery import Celery
+from celery.signals import task_postrun, worker_init, worker_process_init, worker_process_shutdown
+from celery.utils.log import current_process_index
 
 from .config import settings
 
+logger = logging.getLogger("celery_app")
+
+
+def cpu_budget() -> int:
+	"""Cores this worker may use: ``WORKER_CPU_BUDGET``, else the CPUs it can run on.
+
+	The cgroup v2 CPU quota (``docker run --cpus``, ``cpus:`` in compose) caps
+	the default, since ``os.cpu_count()`` reports every core of the host.
+	"""
+	if settings.worker_cpu_budget > 0:
+		return settings.worker_cpu_budget
+	cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+	try:
+		with open("/sys/fs/cgroup/cpu.max") as f:
+			quota, period = f.read().split()
+		if quota != "max":
+			cpus = min(cpus, max(1, math.floor(int(quota) / int(period))))
+	except (OSError, ValueError):
+		pass
+	return cpus
+
+
 celery = Celery(
 	"quantum_tasks",
 	broker=settings.celery_broker_url,
 	backend=settings.celery_result_backend,
+	# Task modules are imported by workers only; the API publishes by name (app.dispatch)
+	include=["app.worker_tasks", "app.archive"],
 )
 
+# Tiered queues, each consumed by its own worker pool (see docker-compose.yml)
+QUEUE_INTERACTIVE = "interactive"
+QUEUE_BATCH = "batch"
+QUEUE_HEAVY = "heavy"
+
 celery.conf.update(
 	task_serializer="json",
 	result_serializer="json",
 	accept_content=["json"],
 	task_acks_late=True,
 	worker_prefetch_multiplier=1,
+	task_default_queue=QUEUE_INTERACTIVE,
+	# Without --concurrency, one single-threaded process per budgeted core
+	worker_concurrency=cpu_budget(),
+	beat_schedule={
+		# Run by the beat service in docker-compose.yml; a no-op when ARCHIVE_AFTER_DAYS is 0
+		"archive-old-tasks": {
+			"task": "app.archive.archive_tasks",
+			"schedule": settings.archive_interval_s,
+			"options": {"queue": QUEUE_BATCH},
+		},
+	},
 )
 
-# Import tasks to register
-from . import worker_tasks  # noqa: E402,F401
+
+def queue_for_cost(cost_estimate: float, memory_mb: float = 0.0) -> str:
+	# Only heavy workers get more than MAX_MEMORY_MB per task
+	if memory_mb > settings.max_memory_mb:
+		return QUEUE_HEAVY
+	if cost_estimate <= settings.queue_interactive_max_cost:
+		return QUEUE_INTERACTIVE
+	if cost_estimate <= settings.queue_batch_max_cost:
+		return QUEUE_BATCH
+	return QUEUE_HEAVY
+
+
+def time_limits(queue: str) -> dict:
+	"""``soft_time_limit``/``time_limit`` options for tasks published to ``queue``."""
+	soft, hard = {
+		QUEUE_INTERACTIVE: (settings.interactive_soft_time_limit_s, settings.interactive_time_limit_s),
+		QUEUE_BATCH: (settings.batch_soft_time_limit_s, settings.batch_time_limit_s),
+		QUEUE_HEAVY: (settings.heavy_soft_time_limit_s, settings.heavy_time_limit_s),
+	}[queue]
+	return {"soft_time_limit": soft, "time_limit": hard}
+
+
+@worker_process_init.connect
+def _warm_worker_process(**_kwargs) -> None:
+	# Build the per-process simulator up front so the first task doesn't pay for it
+	from . import IMPORT_STARTED, metrics
+	from .quantum import get_simulator
+
+	started = time.perf_counter()
+	get_simulator()
+	# Prefork children inherit IMPORT_STARTED, so "ready" includes the parent's boot
+	metrics.report_startup("worker", {
+		"warm": time.perf_counter() - started,
+		"ready": time.perf_counter() - IMPORT_STARTED,
+	})
+
+
+# Threads held by the simulation each prefork child is running, by pool index (a
+# child replacing a killed one reuses its index). Shared memory set up before the fork.
+_leases = None
+_lease_budget = 1
+_lease_index: Optional[int] = None
+
+
+def _lease_threads(wanted: int) -> int:
+	"""Up to ``wanted`` of the budget's threads the worker's other processes leave free, at least one.
+
+	Held until the task ends (see :func:`_release_threads`) or the process
+	leases again.
+	"""
+	with _leases.get_lock():
+		held = _leases.get_obj()
+		threads = max(1, min(wanted, _lease_budget - (sum(held) - held[_lease_index])))
+		held[_lease_index] = threads
+	return threads
+
+
+def _release_lease() -> None:
+	with _leases.get_lock():
+		_leases[_lease_index] = 0
+
+
+@worker_init.connect
+def _split_cpu_budget(sender=None, **_kwargs) -> None:
+	# Runs in the parent before the pool forks. Thread pools share one process, in
+	# which each task gets budget // concurrency threads; prefork children lease
+	# threads from the whole budget as they run (see _lease_cpu_budget).
+	global _leases, _lease_budget
+	from .quantum import set_thread_budget
+
+	budget = cpu_budget()
+	concurrency = getattr(sender, "concurrency", None) or 1
+	set_thread_budget(budget // concurrency)
+	_leases, _lease_budget = multiprocessing.Array("i", concurrency), budget
+	extra = {"cpu_budget": budget, "concurrency": concurrency, "threads_per_task": max(1, budget // concurrency)}
+	if concurrency > budget:
+		logger.warning("worker_oversubscribed", extra=extra)
+	else:
+		logger.info("worker_cpu_budget", extra=extra)
+
+
+@worker_process_init.connect
+def _lease_cpu_budget(**_kwargs) -> None:
+	global _lease_index
+	from .quantum import set_thread_budget, set_thread_lease
+
+	index = current_process_index(base=0)
+	if _leases is None or index is None or index >= len(_leases):
+		return
+	_lease_index = index
+	# Whatever a killed predecessor held is free again
+	_release_lease()
+	set_thread_budget(_lease_budget)
+	set_thread_lease(_lease_threads)
+
+
+@task_postrun.connect
+def _release_threads(**_kwargs) -> None:
+	if _lease_index is not None:
+		_release_lease()
+
+
+@worker_init.connect
+def _start_metrics_server(**_kwargs) -> None:
+	# Runs once in the parent, before the pool forks its children
+	from . import metrics
+
+	metrics.reset_multiprocess_dir()
+	if settings.worker_metrics_port:
+		metrics.serve(settings.worker_metrics_port)
+
+
+@worker_process_shutdown.connect
+def _mark_process_dead(pid=None, **_kwargs) -> None:
+	from .metrics import mark_process_dead
+
+	mark_process_dead(pid)
+
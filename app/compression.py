@@ -0,0 +1,141 @@
+"""Compressed request bodies and compressed QASM storage.
+
+:class:`DecompressionMiddleware` inflates ``Content-Encoding: gzip`` or ``zstd``
+request bodies chunk by chunk as they arrive, refusing (413) to produce more
+than ``MAX_DECOMPRESSED_BYTES``, so a small compressed bomb cannot exhaust
+memory, and rejecting (400) bodies that end mid-stream. Submitted QASM is stored zstd-compressed in ``Task.qc_qasm3_zst``;
+rows from before that keep plain text in ``Task.qc_qasm3``.
+"""
+import zlib
+from typing import List, Optional
+
+import zstandard
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+
+from .config import settings
+
+# Set in the ASGI scope of requests whose body was decompressed
+SCOPE_KEY = "quantum.content_encoding"
+
+_STORAGE_LEVEL = 3
+
+
+def compress_qasm(text: str) -> bytes:
+	return zstandard.ZstdCompressor(level=_STORAGE_LEVEL).compress(text.encode("utf-8"))
+
+
+def stored_qasm(compressed: Optional[bytes], text: Optional[str]) -> str:
+	"""The task's QASM text from whichever column holds it."""
+	if compressed is not None:
+		return zstandard.ZstdDecompressor().decompress(compressed).decode("utf-8")
+	return text or ""
+
+
+class _TooLarge(Exception):
+	pass
+
+
+class _GzipInflater:
+	def __init__(self, limit: int):
+		self._decoder = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+		self._remaining = limit
+
+	def feed(self, data: bytes) -> bytes:
+		out = self._decoder.decompress(data, self._remaining + 1)
+		# Output was capped with input left over, or the cap itself was reached
+		if self._decoder.unconsumed_tail or len(out) > self._remaining:
+			raise _TooLarge
+		self._remaining -= len(out)
+		return out
+
+	def finish(self) -> None:
+		if not self._decoder.eof:
+			raise zlib.error("truncated gzip stream")
+
+
+class _ZstdInflater:
+	# A 4-byte RLE block expands to 128 KiB, zstd's highest ratio. Input goes to the
+	# decoder in slices of remaining // _MAX_RATIO bytes, so no single call can produce
+	# much more than the limit.
+	_MAX_RATIO = 32768
+
+	def __init__(self, limit: int):
+		self._decompressor = zstandard.ZstdDecompressor()
+		self._decoder = self._decompressor.decompressobj()
+		self._remaining = limit
+
+	def feed(self, data: bytes) -> bytes:
+		parts: List[bytes] = []
+		view = memoryview(data)
+		while view:
+			size = max(64, self._remaining // self._MAX_RATIO)
+			piece, view = view[:size], view[size:]
+			while piece:
+				# Concatenated frames are one valid stream; each needs a fresh decoder
+				if self._decoder.eof:
+					self._decoder = self._decompressor.decompressobj()
+				out = self._decoder.decompress(piece)
+				if len(out) > self._remaining:
+					raise _TooLarge
+				self._remaining -= len(out)
+				parts.append(out)
+				piece = self._decoder.unused_data if self._decoder.eof else b""
+		return b"".join(parts)
+
+	def finish(self) -> None:
+		if not self._decoder.eof:
+			raise zstandard.ZstdError("truncated zstd frame")
+
+
+_INFLATERS = {"gzip": _GzipInflater, "x-gzip": _GzipInflater, "zstd": _ZstdInflater}
+
+
+class DecompressionMiddleware:
+	"""Pure ASGI middleware that decodes compressed request bodies while streaming."""
+
+	def __init__(self, app):
+		self.app = app
+
+	async def __call__(self, scope, receive, send) -> None:
+		if scope["type"] != "http":
+			await self.app(scope, receive, send)
+			return
+		encoding = None
+		for name, value in scope["headers"]:
+			if name == b"content-encoding":
+				encoding = value.decode("latin-1").strip().lower()
+		if encoding in (None, "", "identity"):
+			await self.app(scope, receive, send)
+			return
+		if encoding not in _INFLATERS:
+			response = JSONResponse(status_code=415, content={"detail": f"Unsupported Content-Encoding: {encoding}"})
+			await response(scope, receive, send)
+			return
+
+		inflater = _INFLATERS[encoding](settings.max_decompressed_bytes)
+		# In place rather than on a copy: outer middleware reads what the router adds to
+		# the scope (HTTPMetricsMiddleware labels requests with scope["route"])
+		scope["headers"] = [
+			(name, value) for name, value in scope["headers"] if name not in (b"content-encoding", b"content-length")
+		]
+		scope[SCOPE_KEY] = encoding
+
+		async def inflating_receive():
+			message = await receive()
+			if message["type"] != "http.request":
+				return message
+			try:
+				body = inflater.feed(message.get("body", b""))
+				if not message.get("more_body", False):
+					inflater.finish()
+			except _TooLarge:
+				raise HTTPException(
+					status_code=413,
+					detail=f"Decompressed body exceeds {settings.max_decompressed_bytes} bytes",
+				)
+			except (zlib.error, zstandard.ZstdError) as exc:
+				raise HTTPException(status_code=400, detail=f"Invalid {encoding} body: {exc}")
+			return {"type": "http.request", "body": body, "more_body": message.get("more_body", False)}
+
+		await self.app(scope, inflating_receive, send)
@@ -8,12 +8,97 @@ class Settings(BaseModel):
 	postgres_db: str = os.getenv("POSTGRES_DB", "quantum")
 	postgres_user: str = os.getenv("POSTGRES_USER", "quantum")
 	postgres_password: str = os.getenv("POSTGRES_PASSWORD", "quantum")
+	db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "10"))
+	db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+	db_pool_timeout: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+	db_pool_recycle: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
 
 	redis_url: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 	celery_broker_url: str = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
 	celery_result_backend: str = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
+	redis_socket_timeout: float = float(os.getenv("REDIS_SOCKET_TIMEOUT", "2.0"))
 
-	num_shots: int = int(os.getenv("NUM_SHOTS", "1024"))
+	# Result cache / in-flight deduplication of identical submissions
+	result_cache_enabled: bool = os.getenv("RESULT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+	result_cache_ttl_s: int = int(os.getenv("RESULT_CACHE_TTL_S", "86400"))
+	result_cache_max_entries: int = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "10000"))
+	inflight_ttl_s: int = int(os.getenv("INFLIGHT_TTL_S", "3600"))
+
+	num_shots: int = int(os.getenv("NUM_SHOTS", "1024"))  # default when a task sets no shots
+	max_shots: int = int(os.getenv("MAX_SHOTS", "10000000"))
+	# Tasks above SHOTS_PER_SHARD shots are split into parallel shard subtasks
+	shots_per_shard: int = int(os.getenv("SHOTS_PER_SHARD", "100000"))
+	max_shards: int = int(os.getenv("MAX_SHARDS", "32"))
+	# Routing by estimated cost (app.quantum.estimate_task_cost): interactive <= first
+	# threshold < batch <= second threshold < heavy
+	queue_interactive_max_cost: float = float(os.getenv("QUEUE_INTERACTIVE_MAX_COST", "1e6"))
+	queue_batch_max_cost: float = float(os.getenv("QUEUE_BATCH_MAX_COST", "1e8"))
+	# Per-tier Celery time limits: the soft limit fails the task, the hard one kills its process
+	interactive_soft_time_limit_s: float = float(os.getenv("INTERACTIVE_SOFT_TIME_LIMIT_S", "60"))
+	interactive_time_limit_s: float = float(os.getenv("INTERACTIVE_TIME_LIMIT_S", "90"))
+	batch_soft_time_limit_s: float = float(os.getenv("BATCH_SOFT_TIME_LIMIT_S", "600"))
+	batch_time_limit_s: float = float(os.getenv("BATCH_TIME_LIMIT_S", "660"))
+	heavy_soft_time_limit_s: float = float(os.getenv("HEAVY_SOFT_TIME_LIMIT_S", "3600"))
+	heavy_time_limit_s: float = float(os.getenv("HEAVY_TIME_LIMIT_S", "3660"))
+	# Simulator memory per task, in MB: MAX_MEMORY_MB on interactive and batch workers
+	# (also Aer's own max_memory_mb in each worker), HEAVY_MAX_MEMORY_MB on heavy ones.
+	# Circuits over the first are routed to heavy; over the second they are rejected.
+	max_memory_mb: int = int(os.getenv("MAX_MEMORY_MB", "4096"))
+	heavy_max_memory_mb: int = int(os.getenv("HEAVY_MAX_MEMORY_MB", "16384"))
+	# Cores a worker's pool processes share (0: the CPUs the worker can run on, capped
+	# by its cgroup CPU quota). See app.celery_app.cpu_budget
+	worker_cpu_budget: int = int(os.getenv("WORKER_CPU_BUDGET", "0"))
+	# Circuits with at least this many qubits get all of their process's threads for the
+	# state update; smaller ones run single-threaded (see app.quantum.aer_parallelism)
+	aer_parallel_min_qubits: int = int(os.getenv("AER_PARALLEL_MIN_QUBITS", "14"))
+	# Results with more distinct outcomes are stored compactly (see app/results.py)
+	result_inline_max_outcomes: int = int(os.getenv("RESULT_INLINE_MAX_OUTCOMES", "1024"))
+	# Workers and the micro-batcher serve Prometheus metrics on this port (0 disables)
+	worker_metrics_port: int = int(os.getenv("WORKER_METRICS_PORT", "9100"))
+	# Finished tasks submitted more than ARCHIVE_AFTER_DAYS ago are moved to gzip files under
+	# ARCHIVE_DIR by a periodic Celery beat task (see app/archive.py); 0 disables archiving
+	archive_after_days: float = float(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+	archive_dir: str = os.getenv("ARCHIVE_DIR", "archive")
+	archive_batch_size: int = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+	archive_interval_s: float = float(os.getenv("ARCHIVE_INTERVAL_S", "3600"))
+	max_qasm_chars: int = int(os.getenv("MAX_QASM_CHARS", "200000"))
+	# Bodies sent with Content-Encoding gzip/zstd, and raw uploads to POST /tasks/upload,
+	# are bounded by their decompressed size instead of MAX_QASM_CHARS
+	max_decompressed_bytes: int = int(os.getenv("MAX_DECOMPRESSED_BYTES", "16777216"))
+	batch_max_tasks: int = int(os.getenv("BATCH_MAX_TASKS", "1000"))
+	# Parameter bindings per sweep task (POST /tasks/sweep)
+	sweep_max_bindings: int = int(os.getenv("SWEEP_MAX_BINDINGS", "1000"))
+	# Pauli terms over all observables of an expectation task (POST /tasks/expectation)
+	expectation_max_terms: int = int(os.getenv("EXPECTATION_MAX_TERMS", "10000"))
+	transpile_cache_size: int = int(os.getenv("TRANSPILE_CACHE_SIZE", "256"))
+	# Largest circuit the statevector method may be chosen for (16 B * 2^n of memory)
+	statevector_max_qubits: int = int(os.getenv("STATEVECTOR_MAX_QUBITS", "28"))
+
+	# Server-Sent Events
+	events_heartbeat_s: float = float(os.getenv("EVENTS_HEARTBEAT_S", "15"))
+	events_max_ids: int = int(os.getenv("EVENTS_MAX_IDS", "100"))
+	long_poll_max_s: float = float(os.getenv("LONG_POLL_MAX_S", "60"))
+
+	# GET /admin/stats: minutes of per-minute rollups kept and reported (see app/stats.py)
+	stats_window_minutes: int = int(os.getenv("STATS_WINDOW_MINUTES", "60"))
+
+	# API process pool for QASM parsing at submit time and diagram rendering
+	cpu_pool_workers: int = int(os.getenv("CPU_POOL_WORKERS", "2"))
+	parse_timeout_s: float = float(os.getenv("PARSE_TIMEOUT_S", "10"))
+	# A batch is compiled in up to CPU_POOL_WORKERS pool jobs, each with this time limit
+	batch_parse_timeout_s: float = float(os.getenv("BATCH_PARSE_TIMEOUT_S", "120"))
+
+	# Circuit diagrams: cached in Redis by circuit hash
+	render_timeout_s: float = float(os.getenv("RENDER_TIMEOUT_S", "30"))
+	viz_cache_ttl_s: int = int(os.getenv("VIZ_CACHE_TTL_S", "604800"))
+	viz_max_qubits: int = int(os.getenv("VIZ_MAX_QUBITS", "32"))
+	viz_max_depth: int = int(os.getenv("VIZ_MAX_DEPTH", "400"))
+
+	# Opt-in micro-batching of small circuits (see app/microbatch.py)
+	microbatch_enabled: bool = os.getenv("MICROBATCH_ENABLED", "false").lower() in ("1", "true", "yes")
+	microbatch_max_qubits: int = int(os.getenv("MICROBATCH_MAX_QUBITS", "5"))
+	microbatch_max_size: int = int(os.getenv("MICROBATCH_MAX_SIZE", "64"))
+	microbatch_max_wait_ms: int = int(os.getenv("MICROBATCH_MAX_WAIT_MS", "20"))
 	log_level: str = os.getenv("LOG_LEVEL", "INFO")
 
 	# Admin
@@ -26,5 +111,12 @@ class Settings(BaseModel):
 			f"@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
 		)
 
+	@property
+	def sqlalchemy_async_url(self) -> str:
+		return (
+			f"postgresql+asyncpg://{self.postgres_user}:{self.postgres_password}"
+			f"@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
+		)
+
 
 settings = Settings()  # singleton-like
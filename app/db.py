@@ -1,7 +1,8 @@
 from datetime import datetime
-from typing import Optional
+from typing import Any, Optional
 
-from sqlalchemy import create_engine, Enum as SAEnum, Text, JSON, Index
+from sqlalchemy import create_engine, BigInteger, Enum as SAEnum, Float, String, Text, JSON, Index, LargeBinary
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, sessionmaker
 
 from .config import settings
@@ -16,6 +17,7 @@ class TaskStatus:
 	RUNNING = "running"
 	COMPLETED = "completed"
 	ERROR = "error"
+	CANCELLED = "cancelled"
 
 
 class Task(Base):
@@ -28,24 +30,129 @@ class Task(Base):
 			TaskStatus.RUNNING,
 			TaskStatus.COMPLETED,
 			TaskStatus.ERROR,
+			TaskStatus.CANCELLED,
 			name="task_status",
 		),
 		default=TaskStatus.PENDING,
 	)
 	submitted_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
 	updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, onupdate=datetime.utcnow)
-	qc_qasm3: Mapped[str] = mapped_column(Text)
-	result_json: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+	# Submitted QASM, zstd-compressed (see app.compression); older rows have the text in qc_qasm3
+	qc_qasm3: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+	qc_qasm3_zst: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True, deferred=True)
+	# Circuit parsed once at submission and serialized with QPY; NULL for older rows
+	qc_qpy: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True, deferred=True)
+	# Counts, or for sweeps a list of counts with one entry per parameter binding (see also observables)
+	result_json: Mapped[Optional[Any]] = mapped_column(JSON(none_as_null=True), nullable=True)
+	# Full counts in compact binary form when there are too many outcomes to keep
+	# inline; result_json then holds only the most frequent ones
+	result_blob: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True, deferred=True)
 	error_msg: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+	# sha256 of the canonical QASM text (see app.cache.circuit_hash)
+	circuit_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+	# Set for tasks submitted through POST /tasks/batch
+	batch_id: Mapped[Optional[str]] = mapped_column(String(36), nullable=True)
+	batch_index: Mapped[Optional[int]] = mapped_column(nullable=True)
+	# Aer method chosen at submission (see app.quantum.select_method) and its estimated cost
+	sim_method: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
+	sim_cost: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+	# Whole-task cost estimate (incl. shots) and the Celery queue it was routed to
+	cost_estimate: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+	queue: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
+	# Per-phase durations in seconds (queue_wait_s, parse_s, transpile_s, simulate_s,
+	# db_write_s, total_s), written by the worker that ran the task
+	timings_json: Mapped[Optional[dict]] = mapped_column(JSON(none_as_null=True), nullable=True)
+	# NULL shots means settings.num_shots (rows from before per-task shots)
+	shots: Mapped[Optional[int]] = mapped_column(nullable=True)
+	seed: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+	# Sweep tasks only: {parameter name: [value per binding]} for the parameterized circuit
+	parameter_binds: Mapped[Optional[dict]] = mapped_column(JSON(none_as_null=True), nullable=True, deferred=True)
+	# Expectation tasks only: Pauli-sum observables as [{label: coefficient}]; result_json
+	# then holds one expectation value per observable
+	observables: Mapped[Optional[list]] = mapped_column(JSON(none_as_null=True), nullable=True, deferred=True)
 
 	__table_args__ = (
 		Index("idx_tasks_status_submitted", "status", "submitted_at"),
+		Index("idx_tasks_submitted_id", "submitted_at", "id"),
+		Index("idx_tasks_circuit_hash", "circuit_hash"),
+		Index("idx_tasks_batch", "batch_id", "batch_index"),
 	)
 
 
-engine = create_engine(settings.sqlalchemy_url, pool_pre_ping=True)
+class ArchivedTask(Base):
+	"""Where a task moved out of ``tasks`` by ``app.archive`` is stored."""
+
+	__tablename__ = "archived_tasks"
+
+	id: Mapped[str] = mapped_column(primary_key=True)
+	# Path relative to ARCHIVE_DIR, and the byte range of the gzip block holding the row
+	archive_file: Mapped[str] = mapped_column(String(128))
+	block_offset: Mapped[int] = mapped_column(BigInteger)
+	block_length: Mapped[int] = mapped_column()
+	archived_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+
+
+_pool_kwargs = dict(
+	pool_pre_ping=True,
+	pool_size=settings.db_pool_size,
+	max_overflow=settings.db_max_overflow,
+	pool_timeout=settings.db_pool_timeout,
+	pool_recycle=settings.db_pool_recycle,
+)
+
+# Sync engine: Celery workers and maintenance scripts
+engine = create_engine(settings.sqlalchemy_url, **_pool_kwargs)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
+# Async engine: API request path
+async_engine = create_async_engine(settings.sqlalchemy_async_url, **_pool_kwargs)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
+def _create_schema(conn) -> None:
+	Base.metadata.create_all(bind=conn)
+	if conn.dialect.name == "postgresql":
+		# create_all only creates missing tables: columns and indexes added since the first
+		# schema are added to an existing tasks table here
+		# Result cache
+		conn.exec_driver_sql("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS circuit_hash VARCHAR(64)")
+		conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_tasks_circuit_hash ON tasks (circuit_hash)")
+		# Batch submissions
+		conn.exec_driver_sql("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS batch_id VARCHAR(36)")
+		conn.exec_driver_sql("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS batch_index INTEGER")
+		conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_tasks_batch ON tasks (batch_id, batch_index)")
+		# Keyset pagination of the admin listing
+		conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_tasks_submitted_id ON tasks (submitted_at, id)")
+		# Circuits parsed at submission
+		conn.exec_driver_sql("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS qc_qpy BYTEA")
+		# Simulation method selection
+		conn.exec_driver_sql("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS sim_method VARCHAR(32)")
+		conn.exec_driver_sql("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS sim_cost DOUBLE PRECISION")
+		# Per-task shots and seeds
+		conn.exec_driver_sql("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS shots INTEGER")
+		conn.exec_driver_sql("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS seed BIGINT")
+		# Compact results
+		conn.exec_driver_sql("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS result_blob BYTEA")
+		# Cost-tiered routing
+		conn.exec_driver_sql("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS cost_estimate DOUBLE PRECISION")
+		conn.exec_driver_sql("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS queue VARCHAR(16)")
+		# Per-phase timings
+		conn.exec_driver_sql("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS timings_json JSON")
+		# create_all leaves an existing enum type alone; databases from before cancellation lack the value
+		conn.exec_driver_sql(f"ALTER TYPE task_status ADD VALUE IF NOT EXISTS '{TaskStatus.CANCELLED}'")
+		# Tables from before compressed QASM storage: new rows leave the text column empty
+		conn.exec_driver_sql("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS qc_qasm3_zst BYTEA")
+		conn.exec_driver_sql("ALTER TABLE tasks ALTER COLUMN qc_qasm3 DROP NOT NULL")
+		# Tables from before parameter sweeps and expectation tasks
+		conn.exec_driver_sql("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS parameter_binds JSON")
+		conn.exec_driver_sql("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS observables JSON")
+
 
 def init_db() -> None:
-	Base.metadata.create_all(bind=engine)
+	with engine.begin() as conn:
+		_create_schema(conn)
+
+
+async def init_db_async() -> None:
+	async with async_engine.begin() as conn:
+		await conn.run_sync(_create_schema)
@@ -0,0 +1,53 @@
+"""Publishing tasks to the workers by name.
+
+The API builds Celery signatures from task names, so it never imports
+``app.worker_tasks`` and, through it, Qiskit and Aer. The workers load the
+task modules through the Celery app's ``include`` (see ``app.celery_app``).
+"""
+import math
+from typing import List, Optional, Tuple
+
+import numpy as np
+from celery.canvas import Signature
+
+from .celery_app import celery, time_limits
+from .config import settings
+
+EXECUTE_TASK = "app.worker_tasks.execute_quantum_task"
+TASK_FAILED = "app.worker_tasks.task_failed"
+
+
+def shard_plan(shots: int, seed: Optional[int]) -> List[Tuple[int, Optional[int]]]:
+	"""Split ``shots`` into ``(shots, seed)`` pairs, one per shard.
+
+	Shard seeds are derived from ``seed`` with NumPy's ``SeedSequence`` so
+	they are independent of each other yet reproducible for a given seed.
+	"""
+	count = 1
+	if shots > settings.shots_per_shard:
+		count = min(math.ceil(shots / settings.shots_per_shard), settings.max_shards)
+	base, extra = divmod(shots, count)
+	sizes = [base + (1 if i < extra else 0) for i in range(count)]
+	if seed is None:
+		return [(size, None) for size in sizes]
+	children = np.random.SeedSequence(seed).spawn(count)
+	return [(size, int(child.generate_state(1, dtype=np.uint32)[0])) for size, child in zip(sizes, children)]
+
+
+def shard_ids(task_id: str, count: int) -> List[str]:
+	"""Celery ids of a sharded task's shard subtasks, so they can be revoked by id."""
+	return [f"{task_id}:shard-{i}" for i in range(count)]
+
+
+def task_signature(task_id: str, queue: str) -> Signature:
+	"""The message that runs ``task_id`` on ``queue``.
+
+	The Celery id is the task id, so ``DELETE /tasks/{id}`` can revoke it. The
+	error callback records failures the task could not record itself: a hard
+	time limit or an out-of-memory kill ends its process.
+	"""
+	return (
+		celery.signature(EXECUTE_TASK, args=(task_id,), immutable=True)
+		.set(queue=queue, task_id=task_id, **time_limits(queue))
+		.on_error(celery.signature(TASK_FAILED, args=(task_id,)))
+	)
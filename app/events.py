@@ -0,0 +1,124 @@
+"""Task state-change notifications over Redis pub/sub.
+
+Workers call :func:`publish_task_event` on every status transition. Each API
+process runs one :class:`TaskEventHub`, a single pattern subscription that
+fans events out to the in-process listeners (SSE streams), so thousands of
+open streams cost one Redis connection rather than one each.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Optional, Set
+
+from redis.exceptions import RedisError
+
+from .redis_client import get_async_redis, get_redis
+
+logger = logging.getLogger("events")
+
+CHANNEL_PREFIX = "task-events:"
+
+TERMINAL_STATUSES = frozenset({"completed", "error", "cancelled"})
+
+
+def task_event(
+	task_id: str, status: str, result: Any = None, message: Optional[str] = None, truncated: bool = False,
+) -> Dict[str, Any]:
+	"""``truncated`` marks a ``result`` holding only the most frequent outcomes (see GET /tasks/{id}/result)."""
+	event: Dict[str, Any] = {"task_id": task_id, "status": status}
+	if result is not None:
+		event["result"] = result
+		event["truncated"] = truncated
+	if message is not None:
+		event["message"] = message
+	return event
+
+
+def publish_task_event(
+	task_id: str, status: str, result: Any = None, message: Optional[str] = None, truncated: bool = False,
+) -> None:
+	"""Best-effort publish; listeners fall back to periodic DB checks if it is lost."""
+	try:
+		get_redis().publish(CHANNEL_PREFIX + task_id, json.dumps(task_event(task_id, status, result, message, truncated)))
+	except RedisError:
+		logger.warning("task_event_publish_failed", extra={"task_id": task_id, "status": status}, exc_info=True)
+
+
+class TaskEventHub:
+	"""Process-local fan-out of task events to asyncio queues."""
+
+	def __init__(self) -> None:
+		self._listeners: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+		self._runner: Optional[asyncio.Task] = None
+		self._ready = asyncio.Event()
+
+	async def subscribe(self, task_ids: Iterable[str], ready_timeout: float = 2.0) -> asyncio.Queue:
+		"""Register a queue for ``task_ids``.
+
+		Waits (briefly) until the Redis subscription is live so that callers can
+		read the current state afterwards without missing a transition.
+		"""
+		if self._runner is None or self._runner.done():
+			self._ready = asyncio.Event()
+			self._runner = asyncio.get_running_loop().create_task(self._run())
+		queue: asyncio.Queue = asyncio.Queue()
+		for task_id in task_ids:
+			self._listeners[task_id].add(queue)
+		try:
+			await asyncio.wait_for(self._ready.wait(), timeout=ready_timeout)
+		except asyncio.TimeoutError:
+			logger.warning("task_event_hub_not_ready")
+		return queue
+
+	def unsubscribe(self, queue: asyncio.Queue, task_ids: Iterable[str]) -> None:
+		for task_id in task_ids:
+			listeners = self._listeners.get(task_id)
+			if listeners is None:
+				continue
+			listeners.discard(queue)
+			if not listeners:
+				del self._listeners[task_id]
+
+	async def close(self) -> None:
+		if self._runner is not None:
+			self._runner.cancel()
+			try:
+				await self._runner
+			except (asyncio.CancelledError, Exception):  # noqa: BLE001
+				pass
+			self._runner = None
+
+	def _dispatch(self, data: bytes) -> None:
+		try:
+			event = json.loads(data)
+		except ValueError:
+			return
+		for queue in tuple(self._listeners.get(event.get("task_id"), ())):
+			queue.put_nowait(event)
+
+	async def _run(self) -> None:
+		while True:
+			pubsub = get_async_redis().pubsub()
+			try:
+				await pubsub.psubscribe(CHANNEL_PREFIX + "*")
+				self._ready.set()
+				while True:
+					# Explicit read timeout: the client's socket_timeout must not end the subscription
+					message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+					if message is not None and message.get("type") == "pmessage":
+						self._dispatch(message["data"])
+			except asyncio.CancelledError:
+				raise
+			except Exception:  # noqa: BLE001
+				logger.warning("task_event_hub_disconnected", exc_info=True)
+				await asyncio.sleep(1.0)
+			finally:
+				self._ready.clear()
+				try:
+					await pubsub.aclose()
+				except Exception:  # noqa: BLE001
+					pass
+
+
+hub = TaskEventHub()
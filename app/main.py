@@ -1,41 +1,96 @@
+import asyncio
+import base64
+import json
+import math
 import uuid
 import logging
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Literal
+
+from celery import group
 from fastapi import FastAPI, HTTPException, Header, Query, Request
-from fastapi.responses import JSONResponse, PlainTextResponse, FileResponse, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, FileResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy import select
+from redis.exceptions import RedisError
+from sqlalchemy import func, insert, select, tuple_, update
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import undefer
 
+from .cache import circuit_hash, result_key, lookup_result, claim_inflight, detach_submission, release_inflight_async
 from .config import settings
-from .db import init_db, SessionLocal, Task, TaskStatus
+from .db import init_db_async, AsyncSessionLocal, Task, TaskStatus
+from .events import TERMINAL_STATUSES, hub, publish_task_event, task_event
 from .schemas import (
 	SubmitTaskRequest,
 	SubmitTaskResponse,
+	SubmitSweepRequest,
+	SubmitExpectationRequest,
+	SubmitBatchRequest,
+	SubmitBatchResponse,
+	BatchStatusResponse,
+	BatchTaskStatus,
 	TaskCompletedResponse,
+	TaskSweepCompletedResponse,
+	TaskExpectationCompletedResponse,
 	TaskPendingResponse,
 	TaskErrorResponse,
+	CancelTaskResponse,
+	binding_columns,
 )
-from .celery_app import celery
-from .worker_tasks import execute_quantum_task
-from .quantum import circuit_from_qasm3, circuit_to_png_bytes
+from . import microbatch
+from .celery_app import QUEUE_BATCH, QUEUE_HEAVY, QUEUE_INTERACTIVE, celery, queue_for_cost
+from .dispatch import shard_ids, shard_plan, task_signature
+from . import archive, compression, metrics, rendering, stats
+from .process_pool import bulk_slots, run_in_process, shutdown_pool, warm_pool
+from .results import CountsArray, parse_bit_indices
+from . import IMPORT_STARTED
+
+_imported = time.perf_counter()
 
 app = FastAPI(title="Quantum Task API")
+app.add_middleware(compression.DecompressionMiddleware)
+# Added last so it is outermost and also times rejected compressed bodies
+app.add_middleware(metrics.HTTPMetricsMiddleware)
 logger = logging.getLogger("api")
 
+_queue_depth = metrics.QueueDepthCollector((QUEUE_INTERACTIVE, QUEUE_BATCH, QUEUE_HEAVY))
+_metrics_registry = metrics.build_registry([_queue_depth])
+
 
 @app.on_event("startup")
-def on_startup() -> None:
+async def on_startup() -> None:
 	try:
-		init_db()
+		await init_db_async()
 	except SQLAlchemyError:
 		logger.exception("init_db_failed")
+	warm_pool()
+	metrics.report_startup("api", {
+		"import": _imported - IMPORT_STARTED,
+		"ready": time.perf_counter() - IMPORT_STARTED,
+	})
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+	await hub.close()
+	shutdown_pool()
 
 
 @app.get("/healthz")
-def healthz() -> dict:
+async def healthz() -> dict:
 	return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics() -> Response:
+	# Queue depths are read from Redis at scrape time; keep that off the event loop
+	body = await run_in_threadpool(metrics.render, _metrics_registry)
+	return Response(content=body, media_type=metrics.CONTENT_TYPE_LATEST)
+
+
 @app.exception_handler(SQLAlchemyError)
 def sqlalchemy_error_handler(request: Request, exc: SQLAlchemyError) -> JSONResponse:
 	logger.exception("sqlalchemy_error")
@@ -48,156 +103,882 @@ def unhandled_error_handler(request: Request, exc: Exception) -> JSONResponse:
 	return JSONResponse(status_code=500, content={"detail": "Internal server error"})
 
 
+# Run in the process pool by name, so the API process never imports Qiskit
+_COMPILE_SUBMISSION = "app.quantum:compile_submission"
+_COMPILE_SWEEP = "app.quantum:compile_sweep"
+_COMPILE_EXPECTATION = "app.quantum:compile_expectation"
+_COMPILE_SUBMISSIONS = "app.quantum:compile_submissions"
+
+
+def _routed(compiled: dict) -> dict:
+	compiled["queue"] = queue_for_cost(compiled["cost_estimate"], compiled.pop("memory_mb"))
+	return compiled
+
+
+async def _compile_or_422(compile_fn: str, *args) -> dict:
+	"""Run ``compile_fn(*args)`` (one of the ``_COMPILE_*`` functions) in the process pool;
+	invalid circuits are rejected with 422.
+
+	Returns the derived ``Task`` columns, including the queue picked from the cost estimate.
+	"""
+	try:
+		return _routed(await run_in_process(compile_fn, *args, timeout=settings.parse_timeout_s))
+	except asyncio.TimeoutError:
+		raise HTTPException(status_code=422, detail="Circuit parsing timed out")
+	except ValueError as exc:
+		raise HTTPException(status_code=422, detail=f"Invalid circuit: {exc}")
+	except RuntimeError:
+		logger.exception("compile_pool_unavailable")
+		raise HTTPException(status_code=503, detail="Circuit validation unavailable. Please retry later.")
+
+
+async def _compile_batch_or_422(items: list) -> list[dict]:
+	"""Compile a batch's circuits in at most ``CPU_POOL_WORKERS - 1`` pool jobs.
+
+	Each job has ``BATCH_PARSE_TIMEOUT_S`` from when it starts running, rather
+	than a per-circuit timeout that also counts the wait behind the rest of the
+	batch. The jobs run as bulk jobs, leaving a pool worker to single
+	submissions. The first invalid circuit rejects the batch with 422.
+	"""
+	size = math.ceil(len(items) / bulk_slots())
+	chunks = [
+		[(item.qc, item.method, item.shots or settings.num_shots) for item in items[start:start + size]]
+		for start in range(0, len(items), size)
+	]
+	jobs = [
+		asyncio.ensure_future(run_in_process(_COMPILE_SUBMISSIONS, chunk, timeout=settings.batch_parse_timeout_s, bulk=True))
+		for chunk in chunks
+	]
+	try:
+		results = await asyncio.gather(*jobs)
+	except asyncio.TimeoutError:
+		raise HTTPException(status_code=422, detail="Batch parsing timed out")
+	except RuntimeError:
+		logger.exception("compile_pool_unavailable")
+		raise HTTPException(status_code=503, detail="Circuit validation unavailable. Please retry later.")
+	finally:
+		# After a failure, stop waiting on the other jobs
+		for job in jobs:
+			job.cancel()
+
+	compiled = []
+	# Jobs stop at their first invalid circuit, so every job before it is complete
+	for index, result in enumerate(result for chunk in results for result in chunk):
+		if isinstance(result, ValueError):
+			raise HTTPException(status_code=422, detail=f"Invalid circuit at index {index}: {result}")
+		compiled.append(_routed(result))
+	return compiled
+
+
+def _max_qasm_chars(request: Request) -> int:
+	# A compressed body was already bounded by MAX_DECOMPRESSED_BYTES while it was inflated
+	if request.scope.get(compression.SCOPE_KEY):
+		return settings.max_decompressed_bytes
+	return settings.max_qasm_chars
+
+
 @app.post("/tasks", response_model=SubmitTaskResponse, status_code=202)
-def submit_task(payload: SubmitTaskRequest) -> SubmitTaskResponse:
-	if not payload.qc or len(payload.qc) > 200_000:
+async def submit_task(payload: SubmitTaskRequest, request: Request) -> SubmitTaskResponse:
+	return await _submit_one(payload, _max_qasm_chars(request))
+
+
+@app.post("/tasks/upload", response_model=SubmitTaskResponse, status_code=202)
+async def upload_task(
+	request: Request,
+	method: Literal["automatic", "statevector", "stabilizer", "matrix_product_state"] = Query(default="automatic"),
+	shots: int | None = Query(default=None, ge=1, le=settings.max_shots),
+	seed: int | None = Query(default=None, ge=0, lt=2**63),
+) -> SubmitTaskResponse:
+	"""Submit the raw request body as QASM3 text, with the options in the query string.
+
+	The body is read as a stream, inflated on the fly when sent with
+	``Content-Encoding: gzip`` or ``zstd``, up to ``MAX_DECOMPRESSED_BYTES``.
+	"""
+	body = bytearray()
+	async for chunk in request.stream():
+		if len(body) + len(chunk) > settings.max_decompressed_bytes:
+			raise HTTPException(status_code=413, detail=f"Circuit exceeds {settings.max_decompressed_bytes} bytes")
+		body.extend(chunk)
+	try:
+		qc = body.decode("utf-8")
+	except UnicodeDecodeError:
+		raise HTTPException(status_code=400, detail="Body must be UTF-8 QASM3 text")
+	payload = SubmitTaskRequest(qc=qc, method=method, shots=shots, seed=seed)
+	return await _submit_one(payload, settings.max_decompressed_bytes)
+
+
+async def _submit_one(payload: SubmitTaskRequest, max_chars: int) -> SubmitTaskResponse:
+	if not payload.qc or len(payload.qc) > max_chars:
 		raise HTTPException(status_code=400, detail="Invalid qc payload")
 
+	if len(payload.qc) > settings.max_qasm_chars:
+		# Canonicalizing megabytes of text takes a while; let the event loop keep going
+		circ_hash = await run_in_threadpool(circuit_hash, payload.qc)
+	else:
+		circ_hash = circuit_hash(payload.qc)
+	shots = payload.shots or settings.num_shots
+	cache_key = result_key(circ_hash, shots, payload.seed)
+	cached_id = await lookup_result(cache_key)
+	if settings.result_cache_enabled:
+		metrics.observe_cache("result", cached_id is not None)
+	if cached_id is not None:
+		logger.info("task_cache_hit", extra={"task_id": cached_id})
+		return SubmitTaskResponse(task_id=cached_id, message="Identical task already completed.", cached=True)
+
+	compiled = await _compile_or_422(_COMPILE_SUBMISSION, payload.qc, payload.method, shots)
+
 	task_id = str(uuid.uuid4())
-	session = SessionLocal()
-	try:
-		task = Task(id=task_id, status=TaskStatus.PENDING, qc_qasm3=payload.qc)
-		session.add(task)
-		session.commit()
-		logger.info("task_enqueued", extra={"task_id": task_id})
-	except SQLAlchemyError:
-		# If commit failed due to DB outage, rollback might also fail — ignore it
+	inflight_id = await claim_inflight(cache_key, task_id)
+	if settings.result_cache_enabled:
+		metrics.observe_cache("inflight", inflight_id is not None)
+	if inflight_id is not None:
+		logger.info("task_attached_inflight", extra={"task_id": inflight_id})
+		return SubmitTaskResponse(task_id=inflight_id, message="Identical task already in progress.", cached=True)
+
+	async with AsyncSessionLocal() as session:
 		try:
-			session.rollback()
-		except Exception:  # noqa: BLE001
-			pass
-		logger.exception("db_unavailable_on_submit", extra={"task_id": task_id})
-		raise HTTPException(status_code=503, detail="Database unavailable. Please retry later.")
-	finally:
-		session.close()
+			session.add(Task(
+				id=task_id,
+				status=TaskStatus.PENDING,
+				circuit_hash=circ_hash,
+				shots=shots,
+				seed=payload.seed,
+				**compiled,
+			))
+			await session.commit()
+			await stats.record_transition_async(None, TaskStatus.PENDING)
+			logger.info("task_enqueued", extra={
+				"task_id": task_id,
+				"sim_method": compiled["sim_method"],
+				"cost_estimate": compiled["cost_estimate"],
+				"queue": compiled["queue"],
+			})
+		except SQLAlchemyError:
+			# If commit failed due to DB outage, rollback might also fail — ignore it
+			try:
+				await session.rollback()
+			except Exception:  # noqa: BLE001
+				pass
+			await release_inflight_async(cache_key, task_id)
+			logger.exception("db_unavailable_on_submit", extra={"task_id": task_id})
+			raise HTTPException(status_code=503, detail="Database unavailable. Please retry later.")
 
 	try:
-		execute_quantum_task.delay(task_id)
+		if microbatch.is_candidate(payload.qc, shots, payload.seed):
+			await microbatch.enqueue([task_id])
+		else:
+			# Kombu publishing is blocking; keep it off the event loop
+			await run_in_threadpool(task_signature(task_id, compiled["queue"]).apply_async)
 	except Exception as exc: 
 		# Mark task as error if broker is unavailable or enqueue fails
-		session = SessionLocal()
-		try:
-			task = session.get(Task, task_id)
+		await release_inflight_async(cache_key, task_id)
+		async with AsyncSessionLocal() as session:
+			task = await session.get(Task, task_id)
 			if task is not None:
 				task.status = TaskStatus.ERROR
 				task.error_msg = f"Enqueue failed: {exc}"
-				session.commit()
-		finally:
-			session.close()
+				await session.commit()
+				await stats.record_transition_async(TaskStatus.PENDING, TaskStatus.ERROR)
+		raise HTTPException(status_code=503, detail="Task queue unavailable. Please retry later.")
+
+	return SubmitTaskResponse(task_id=task_id)
+
+
+@app.post("/tasks/sweep", response_model=SubmitTaskResponse, status_code=202)
+async def submit_sweep(payload: SubmitSweepRequest, request: Request) -> SubmitTaskResponse:
+	"""Submit a parameterized circuit and many parameter bindings as one task.
+
+	The worker parses and transpiles the template once and runs every binding
+	in a single Aer job (``parameter_binds``); the result is a list of counts,
+	one per binding. Sweeps are not deduplicated through the result cache.
+	"""
+	if not payload.qc or len(payload.qc) > _max_qasm_chars(request):
+		raise HTTPException(status_code=400, detail="Invalid qc payload")
+	try:
+		bindings = binding_columns(payload.bindings)
+	except ValueError as exc:
+		raise HTTPException(status_code=422, detail=f"Invalid bindings: {exc}")
+	count = len(next(iter(bindings.values())))
+	if count > settings.sweep_max_bindings:
+		raise HTTPException(status_code=400, detail=f"Sweep exceeds {settings.sweep_max_bindings} bindings")
+	shots = payload.shots or settings.num_shots
+	compiled = await _compile_or_422(_COMPILE_SWEEP, payload.qc, bindings, payload.method, shots)
+	task = Task(
+		id=str(uuid.uuid4()),
+		status=TaskStatus.PENDING,
+		circuit_hash=circuit_hash(payload.qc),
+		shots=shots,
+		seed=payload.seed,
+		**compiled,
+	)
+	return await _store_and_dispatch(task, "sweep_enqueued", bindings=count)
+
+
+@app.post("/tasks/expectation", response_model=SubmitTaskResponse, status_code=202)
+async def submit_expectation(payload: SubmitExpectationRequest, request: Request) -> SubmitTaskResponse:
+	"""Submit a circuit and Pauli-sum observables for exact expectation values.
+
+	The worker simulates the circuit once, without shot sampling, and
+	evaluates every observable on the final state; the result is one value
+	per observable. Expectation tasks are not deduplicated through the result cache.
+	"""
+	if not payload.qc or len(payload.qc) > _max_qasm_chars(request):
+		raise HTTPException(status_code=400, detail="Invalid qc payload")
+	observables = [{o: 1.0} if isinstance(o, str) else o for o in payload.observables]
+	terms = sum(len(o) for o in observables)
+	if terms > settings.expectation_max_terms:
+		raise HTTPException(status_code=400, detail=f"Observables exceed {settings.expectation_max_terms} Pauli terms")
+	compiled = await _compile_or_422(_COMPILE_EXPECTATION, payload.qc, observables, payload.method)
+	task = Task(
+		id=str(uuid.uuid4()),
+		status=TaskStatus.PENDING,
+		circuit_hash=circuit_hash(payload.qc),
+		**compiled,
+	)
+	return await _store_and_dispatch(task, "expectation_enqueued", observables=len(observables), terms=terms)
+
+
+async def _store_and_dispatch(task: Task, event: str, **extra) -> SubmitTaskResponse:
+	"""Insert ``task`` and queue it for a worker (sweep and expectation tasks)."""
+	task_id, queue = task.id, task.queue
+	async with AsyncSessionLocal() as session:
+		try:
+			session.add(task)
+			await session.commit()
+			await stats.record_transition_async(None, TaskStatus.PENDING)
+			logger.info(event, extra={
+				"task_id": task_id,
+				"sim_method": task.sim_method,
+				"cost_estimate": task.cost_estimate,
+				"queue": queue,
+				**extra,
+			})
+		except SQLAlchemyError:
+			try:
+				await session.rollback()
+			except Exception:  # noqa: BLE001
+				pass
+			logger.exception("db_unavailable_on_submit", extra={"task_id": task_id})
+			raise HTTPException(status_code=503, detail="Database unavailable. Please retry later.")
+
+	try:
+		await run_in_threadpool(task_signature(task_id, queue).apply_async)
+	except Exception as exc:
+		async with AsyncSessionLocal() as session:
+			await session.execute(
+				update(Task)
+				.where(Task.id == task_id)
+				.values(status=TaskStatus.ERROR, error_msg=f"Enqueue failed: {exc}")
+			)
+			await session.commit()
+		await stats.record_transition_async(TaskStatus.PENDING, TaskStatus.ERROR)
 		raise HTTPException(status_code=503, detail="Task queue unavailable. Please retry later.")
 
 	return SubmitTaskResponse(task_id=task_id)
 
 
+@app.post("/tasks/batch", response_model=SubmitBatchResponse, status_code=202)
+async def submit_batch(payload: SubmitBatchRequest, request: Request) -> SubmitBatchResponse:
+	"""Submit many circuits with one multi-row INSERT and one Celery group publish.
+
+	Batch members always get their own rows (so the batch can be tracked as a
+	unit) but still record their circuit hash, so completed members feed the
+	result cache for later single submissions.
+	"""
+	if len(payload.tasks) > settings.batch_max_tasks:
+		raise HTTPException(status_code=400, detail=f"Batch exceeds {settings.batch_max_tasks} tasks")
+	max_chars = _max_qasm_chars(request)
+	for index, item in enumerate(payload.tasks):
+		if not item.qc or len(item.qc) > max_chars:
+			raise HTTPException(status_code=400, detail=f"Invalid qc payload at index {index}")
+	compiled = await _compile_batch_or_422(payload.tasks)
+
+	batch_id = str(uuid.uuid4())
+	now = datetime.utcnow()
+	rows = [
+		{
+			"id": str(uuid.uuid4()),
+			"status": TaskStatus.PENDING,
+			"submitted_at": now,
+			"updated_at": now,
+			"circuit_hash": circuit_hash(item.qc),
+			"batch_id": batch_id,
+			"batch_index": index,
+			"shots": item.shots or settings.num_shots,
+			"seed": item.seed,
+			**prepared,
+		}
+		for index, (item, prepared) in enumerate(zip(payload.tasks, compiled))
+	]
+	task_ids = [row["id"] for row in rows]
+
+	async with AsyncSessionLocal() as session:
+		try:
+			# executemany over insert() renders batched multi-row VALUES statements
+			await session.execute(insert(Task), rows)
+			await session.commit()
+			await stats.record_transition_async(None, TaskStatus.PENDING, len(rows))
+			logger.info("batch_enqueued", extra={"batch_id": batch_id, "count": len(rows)})
+		except SQLAlchemyError:
+			try:
+				await session.rollback()
+			except Exception:  # noqa: BLE001
+				pass
+			logger.exception("db_unavailable_on_submit", extra={"batch_id": batch_id})
+			raise HTTPException(status_code=503, detail="Database unavailable. Please retry later.")
+
+	try:
+		small = [row["id"] for row, item in zip(rows, payload.tasks) if microbatch.is_candidate(item.qc, row["shots"], item.seed)]
+		if small:
+			await microbatch.enqueue(small)
+		if len(small) < len(rows):
+			small_ids = set(small)
+			celery_group = group(task_signature(row["id"], row["queue"]) for row in rows if row["id"] not in small_ids)
+			await run_in_threadpool(celery_group.apply_async)
+	except Exception as exc:
+		async with AsyncSessionLocal() as session:
+			failed = await session.execute(
+				update(Task)
+				.where(Task.batch_id == batch_id, Task.status == TaskStatus.PENDING)
+				.values(status=TaskStatus.ERROR, error_msg=f"Enqueue failed: {exc}")
+			)
+			await session.commit()
+		await stats.record_transition_async(TaskStatus.PENDING, TaskStatus.ERROR, failed.rowcount)
+		raise HTTPException(status_code=503, detail="Task queue unavailable. Please retry later.")
+
+	return SubmitBatchResponse(batch_id=batch_id, task_ids=task_ids)
+
+
+@app.get("/tasks/batch/{batch_id}", response_model=BatchStatusResponse, responses={404: {"model": TaskErrorResponse}})
+async def get_batch(batch_id: str, include_results: bool = Query(default=True)):
+	columns = [Task.id, Task.status, Task.error_msg]
+	if include_results:
+		columns += [Task.result_json, Task.result_blob.is_not(None).label("truncated")]
+	stmt = select(*columns).where(Task.batch_id == batch_id).order_by(Task.batch_index)
+	async with AsyncSessionLocal() as session:
+		rows = (await session.execute(stmt)).all()
+
+	if not rows:
+		return JSONResponse(status_code=404, content=TaskErrorResponse(status="error", message="Batch not found.").model_dump())
+
+	counts = {TaskStatus.PENDING: 0, TaskStatus.RUNNING: 0, TaskStatus.COMPLETED: 0, TaskStatus.ERROR: 0, TaskStatus.CANCELLED: 0}
+	tasks = []
+	for row in rows:
+		counts[row.status] = counts.get(row.status, 0) + 1
+		with_result = include_results and row.status == TaskStatus.COMPLETED
+		tasks.append(BatchTaskStatus(
+			task_id=row.id,
+			status=row.status,
+			result=row.result_json if with_result else None,
+			truncated=bool(row.truncated) if with_result else None,
+			message=row.error_msg if row.status in (TaskStatus.ERROR, TaskStatus.CANCELLED) else None,
+		))
+	done = counts[TaskStatus.PENDING] == 0 and counts[TaskStatus.RUNNING] == 0
+	return BatchStatusResponse(batch_id=batch_id, total=len(rows), counts=counts, done=done, tasks=tasks)
+
+
+async def _task_snapshots(task_ids: list[str]) -> dict[str, dict]:
+	"""Current state of ``task_ids`` as event payloads, read in one query."""
+	stmt = select(
+		Task.id, Task.status, Task.result_json, Task.error_msg, Task.result_blob.is_not(None).label("truncated"),
+	).where(Task.id.in_(task_ids))
+	async with AsyncSessionLocal() as session:
+		rows = (await session.execute(stmt)).all()
+	return {
+		row.id: task_event(
+			row.id,
+			row.status,
+			result=row.result_json if row.status == TaskStatus.COMPLETED else None,
+			message=row.error_msg if row.status in (TaskStatus.ERROR, TaskStatus.CANCELLED) else None,
+			truncated=bool(row.truncated),
+		)
+		for row in rows
+	}
+
+
+def _sse(event: dict) -> str:
+	return f"data: {json.dumps(event)}\n\n"
+
+
+async def _event_stream(request: Request, task_ids: list[str], queue: asyncio.Queue, initial: dict[str, dict]):
+	"""Yield SSE frames until every task in ``task_ids`` reached a terminal state."""
+	pending = set(task_ids)
+	last_status: dict[str, str] = {}
+	try:
+		for task_id in task_ids:
+			event = initial.get(task_id) or task_event(task_id, TaskStatus.ERROR, message="Task not found.")
+			last_status[task_id] = event["status"]
+			yield _sse(event)
+			if event["status"] in TERMINAL_STATUSES:
+				pending.discard(task_id)
+
+		while pending:
+			try:
+				event = await asyncio.wait_for(queue.get(), timeout=settings.events_heartbeat_s)
+				events = [event]
+			except asyncio.TimeoutError:
+				if await request.is_disconnected():
+					return
+				yield ": keepalive\n\n"
+				# Safety net for events lost while Redis was unreachable
+				snapshots = await _task_snapshots(sorted(pending))
+				events = [e for e in snapshots.values() if e["status"] != last_status.get(e["task_id"])]
+
+			for event in events:
+				task_id = event["task_id"]
+				if task_id not in pending:
+					continue
+				last_status[task_id] = event["status"]
+				yield _sse(event)
+				if event["status"] in TERMINAL_STATUSES:
+					pending.discard(task_id)
+	finally:
+		hub.unsubscribe(queue, task_ids)
+
+
+async def _open_event_stream(request: Request, task_ids: list[str]) -> StreamingResponse:
+	# Subscribe before reading state so no transition can slip in between
+	queue = await hub.subscribe(task_ids)
+	try:
+		initial = await _task_snapshots(task_ids)
+	except Exception:
+		hub.unsubscribe(queue, task_ids)
+		raise
+	return StreamingResponse(
+		_event_stream(request, task_ids, queue, initial),
+		media_type="text/event-stream",
+		headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+	)
+
+
+@app.get("/tasks/events")
+async def multi_task_events(request: Request, ids: str = Query(..., description="Comma-separated task ids")):
+	"""Server-Sent Events for several tasks over one connection."""
+	task_ids = list(dict.fromkeys(i.strip() for i in ids.split(",") if i.strip()))
+	if not task_ids or len(task_ids) > settings.events_max_ids:
+		raise HTTPException(status_code=400, detail=f"Provide between 1 and {settings.events_max_ids} task ids")
+	return await _open_event_stream(request, task_ids)
+
+
+@app.get("/tasks/{task_id}/events")
+async def task_events(request: Request, task_id: str):
+	"""Server-Sent Events with each status transition and the final result of one task."""
+	return await _open_event_stream(request, [task_id])
+
+
 @app.get("/tasks/{task_id}", responses={
-	200: {"model": TaskCompletedResponse},
+	200: {"model": TaskCompletedResponse | TaskSweepCompletedResponse | TaskExpectationCompletedResponse},
 	202: {"model": TaskPendingResponse},
 	404: {"model": TaskErrorResponse},
 })
-def get_task(task_id: str):
-	session = SessionLocal()
+async def get_task(
+	task_id: str,
+	wait: float = Query(default=0, ge=0, le=settings.long_poll_max_s, description="Seconds to hold the request while the task is pending"),
+):
+	if wait <= 0:
+		return await _task_response(task_id)
+
+	# Long poll: subscribe first, then check state, then park on the event queue.
+	# Waiting costs no thread and no DB connection.
+	queue = await hub.subscribe([task_id])
 	try:
-		task = session.get(Task, task_id)
+		response = await _task_response(task_id)
+		if response.status_code != 202:
+			return response
+		deadline = time.monotonic() + wait
+		while (remaining := deadline - time.monotonic()) > 0:
+			try:
+				event = await asyncio.wait_for(queue.get(), timeout=min(remaining, settings.events_heartbeat_s))
+			except asyncio.TimeoutError:
+				# Safety net for events lost while Redis was unreachable, as in the SSE stream
+				response = await _task_response(task_id)
+				if response.status_code != 202:
+					return response
+				continue
+			if event["status"] in TERMINAL_STATUSES:
+				break
+		return await _task_response(task_id)
+	finally:
+		hub.unsubscribe(queue, [task_id])
+
+
+_CANCELLED_MSG = "Task was cancelled."
+
+
+async def _archived_task(task_id: str) -> SimpleNamespace | None:
+	"""Slow path for ids no longer in ``tasks`` (see app/archive.py)."""
+	row = await archive.lookup(task_id)
+	if row is None:
+		return None
+	return SimpleNamespace(
+		**row, truncated=row["result_blob"] is not None, expectation=row.get("observables") is not None,
+	)
+
+
+async def _task_response(task_id: str) -> JSONResponse:
+	stmt = select(
+		Task.status,
+		Task.result_json,
+		Task.error_msg,
+		Task.result_blob.is_not(None).label("truncated"),
+		Task.observables.is_not(None).label("expectation"),
+	).where(Task.id == task_id)
+	async with AsyncSessionLocal() as session:
+		task = (await session.execute(stmt)).first()
+	if task is None:
+		task = await _archived_task(task_id)
+	if task is None:
+		logger.info("task_not_found", extra={"task_id": task_id})
+		return JSONResponse(status_code=404, content=TaskErrorResponse(status="error", message="Task not found.").model_dump())
+
+	if task.status in (TaskStatus.PENDING, TaskStatus.RUNNING):
+		logger.info("task_pending", extra={"task_id": task_id, "status": task.status})
+		return JSONResponse(status_code=202, content=TaskPendingResponse().model_dump())
+
+	if task.status == TaskStatus.COMPLETED:
+		logger.info("task_result", extra={"task_id": task_id})
+		if task.expectation:
+			return JSONResponse(status_code=200, content=TaskExpectationCompletedResponse(values=task.result_json).model_dump())
+		if isinstance(task.result_json, list):
+			return JSONResponse(status_code=200, content=TaskSweepCompletedResponse(results=task.result_json).model_dump())
+		response = TaskCompletedResponse(result=task.result_json or {}, truncated=True if task.truncated else None)
+		return JSONResponse(status_code=200, content=response.model_dump(exclude_none=True))
+
+	if task.status == TaskStatus.CANCELLED:
+		logger.info("task_cancelled_state", extra={"task_id": task_id})
+		return JSONResponse(status_code=200, content=TaskErrorResponse(status="cancelled", message=task.error_msg or _CANCELLED_MSG).model_dump())
+
+	logger.info("task_error_state", extra={"task_id": task_id})
+	return JSONResponse(status_code=200, content=TaskErrorResponse(status="error", message=task.error_msg or "Unknown error").model_dump())
+
+
+@app.delete("/tasks/{task_id}", response_model=CancelTaskResponse, responses={
+	404: {"model": TaskErrorResponse},
+	409: {"model": TaskErrorResponse},
+})
+async def cancel_task(task_id: str):
+	"""Cancel a pending or running task.
+
+	Queued messages are revoked; a running simulation has its worker process
+	terminated (the pool starts a replacement). Cancelling twice is a no-op.
+	A task shared by identical submissions (in-flight deduplication) is only
+	cancelled by the last of them; before that, a cancel withdraws one.
+	"""
+	async with AsyncSessionLocal() as session:
+		stmt = select(Task.status, Task.circuit_hash, Task.shots, Task.seed).where(Task.id == task_id)
+		task = (await session.execute(stmt)).first()
 		if task is None:
-			logger.info("task_not_found", extra={"task_id": task_id})
+			if await _archived_task(task_id) is not None:
+				return JSONResponse(status_code=409, content=TaskErrorResponse(status="error", message="Task already finished.").model_dump())
 			return JSONResponse(status_code=404, content=TaskErrorResponse(status="error", message="Task not found.").model_dump())
-
+		if task.status == TaskStatus.CANCELLED:
+			return CancelTaskResponse(task_id=task_id, message="Task was already cancelled.")
 		if task.status in (TaskStatus.PENDING, TaskStatus.RUNNING):
-			logger.info("task_pending", extra={"task_id": task_id, "status": task.status})
-			return JSONResponse(status_code=202, content=TaskPendingResponse().model_dump())
-
-		if task.status == TaskStatus.COMPLETED:
-			logger.info("task_result", extra={"task_id": task_id})
-			return JSONResponse(status_code=200, content=TaskCompletedResponse(result=task.result_json or {}).model_dump())
+			remaining = await detach_submission(task_id)
+			if remaining is not None:
+				logger.info("task_submission_detached", extra={"task_id": task_id, "remaining": remaining})
+				return CancelTaskResponse(
+					task_id=task_id,
+					status=task.status,
+					message=f"Submission withdrawn; the task keeps running for {remaining + 1} other identical submission(s).",
+				)
+		# Conditional so a task finishing right now is not overwritten; the worker locks the
+		# row while it stores a result
+		cancelled = await session.execute(
+			update(Task)
+			.where(Task.id == task_id, Task.status.in_((TaskStatus.PENDING, TaskStatus.RUNNING)))
+			.values(status=TaskStatus.CANCELLED, error_msg=_CANCELLED_MSG)
+		)
+		await session.commit()
+	if cancelled.rowcount == 0:
+		return JSONResponse(status_code=409, content=TaskErrorResponse(
+			status="error", message="Task already finished.",
+		).model_dump())
+	await stats.record_transition_async(task.status, TaskStatus.CANCELLED)
+
+	shots = task.shots or settings.num_shots
+	celery_ids = [task_id] + shard_ids(task_id, len(shard_plan(shots, task.seed)))
+	try:
+		# Workers that get the broadcast drop queued messages and kill running ones; any
+		# that miss it still see the cancelled status before running
+		await run_in_threadpool(
+			celery.control.revoke, celery_ids,
+			terminate=task.status == TaskStatus.RUNNING, signal="SIGKILL",
+		)
+	except Exception:  # noqa: BLE001
+		logger.warning("task_revoke_failed", extra={"task_id": task_id}, exc_info=True)
+	if task.circuit_hash:
+		await release_inflight_async(result_key(task.circuit_hash, shots, task.seed), task_id)
+	await run_in_threadpool(publish_task_event, task_id, TaskStatus.CANCELLED, message=_CANCELLED_MSG)
+	logger.info("task_cancelled", extra={"task_id": task_id, "was": task.status})
+	return CancelTaskResponse(task_id=task_id)
+
+
+def _query_counts(result_json: dict | None, result_blob: bytes | None, top: int | None, marginal: list[int] | None) -> CountsArray:
+	counts = CountsArray.from_bytes(result_blob) if result_blob is not None else CountsArray.from_dict(result_json or {})
+	if marginal:
+		counts = counts.marginal(marginal)
+	if top is not None:
+		counts = counts.top(top)
+	return counts
+
+
+@app.get("/tasks/{task_id}/result", responses={404: {"model": TaskErrorResponse}})
+async def get_task_result(
+	task_id: str,
+	top: int | None = Query(default=None, ge=1, le=100000, description="Only the N most frequent outcomes"),
+	marginal: str | None = Query(default=None, description="Comma-separated classical bit indices to marginalize onto"),
+	format: Literal["json", "binary"] = Query(default="json"),
+	binding: int | None = Query(default=None, ge=0, description="Index of the binding to query, for sweep tasks"),
+):
+	"""Query a completed result server-side (top-k, marginals, compact binary)."""
+	stmt = select(
+		Task.status, Task.result_json, Task.result_blob, Task.observables.is_not(None).label("expectation"),
+	).where(Task.id == task_id)
+	async with AsyncSessionLocal() as session:
+		task = (await session.execute(stmt)).first()
+	if task is None:
+		task = await _archived_task(task_id)
+	if task is None or task.status != TaskStatus.COMPLETED:
+		return await _task_response(task_id)
+	if task.expectation:
+		raise HTTPException(status_code=400, detail="Expectation tasks have no counts; see GET /tasks/{id}")
+
+	result_json = task.result_json
+	if isinstance(result_json, list):
+		if binding is None:
+			raise HTTPException(status_code=400, detail="Sweep task: pass ?binding=<index>")
+		if binding >= len(result_json):
+			raise HTTPException(status_code=400, detail=f"Sweep has {len(result_json)} bindings")
+		result_json = result_json[binding]
+	elif binding is not None:
+		raise HTTPException(status_code=400, detail="binding applies only to sweep tasks")
 
-		logger.info("task_error_state", extra={"task_id": task_id})
-		return JSONResponse(status_code=200, content=TaskErrorResponse(status="error", message=task.error_msg or "Unknown error").model_dump())
-	finally:
-		session.close()
+	try:
+		bits = parse_bit_indices(marginal) if marginal else None
+		# NumPy releases the GIL for the heavy parts; a thread is enough here
+		counts = await run_in_threadpool(_query_counts, result_json, task.result_blob, top, bits)
+	except ValueError as exc:
+		raise HTTPException(status_code=400, detail=str(exc))
+
+	if format == "binary":
+		payload = await run_in_threadpool(counts.to_bytes)
+		return Response(content=payload, media_type="application/octet-stream")
+	return {
+		"status": "completed",
+		"num_outcomes": len(counts),
+		"shots": counts.shots,
+		"result": counts.to_dict(),
+	}
 
 
 # Serve the UI at /ui
 app.mount("/ui", StaticFiles(directory="app/static", html=True), name="ui")
 
 
-@app.get("/admin/tasks")
+def _encode_cursor(submitted_at: datetime, task_id: str) -> str:
+	return base64.urlsafe_b64encode(f"{submitted_at.isoformat()}|{task_id}".encode()).decode()
 
-def list_tasks(x_admin_password: str | None = Header(default=None, alias="x-admin-password"), password: str | None = Query(default=None)):
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+	try:
+		ts, task_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+		return datetime.fromisoformat(ts), task_id
+	except (ValueError, UnicodeDecodeError):
+		raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@app.get("/admin/tasks")
+async def list_tasks(
+	x_admin_password: str | None = Header(default=None, alias="x-admin-password"),
+	password: str | None = Query(default=None),
+	limit: int = Query(default=100, ge=1, le=1000),
+	cursor: str | None = Query(default=None, description="next_cursor from the previous page"),
+	status: str | None = Query(default=None, description="Comma-separated statuses to include"),
+	since: datetime | None = Query(default=None, description="Only tasks submitted at or after this time"),
+	until: datetime | None = Query(default=None, description="Only tasks submitted before this time"),
+):
+	"""Newest-first task listing with keyset pagination on (submitted_at, id).
+
+	Only small columns are read; ``has_result`` is computed in SQL so the QASM
+	text and result blobs never leave the database.
+	"""
 	secret = x_admin_password or password
 	if secret != settings.admin_password:
 		raise HTTPException(status_code=401, detail="Unauthorized")
 
-	session = SessionLocal()
-	try:
-		stmt = select(Task).order_by(Task.submitted_at.desc())
-		tasks = session.execute(stmt).scalars().all()
-		data = []
-		for t in tasks:
-			data.append({
-				"id": t.id,
-				"status": t.status,
-				"submitted_at": t.submitted_at.isoformat() if t.submitted_at else None,
-				"updated_at": t.updated_at.isoformat() if t.updated_at else None,
-				"has_result": bool(t.result_json),
-				"error_msg": t.error_msg,
-			})
-		return {"tasks": data}
-	finally:
-		session.close()
+	stmt = select(
+		Task.id,
+		Task.status,
+		Task.submitted_at,
+		Task.updated_at,
+		Task.result_json.is_not(None).label("has_result"),
+		func.substr(Task.error_msg, 1, 500).label("error_msg"),
+		Task.sim_method,
+		Task.sim_cost,
+		Task.cost_estimate,
+		Task.queue,
+		Task.timings_json,
+	)
+	if status:
+		stmt = stmt.where(Task.status.in_([s.strip() for s in status.split(",") if s.strip()]))
+	if since is not None:
+		stmt = stmt.where(Task.submitted_at >= since)
+	if until is not None:
+		stmt = stmt.where(Task.submitted_at < until)
+	if cursor:
+		stmt = stmt.where(tuple_(Task.submitted_at, Task.id) < tuple_(*_decode_cursor(cursor)))
+	# Fetch one extra row to know whether another page exists
+	stmt = stmt.order_by(Task.submitted_at.desc(), Task.id.desc()).limit(limit + 1)
+
+	async with AsyncSessionLocal() as session:
+		rows = (await session.execute(stmt)).all()
+
+	next_cursor = None
+	if len(rows) > limit:
+		rows = rows[:limit]
+		next_cursor = _encode_cursor(rows[-1].submitted_at, rows[-1].id)
+
+	data = [
+		{
+			"id": row.id,
+			"status": row.status,
+			"submitted_at": row.submitted_at.isoformat() if row.submitted_at else None,
+			"updated_at": row.updated_at.isoformat() if row.updated_at else None,
+			"has_result": bool(row.has_result),
+			"error_msg": row.error_msg,
+			"sim_method": row.sim_method,
+			"sim_cost": row.sim_cost,
+			"cost_estimate": row.cost_estimate,
+			"queue": row.queue,
+			"timings": row.timings_json,
+		}
+		for row in rows
+	]
+	return {"tasks": data, "next_cursor": next_cursor}
+
+
+async def _count_statuses() -> dict[str, int]:
+	async with AsyncSessionLocal() as session:
+		rows = (await session.execute(select(Task.status, func.count()).group_by(Task.status))).all()
+	return {status: count for status, count in rows}
+
+
+@app.get("/admin/stats")
+async def admin_stats(
+	x_admin_password: str | None = Header(default=None, alias="x-admin-password"),
+	password: str | None = Query(default=None),
+):
+	"""Task counts per status, per-minute throughput, queue depth and runtime percentiles.
+
+	Served from the Redis rollups kept by :mod:`app.stats`, so the cost does
+	not grow with the number of tasks. The status counts are seeded from the
+	database only once, when the rollups are missing.
+	"""
+	secret = x_admin_password or password
+	if secret != settings.admin_password:
+		raise HTTPException(status_code=401, detail="Unauthorized")
+	try:
+		seeded = await stats.ensure_seeded(_count_statuses)
+		if seeded is not None:
+			logger.info("stats_seeded", extra={"counts": seeded})
+		data = await stats.read_stats()
+	except RedisError:
+		logger.warning("stats_unavailable", exc_info=True)
+		raise HTTPException(status_code=503, detail="Statistics unavailable. Please retry later.")
+	try:
+		data["queue_depth"] = await run_in_threadpool(_queue_depth.depths)
+	except RedisError:
+		logger.warning("queue_depth_unavailable", exc_info=True)
+		data["queue_depth"] = None
+	return data
 
 
 @app.get("/admin", include_in_schema=False)
-def admin_page():
+async def admin_page():
 	return FileResponse("app/static/admin.html", media_type="text/html")
 
 
 @app.get("/admin/tasks/{task_id}/qasm3")
-def download_task_qasm3(task_id: str, x_admin_password: str | None = Header(default=None, alias="x-admin-password"), password: str | None = Query(default=None)):
+async def download_task_qasm3(task_id: str, x_admin_password: str | None = Header(default=None, alias="x-admin-password"), password: str | None = Query(default=None)):
 	secret = x_admin_password or password
 	if secret != settings.admin_password:
 		raise HTTPException(status_code=401, detail="Unauthorized")
 
-	session = SessionLocal()
-	try:
-		task = session.get(Task, task_id)
-		if task is None:
+	async with AsyncSessionLocal() as session:
+		task = await session.get(Task, task_id, options=[undefer(Task.qc_qasm3_zst)])
+	if task is None:
+		task = await _archived_task(task_id)
+	if task is None:
+		raise HTTPException(status_code=404, detail="Task not found")
+	content = compression.stored_qasm(getattr(task, "qc_qasm3_zst", None), task.qc_qasm3)
+	filename = f"{task_id}.qasm"
+	return PlainTextResponse(content, media_type="text/plain", headers={
+		"Content-Disposition": f"attachment; filename=\"{filename}\""
+	})
+
+
+async def _viz_response(task_id: str, fmt: str, request: Request, cache_control: str) -> Response:
+	async with AsyncSessionLocal() as session:
+		row = (await session.execute(select(Task.circuit_hash).where(Task.id == task_id))).first()
+	archived = None
+	if row is None:
+		archived = await _archived_task(task_id)
+		if archived is None:
 			raise HTTPException(status_code=404, detail="Task not found")
-		content = task.qc_qasm3 or ""
-		filename = f"{task_id}.qasm"
-		return PlainTextResponse(content, media_type="text/plain", headers={
-			"Content-Disposition": f"attachment; filename=\"{filename}\""
-		})
-	finally:
-		session.close()
 
+	async def load_circuit() -> rendering.StoredCircuit:
+		if archived is not None:
+			return archived.qc_qasm3
+		async with AsyncSessionLocal() as session:
+			stored = (await session.execute(
+				select(Task.qc_qpy, Task.qc_qasm3, Task.qc_qasm3_zst).where(Task.id == task_id)
+			)).one()
+		if stored.qc_qpy is not None:
+			return stored.qc_qpy
+		return compression.stored_qasm(stored.qc_qasm3_zst, stored.qc_qasm3)
+
+	circ_hash = (archived or row).circuit_hash
+	if circ_hash is None and archived is not None:
+		circ_hash = circuit_hash(archived.qc_qasm3)
+	elif circ_hash is None:
+		# Rows submitted before circuit hashing was introduced
+		async with AsyncSessionLocal() as session:
+			circ_hash = circuit_hash((await session.execute(select(Task.qc_qasm3).where(Task.id == task_id))).scalar_one())
+
+	tag = rendering.etag(circ_hash, fmt)
+	if rendering.etag_matches(request.headers.get("if-none-match"), tag):
+		return Response(status_code=304, headers={"ETag": tag, "Cache-Control": cache_control})
+
+	try:
+		actual_fmt, content = await rendering.get_rendering(circ_hash, fmt, load_circuit)
+	except asyncio.TimeoutError:
+		raise HTTPException(status_code=504, detail="Circuit rendering timed out")
+	except ValueError as exc:
+		raise HTTPException(status_code=422, detail=f"Invalid circuit: {exc}")
+	except RuntimeError:
+		logger.exception("viz_render_failed", extra={"task_id": task_id})
+		raise HTTPException(status_code=503, detail="Circuit rendering unavailable")
+
+	headers = {"ETag": tag, "Cache-Control": cache_control}
+	if actual_fmt != fmt:
+		# Too wide/deep for a drawing: served as the text diagram instead
+		headers["X-Viz-Fallback"] = actual_fmt
+	return Response(content=content, media_type=rendering.MEDIA_TYPES[actual_fmt], headers=headers)
 
-@app.get("/admin/tasks/{task_id}/viz.png")
-def task_viz_png(task_id: str, x_admin_password: str | None = Header(default=None, alias="x-admin-password"), password: str | None = Query(default=None)):
+
+def _viz_cache_control(scope: str) -> str:
+	return f"{scope}, max-age={settings.viz_cache_ttl_s}"
+
+
+@app.get("/admin/tasks/{task_id}/viz.{fmt}")
+async def task_viz(task_id: str, fmt: Literal["png", "svg", "txt"], request: Request, x_admin_password: str | None = Header(default=None, alias="x-admin-password"), password: str | None = Query(default=None)):
 	secret = x_admin_password or password
 	if secret != settings.admin_password:
 		raise HTTPException(status_code=401, detail="Unauthorized")
-
-	session = SessionLocal()
-	try:
-		task = session.get(Task, task_id)
-		if task is None:
-			raise HTTPException(status_code=404, detail="Task not found")
-		qc = circuit_from_qasm3(task.qc_qasm3)
-		png = circuit_to_png_bytes(qc)
-		return Response(content=png, media_type="image/png")
-	finally:
-		session.close()
+	return await _viz_response(task_id, fmt, request, _viz_cache_control("private"))
 
 
-@app.get("/tasks/{task_id}/viz.png")
-def public_task_viz_png(task_id: str):
-	session = SessionLocal()
-	try:
-		task = session.get(Task, task_id)
-		if task is None:
-			raise HTTPException(status_code=404, detail="Task not found")
-		qc = circuit_from_qasm3(task.qc_qasm3)
-		png = circuit_to_png_bytes(qc)
-		return Response(content=png, media_type="image/png")
-	finally:
-		session.close()
+@app.get("/tasks/{task_id}/viz.{fmt}")
+async def public_task_viz(task_id: str, fmt: Literal["png", "svg", "txt"], request: Request):
+	return await _viz_response(task_id, fmt, request, _viz_cache_control("public"))
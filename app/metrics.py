@@ -0,0 +1,261 @@
+"""Prometheus metrics for the API, the Celery workers and the micro-batcher.
+
+The API serves them at ``GET /metrics``; each worker (and the batcher) serves
+its own on ``WORKER_METRICS_PORT``. Celery's prefork children are separate
+processes, so when ``PROMETHEUS_MULTIPROC_DIR`` is set every process writes its
+samples there and the exposition merges them (the client library's
+multiprocess mode). Without it metrics are per process, which is fine for the
+API and for ``--pool solo`` workers.
+"""
+import glob
+import logging
+import os
+import resource
+import sys
+import time
+from typing import Any, Dict, Iterable, Optional
+
+import redis
+from redis.exceptions import RedisError
+
+_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+if _MULTIPROC_DIR:
+	# Must exist before prometheus_client creates its first metric
+	os.makedirs(_MULTIPROC_DIR, exist_ok=True)
+
+from prometheus_client import (  # noqa: E402
+	CONTENT_TYPE_LATEST,
+	REGISTRY,
+	CollectorRegistry,
+	Counter,
+	Gauge,
+	Histogram,
+	generate_latest,
+	multiprocess,
+	start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily  # noqa: E402
+
+from .config import settings  # noqa: E402
+
+logger = logging.getLogger("metrics")
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 900, 3600)
+
+# Per-task phases as recorded in Task.timings_json: queue_wait, parse, transpile,
+# simulate, db_write
+TASK_PHASE_SECONDS = Histogram(
+	"quantum_task_phase_seconds", "Time spent per task execution phase",
+	["phase", "sim_method"], buckets=_LATENCY_BUCKETS,
+)
+TASK_LATENCY_SECONDS = Histogram(
+	"quantum_task_latency_seconds", "Submission to final status",
+	["queue", "status"], buckets=_LATENCY_BUCKETS,
+)
+TASKS_IN_PROGRESS = Gauge(
+	"quantum_tasks_in_progress", "Tasks currently executing in a worker process",
+	["queue"], multiprocess_mode="livesum",
+)
+CACHE_REQUESTS = Counter(
+	"quantum_cache_requests_total", "Cache lookups by cache and outcome (hit/miss)",
+	["cache", "outcome"],
+)
+SIMULATOR_MEMORY_MB = Gauge(
+	"quantum_simulator_required_memory_mb_max", "High-water mark of Aer's required memory for one run",
+	multiprocess_mode="max",
+)
+PROCESS_MAX_RSS_BYTES = Gauge(
+	"quantum_process_max_rss_bytes", "Peak resident set size of any worker process",
+	multiprocess_mode="max",
+)
+ARCHIVED_TASKS = Counter(
+	"quantum_archived_tasks_total", "Tasks moved from the tasks table to archive files",
+)
+HTTP_REQUEST_SECONDS = Histogram(
+	"quantum_http_request_seconds", "API request latency",
+	["method", "route", "status"], buckets=_LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+	"quantum_http_requests_in_progress", "API requests being served",
+	multiprocess_mode="livesum",
+)
+STARTUP_SECONDS = Gauge(
+	"quantum_startup_seconds", "Time from importing the app package to the end of each startup phase",
+	["role", "phase"], multiprocess_mode="max",
+)
+STARTUP_RSS_BYTES = Gauge(
+	"quantum_startup_rss_bytes", "Resident set size when the process became ready",
+	["role"], multiprocess_mode="max",
+)
+
+# Loaded only where simulation or rendering happens, never in the API process itself
+_HEAVY_MODULES = ("qiskit", "qiskit_aer", "matplotlib")
+
+
+def observe_cache(cache: str, hit: bool) -> None:
+	CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def observe_task_timings(timings: Dict[str, Any], sim_method: Optional[str]) -> None:
+	for name, value in timings.items():
+		if name.endswith("_s") and name != "total_s":
+			TASK_PHASE_SECONDS.labels(name[:-2], sim_method or "automatic").observe(value)
+
+
+_peak_required_mb = 0.0
+
+
+def observe_memory(required_memory_mb: Optional[float] = None) -> None:
+	global _peak_required_mb
+	if required_memory_mb and required_memory_mb > _peak_required_mb:
+		_peak_required_mb = required_memory_mb
+		SIMULATOR_MEMORY_MB.set(required_memory_mb)
+	# ru_maxrss is in KiB on Linux
+	PROCESS_MAX_RSS_BYTES.set(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+
+
+def _rss_bytes() -> int:
+	try:
+		with open("/proc/self/statm") as fh:
+			return int(fh.read().split()[1]) * resource.getpagesize()
+	except (OSError, IndexError, ValueError):
+		# Not Linux: fall back to the peak
+		return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def report_startup(role: str, phases: Dict[str, float]) -> None:
+	"""Record and log how long this process took to start and how much memory it holds.
+
+	``phases`` maps phase names to seconds; ``ready`` counts from ``app.IMPORT_STARTED``.
+	"""
+	rss = _rss_bytes()
+	for phase, seconds in phases.items():
+		STARTUP_SECONDS.labels(role, phase).set(seconds)
+	STARTUP_RSS_BYTES.labels(role).set(rss)
+	logger.info("process_started", extra={
+		"role": role,
+		"pid": os.getpid(),
+		**{f"{phase}_s": round(seconds, 3) for phase, seconds in phases.items()},
+		"rss_mb": round(rss / 2 ** 20, 1),
+		"max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+		"heavy_modules": [name for name in _HEAVY_MODULES if name in sys.modules],
+	})
+
+
+class HTTPMetricsMiddleware:
+	"""ASGI middleware recording API latency per route template.
+
+	Requests are timed up to the start of the response, so event streams count
+	their time to first byte rather than their whole lifetime.
+	"""
+
+	def __init__(self, app):
+		self.app = app
+
+	async def __call__(self, scope, receive, send):
+		if scope["type"] != "http":
+			await self.app(scope, receive, send)
+			return
+		started = time.perf_counter()
+		recorded = False
+
+		def observe(status: int) -> None:
+			nonlocal recorded
+			recorded = True
+			route = getattr(scope.get("route"), "path", "unmatched")
+			HTTP_REQUEST_SECONDS.labels(scope["method"], route, str(status)).observe(time.perf_counter() - started)
+
+		async def send_wrapper(message):
+			if message["type"] == "http.response.start" and not recorded:
+				observe(message["status"])
+			await send(message)
+
+		HTTP_REQUESTS_IN_PROGRESS.inc()
+		try:
+			await self.app(scope, receive, send_wrapper)
+		except Exception:
+			if not recorded:
+				observe(500)
+			raise
+		finally:
+			HTTP_REQUESTS_IN_PROGRESS.dec()
+
+
+class QueueDepthCollector:
+	"""Reports the length of every task queue at scrape time."""
+
+	def __init__(self, queues: Iterable[str]):
+		self.queues = list(queues)
+		self._client: Optional[redis.Redis] = None
+
+	def _redis(self) -> redis.Redis:
+		# The Celery broker may live on a different Redis than the app's cache
+		if self._client is None:
+			self._client = redis.Redis.from_url(
+				settings.celery_broker_url,
+				socket_timeout=settings.redis_socket_timeout,
+				socket_connect_timeout=settings.redis_socket_timeout,
+			)
+		return self._client
+
+	@staticmethod
+	def _family() -> GaugeMetricFamily:
+		return GaugeMetricFamily("quantum_queue_depth", "Messages waiting per queue", labels=["queue"])
+
+	def describe(self):
+		# Lets the registry check names without a Redis round trip at registration
+		return [self._family()]
+
+	def depths(self) -> Dict[str, int]:
+		"""Messages waiting per queue, and in the micro-batch list; raises ``RedisError``."""
+		from .microbatch import QUEUE_KEY
+		from .redis_client import get_redis
+
+		pipe = self._redis().pipeline()
+		for name in self.queues:
+			pipe.llen(name)
+		depths = dict(zip(self.queues, pipe.execute()))
+		depths["microbatch"] = get_redis().llen(QUEUE_KEY)
+		return depths
+
+	def collect(self):
+		family = self._family()
+		try:
+			for name, depth in self.depths().items():
+				family.add_metric([name], depth)
+		except RedisError:
+			logger.warning("queue_depth_unavailable", exc_info=True)
+		yield family
+
+
+def build_registry(extra_collectors: Iterable[Any] = ()) -> CollectorRegistry:
+	if _MULTIPROC_DIR:
+		registry = CollectorRegistry()
+		multiprocess.MultiProcessCollector(registry)
+	else:
+		registry = REGISTRY
+	for collector in extra_collectors:
+		registry.register(collector)
+	return registry
+
+
+def render(registry: CollectorRegistry) -> bytes:
+	return generate_latest(registry)
+
+
+def reset_multiprocess_dir() -> None:
+	"""Drop samples left by a previous run; call once in the parent before forking."""
+	if _MULTIPROC_DIR:
+		for path in glob.glob(os.path.join(_MULTIPROC_DIR, "*.db")):
+			os.remove(path)
+
+
+def mark_process_dead(pid: int) -> None:
+	if _MULTIPROC_DIR:
+		multiprocess.mark_process_dead(pid)
+
+
+def serve(port: int) -> None:
+	"""Expose this process's (or, in multiprocess mode, every process's) metrics over HTTP."""
+	start_http_server(port, registry=build_registry())
+	logger.info("metrics_server_started", extra={"port": port, "multiprocess": bool(_MULTIPROC_DIR)})
@@ -0,0 +1,262 @@
+"""Opt-in micro-batching consumer for small circuits.
+
+With ``MICROBATCH_ENABLED=true`` the API pushes small, loop-free circuits onto
+a Redis list instead of publishing one Celery message each. This consumer
+drains up to ``MICROBATCH_MAX_SIZE`` ids (waiting at most
+``MICROBATCH_MAX_WAIT_MS`` after the first one), simulates them together in one
+Aer ``run()`` and writes every result back with a single bulk UPDATE.
+
+Claimed ids are moved to a per-consumer processing list, so ids left behind
+by a crashed consumer are re-queued when it restarts.
+
+Run with: ``python -m app.microbatch``
+"""
+import logging
+import os
+import re
+import socket
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import select, update
+
+from .cache import canonical_qasm, result_key, store_result, release_inflight
+from .config import settings
+from .db import SessionLocal, Task, TaskStatus
+from .events import publish_task_event
+from . import metrics
+from .redis_client import get_async_redis, get_redis
+from .results import split_for_storage
+from .stats import record_transition
+
+logger = logging.getLogger("microbatch")
+
+QUEUE_KEY = "microbatch:tasks"
+_PROCESSING_PREFIX = "microbatch:processing:"
+
+# Cheap, parse-free size checks used by the API to pick candidates
+_MAX_CANDIDATE_CHARS = 20_000
+_QUBIT_ARRAY_RE = re.compile(r"\bqubit\[(\d+)\]\w+")
+_QUBIT_SINGLE_RE = re.compile(r"\bqubit \w+")
+_QREG_RE = re.compile(r"\bqreg \w+\[(\d+)\]")
+_LOOP_RE = re.compile(r"\b(for|while)\b")
+
+
+def estimate_num_qubits(qasm: str) -> Optional[int]:
+	"""Count declared qubits from the QASM text; ``None`` if nothing is declared."""
+	text = canonical_qasm(qasm)
+	arrays = [int(n) for n in _QUBIT_ARRAY_RE.findall(text)] + [int(n) for n in _QREG_RE.findall(text)]
+	singles = len(_QUBIT_SINGLE_RE.findall(text))
+	if not arrays and not singles:
+		return None
+	return sum(arrays) + singles
+
+
+def is_candidate(qasm: str, shots: int, seed: Optional[int] = None) -> bool:
+	"""True for circuits small enough to benefit from being simulated in a batch.
+
+	Seeded tasks are excluded: Aer offsets the seed per experiment in a
+	multi-circuit run, so their counts would depend on the batch they land in.
+	"""
+	if not settings.microbatch_enabled or len(qasm) > _MAX_CANDIDATE_CHARS:
+		return False
+	if seed is not None or shots > settings.shots_per_shard:
+		return False
+	if _LOOP_RE.search(qasm):
+		return False
+	num_qubits = estimate_num_qubits(qasm)
+	return num_qubits is not None and num_qubits <= settings.microbatch_max_qubits
+
+
+async def enqueue(task_ids: Sequence[str]) -> None:
+	await get_async_redis().rpush(QUEUE_KEY, *task_ids)
+
+
+def _decode(value) -> str:
+	return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def claim_batch(processing_key: str) -> List[str]:
+	"""Block for the first id, then gather more until the size or time budget is hit."""
+	r = get_redis()
+	first = r.blmove(QUEUE_KEY, processing_key, 1.0, src="LEFT", dest="RIGHT")
+	if first is None:
+		return []
+	ids = [_decode(first)]
+	deadline = time.monotonic() + settings.microbatch_max_wait_ms / 1000.0
+
+	while len(ids) < settings.microbatch_max_size:
+		pipe = r.pipeline(transaction=False)
+		for _ in range(settings.microbatch_max_size - len(ids)):
+			pipe.lmove(QUEUE_KEY, processing_key, src="LEFT", dest="RIGHT")
+		got = [_decode(x) for x in pipe.execute() if x is not None]
+		ids.extend(got)
+
+		remaining = deadline - time.monotonic()
+		if len(ids) >= settings.microbatch_max_size or remaining <= 0:
+			break
+		if not got:
+			nxt = r.blmove(QUEUE_KEY, processing_key, remaining, src="LEFT", dest="RIGHT")
+			if nxt is None:
+				break
+			ids.append(_decode(nxt))
+	return ids
+
+
+def requeue_processing(processing_key: str) -> int:
+	"""Put ids left in our processing list (e.g. after a crash) back at the queue head."""
+	r = get_redis()
+	moved = 0
+	while r.lmove(processing_key, QUEUE_KEY, src="RIGHT", dest="LEFT") is not None:
+		moved += 1
+	return moved
+
+
+def execute_batch(task_ids: Sequence[str]) -> None:
+	from .compression import stored_qasm
+	from .quantum import load_stored_circuit, run_circuits
+
+	session = SessionLocal()
+	try:
+		tasks = session.execute(
+			select(Task.id, Task.status, Task.qc_qasm3, Task.qc_qasm3_zst, Task.qc_qpy, Task.circuit_hash, Task.sim_method, Task.shots, Task.submitted_at)
+			# RUNNING covers ids re-queued after this consumer crashed mid-batch
+			.where(Task.id.in_(task_ids), Task.status.in_((TaskStatus.PENDING, TaskStatus.RUNNING)))
+		).all()
+		if not tasks:
+			return
+		session.execute(
+			update(Task).where(Task.id.in_([t.id for t in tasks])).values(status=TaskStatus.RUNNING)
+		)
+		session.commit()
+		record_transition(TaskStatus.PENDING, TaskStatus.RUNNING, sum(t.status == TaskStatus.PENDING for t in tasks))
+		for t in tasks:
+			publish_task_event(t.id, TaskStatus.RUNNING)
+
+		updates: List[Dict] = []
+		runnable = []
+		timings: Dict[str, Dict] = {}
+		now = datetime.utcnow()
+		for t in tasks:
+			timings[t.id] = {"queue_wait_s": max((now - t.submitted_at).total_seconds(), 0.0)}
+			started = time.perf_counter()
+			try:
+				runnable.append((t, load_stored_circuit(t.qc_qpy if t.qc_qpy is not None else stored_qasm(t.qc_qasm3_zst, t.qc_qasm3))))
+			except Exception as exc:  # noqa: BLE001
+				updates.append({"id": t.id, "status": TaskStatus.ERROR, "error_msg": str(exc)})
+			timings[t.id]["parse_s"] = time.perf_counter() - started
+
+		# One Aer run per (simulation method, shots) present in the batch
+		groups: Dict[tuple, List] = defaultdict(list)
+		for t, qc in runnable:
+			groups[(t.sim_method or "automatic", t.shots or settings.num_shots)].append((t, qc))
+		for (method, shots), group in groups.items():
+			stats: Dict = {}
+			try:
+				all_counts = run_circuits(
+					[qc for _, qc in group], [t.circuit_hash for t, _ in group], method=method, shots=shots, stats=stats
+				)
+			except RuntimeError:
+				# One bad circuit fails the whole job; fall back to isolated Celery runs
+				logger.exception("microbatch_run_failed", extra={"count": len(group), "sim_method": method})
+				_fallback_to_celery(session, [t.id for t, _ in group])
+				continue
+			metrics.observe_memory(stats.get("required_memory_mb"))
+			for (t, _), counts in zip(group, all_counts):
+				# The job's transpile and simulate times are shared evenly by its tasks
+				timings[t.id].update(
+					transpile_s=stats["transpile_s"] / len(group),
+					simulate_s=stats["simulate_s"] / len(group),
+					batch_size=len(group),
+				)
+				started = time.perf_counter()
+				result_json, result_blob = split_for_storage(counts, settings.result_inline_max_outcomes)
+				timings[t.id]["db_write_s"] = time.perf_counter() - started
+				updates.append({"id": t.id, "status": TaskStatus.COMPLETED, "result_json": result_json, "result_blob": result_blob})
+
+		# Drop results of tasks cancelled while the batch ran
+		cancelled = set(session.scalars(
+			select(Task.id).where(Task.id.in_([u["id"] for u in updates]), Task.status == TaskStatus.CANCELLED)
+		)) if updates else set()
+		updates = [u for u in updates if u["id"] not in cancelled]
+		if updates:
+			now = datetime.utcnow()
+			submitted = {t.id: t.submitted_at for t in tasks}
+			for u in updates:
+				# Timings go in with the result, so db_write_s covers encoding it but not the UPDATE
+				timings[u["id"]]["total_s"] = (now - submitted[u["id"]]).total_seconds()
+				u["timings_json"] = timings[u["id"]]
+			# ORM bulk UPDATE by primary key: one executemany round trip
+			session.execute(update(Task), updates)
+			session.commit()
+			done = [u["id"] for u in updates if u["status"] == TaskStatus.COMPLETED]
+			record_transition(TaskStatus.RUNNING, TaskStatus.COMPLETED, len(done), [timings[i]["total_s"] for i in done])
+			record_transition(TaskStatus.RUNNING, TaskStatus.ERROR, len(updates) - len(done))
+			sim_methods = {t.id: t.sim_method for t in tasks}
+			for u in updates:
+				publish_task_event(
+					u["id"], u["status"], result=u.get("result_json"), message=u.get("error_msg"),
+					truncated=u.get("result_blob") is not None,
+				)
+				metrics.observe_task_timings(timings[u["id"]], sim_methods[u["id"]])
+				metrics.TASK_LATENCY_SECONDS.labels("microbatch", u["status"]).observe(timings[u["id"]]["total_s"])
+
+		completed = {u["id"] for u in updates if u["status"] == TaskStatus.COMPLETED}
+		finished = {u["id"] for u in updates}
+		for t in tasks:
+			# Tasks sent back to Celery are still in flight; the worker that runs them releases them
+			if t.circuit_hash and t.id in finished:
+				key = result_key(t.circuit_hash, t.shots or settings.num_shots)
+				if t.id in completed:
+					store_result(key, t.id)
+				release_inflight(key, t.id)
+		logger.info("microbatch_completed", extra={"count": len(tasks), "completed": len(completed)})
+	finally:
+		session.close()
+
+
+def _fallback_to_celery(session, task_ids: Sequence[str]) -> None:
+	from .celery_app import QUEUE_INTERACTIVE
+	from .dispatch import task_signature
+
+	requeued = session.execute(
+		update(Task).where(Task.id.in_(task_ids), Task.status == TaskStatus.RUNNING).values(status=TaskStatus.PENDING)
+	)
+	session.commit()
+	record_transition(TaskStatus.RUNNING, TaskStatus.PENDING, requeued.rowcount)
+	for task_id in task_ids:
+		# Micro-batch candidates are small circuits by construction
+		task_signature(task_id, QUEUE_INTERACTIVE).apply_async()
+
+
+def main() -> None:
+	from .celery_app import cpu_budget
+	from .quantum import set_thread_budget
+
+	logging.basicConfig(level=settings.log_level)
+	# The batcher runs one job at a time, so each job may use the whole budget
+	set_thread_budget(cpu_budget())
+	processing_key = f"{_PROCESSING_PREFIX}{socket.gethostname()}"
+	recovered = requeue_processing(processing_key)
+	logger.info("microbatch_started", extra={"processing_key": processing_key, "recovered": recovered, "pid": os.getpid()})
+	if settings.worker_metrics_port:
+		metrics.serve(settings.worker_metrics_port)
+
+	while True:
+		try:
+			ids = claim_batch(processing_key)
+			if not ids:
+				continue
+			execute_batch(ids)
+			get_redis().delete(processing_key)
+		except Exception:  # noqa: BLE001
+			# Put the claimed ids back at the queue head and retry after a pause
+			logger.exception("microbatch_error")
+			time.sleep(1.0)
+			requeue_processing(processing_key)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,121 @@
+"""Process pool for CPU-bound work on the API side (QASM parsing, diagram rendering).
+
+Keeps the event loop free and sidesteps the GIL. Children are started with
+``spawn`` so they never inherit the API's event loop or open sockets.
+"""
+import asyncio
+import contextlib
+import importlib
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from .config import settings
+
+logger = logging.getLogger("process_pool")
+
+_pool: Optional[ProcessPoolExecutor] = None
+# Semaphores by name, made for the running event loop since asyncio primitives cannot
+# be shared between loops. "slots" has one per pool worker: a job is handed to the pool
+# only when a child is free, so its timeout measures the run and not the wait behind
+# other jobs. "bulk" caps the slots bulk jobs hold at once (see bulk_slots).
+_semaphores: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = {}
+
+
+def _get_pool() -> ProcessPoolExecutor:
+	global _pool
+	if _pool is None:
+		_pool = ProcessPoolExecutor(
+			max_workers=settings.cpu_pool_workers,
+			mp_context=multiprocessing.get_context("spawn"),
+		)
+	return _pool
+
+
+def _warm() -> None:
+	from . import quantum  # noqa: F401  (Qiskit import dominates a child's first task)
+
+
+def warm_pool() -> None:
+	"""Start the children and import Qiskit in them ahead of the first request."""
+	pool = _get_pool()
+	for _ in range(settings.cpu_pool_workers):
+		pool.submit(_warm)
+
+
+def shutdown_pool() -> None:
+	global _pool
+	if _pool is not None:
+		_pool.shutdown(wait=False, cancel_futures=True)
+		_pool = None
+
+
+def _recycle_pool(pool: ProcessPoolExecutor) -> None:
+	"""Kill ``pool``'s children and replace it; the executor cannot cancel a running call.
+
+	Other jobs running on it fail with ``BrokenProcessPool`` and are retried on the new pool.
+	"""
+	global _pool
+	if _pool is not pool:
+		return
+	_pool = None
+	for process in list((pool._processes or {}).values()):
+		process.terminate()
+	pool.shutdown(wait=False, cancel_futures=True)
+	warm_pool()
+
+
+def bulk_slots() -> int:
+	"""Pool workers bulk jobs may use at once: all but one, which is left to single submissions."""
+	return max(1, settings.cpu_pool_workers - 1)
+
+
+def _semaphore(name: str, size: int) -> asyncio.Semaphore:
+	loop = asyncio.get_running_loop()
+	entry = _semaphores.get(name)
+	if entry is None or entry[0] is not loop:
+		entry = _semaphores[name] = (loop, asyncio.Semaphore(size))
+	return entry[1]
+
+
+def _call(target: str, *args: Any) -> Any:
+	module, _, name = target.partition(":")
+	return getattr(importlib.import_module(module), name)(*args)
+
+
+async def run_in_process(fn: Union[Callable[..., Any], str], *args: Any, timeout: float, bulk: bool = False) -> Any:
+	"""Run ``fn(*args)`` in the pool; raises ``asyncio.TimeoutError`` after ``timeout`` seconds.
+
+	The timeout starts once a child is free to run the job. A job that times
+	out has its child killed (the pool is recycled) so it stops holding a worker.
+	``bulk`` jobs (batch compilation) share :func:`bulk_slots` workers, so they
+	never hold up single submissions when the pool has more than one worker.
+	``fn`` must be a picklable module-level function, or its ``"module:function"``
+	name: then only the child imports the module, which keeps Qiskit and
+	Matplotlib out of the API process.
+	"""
+	if isinstance(fn, str):
+		fn, args = _call, (fn, *args)
+	async with _semaphore("bulk", bulk_slots()) if bulk else contextlib.nullcontext():
+		async with _semaphore("slots", settings.cpu_pool_workers):
+			return await _run(fn, args, timeout)
+
+
+async def _run(fn: Callable[..., Any], args: tuple, timeout: float) -> Any:
+	loop = asyncio.get_running_loop()
+	for attempt in range(2):
+		pool = _get_pool()
+		try:
+			return await asyncio.wait_for(loop.run_in_executor(pool, fn, *args), timeout=timeout)
+		except asyncio.TimeoutError:
+			logger.warning("process_pool_timeout", extra={"timeout_s": timeout})
+			_recycle_pool(pool)
+			raise
+		except BrokenProcessPool:
+			# A child died (e.g. OOM, or killed after another job's timeout); retry once on a fresh pool
+			logger.warning("process_pool_broken", extra={"attempt": attempt})
+			if _pool is pool:
+				shutdown_pool()
+	raise RuntimeError("Process pool unavailable")
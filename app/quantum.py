@@ -1,10 +1,141 @@
-from typing import Dict, Tuple
-from qiskit import QuantumCircuit, transpile
+import hashlib
+import io
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+from qiskit import QuantumCircuit, qpy, transpile
+from qiskit.circuit import ControlFlowOp, ForLoopOp
 from qiskit.qasm3 import loads as qasm3_loads, dumps as qasm3_dumps
+from qiskit.quantum_info import SparsePauliOp
 from qiskit_aer import AerSimulator
+from qiskit_aer.library import SaveExpectationValue
 
+from .compression import compress_qasm
 from .config import settings
 
+
+class _LRUCache:
+    """Small thread-safe LRU with hit/miss counters."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[tuple, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: tuple, value: object) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._data), "maxsize": self.maxsize}
+
+
+# Per-process state: each Celery worker child keeps its simulators and compiled circuits
+_simulators: Dict[str, AerSimulator] = {}
+_simulator_lock = threading.Lock()
+_transpile_cache = _LRUCache(settings.transpile_cache_size)
+# Threads each simulation in this process may use; the Celery worker sets its share of
+# the CPU budget before forking (see app.celery_app). Aer's own default is every core.
+_thread_budget = 1
+# Set by prefork Celery workers, whose processes share one budget by what they run:
+# lease(wanted) returns how many of ``wanted`` threads this process may use now
+_thread_lease: Optional[Callable[[int], int]] = None
+
+
+def set_thread_budget(threads: int) -> None:
+    global _thread_budget
+    _thread_budget = max(1, threads)
+    for simulator in _simulators.values():
+        simulator.set_options(max_parallel_threads=_thread_budget)
+
+
+def thread_budget() -> int:
+    return _thread_budget
+
+
+def set_thread_lease(lease: Optional[Callable[[int], int]]) -> None:
+    global _thread_lease
+    _thread_lease = lease
+
+
+def aer_parallelism(num_qubits: int, experiments: int = 1) -> Dict[str, int]:
+    """Aer threading options for one ``run()`` within this process's thread budget.
+
+    Circuits of ``AER_PARALLEL_MIN_QUBITS`` or more use the whole budget to
+    update the state and run their experiments one after another. Smaller
+    ones run single-threaded, so a pool of small jobs uses one core each, unless
+    the job has several experiments (micro-batches, sweeps), which then share
+    the budget. Under a thread lease, a run gets only what the worker's
+    other processes leave free, and at least one thread.
+    """
+    threads = _thread_budget
+    if num_qubits >= settings.aer_parallel_min_qubits:
+        if _thread_lease is not None:
+            threads = _thread_lease(threads)
+        return {"max_parallel_threads": threads, "max_parallel_experiments": 1, "max_parallel_shots": 1}
+    parallel = min(experiments, threads)
+    if _thread_lease is not None:
+        parallel = _thread_lease(parallel)
+    return {"max_parallel_threads": parallel, "max_parallel_experiments": parallel, "max_parallel_shots": 1}
+
+
+def get_simulator(method: str = "automatic") -> AerSimulator:
+    """Return this process's long-lived simulator for ``method``, creating it on first use."""
+    simulator = _simulators.get(method)
+    if simulator is None:
+        with _simulator_lock:
+            simulator = _simulators.get(method)
+            if simulator is None:
+                # Aer refuses circuits over the limit instead of letting the OS kill the worker
+                simulator = AerSimulator(
+                    method=method, max_memory_mb=settings.max_memory_mb, max_parallel_threads=_thread_budget,
+                )
+                _simulators[method] = simulator
+    return simulator
+
+
+def transpile_cache_stats() -> Dict[str, int]:
+    return _transpile_cache.stats()
+
+
+def circuit_fingerprint(qc: QuantumCircuit) -> str:
+    """Content hash of a circuit, used when the caller has no precomputed key."""
+    return hashlib.sha256(circuit_to_qpy(qc)).hexdigest()
+
+
+def _backend_key(simulator: AerSimulator) -> str:
+    return f"{simulator.name}|{simulator.options.method}|opt0"
+
+
+def transpile_cached(qc: QuantumCircuit, simulator: AerSimulator, circuit_key: Optional[str] = None) -> QuantumCircuit:
+    """Transpile for ``simulator``, memoized by circuit hash and backend configuration."""
+    key = (circuit_key or circuit_fingerprint(qc), _backend_key(simulator))
+    tqc = _transpile_cache.get(key)
+    if tqc is None:
+        tqc = transpile(qc, simulator, optimization_level=0)  # no smart rewrites
+        _transpile_cache.put(key, tqc)
+    return tqc
+
 def circuit_from_qasm3(qasm3_str: str) -> QuantumCircuit:
     try:
         qc = qasm3_loads(qasm3_str)
@@ -12,6 +143,308 @@ def circuit_from_qasm3(qasm3_str: str) -> QuantumCircuit:
         raise ValueError(f"QASM3 parse error: {e}")  # surfaces real parser error
     return qc
 
+def circuit_to_qpy(qc: QuantumCircuit) -> bytes:
+    buf = io.BytesIO()
+    qpy.dump(qc, buf)
+    return buf.getvalue()
+
+
+def circuit_from_qpy(data: bytes) -> QuantumCircuit:
+    try:
+        return qpy.load(io.BytesIO(data))[0]
+    except Exception as e:
+        raise ValueError(f"QPY load error: {e}")
+
+
+def load_stored_circuit(stored: Union[bytes, str]) -> QuantumCircuit:
+    """Load a circuit from its stored QPY bytes, or from QASM3 text for older rows."""
+    if isinstance(stored, (bytes, memoryview)):
+        return circuit_from_qpy(bytes(stored))
+    return circuit_from_qasm3(stored)
+
+
+# Exact Aer methods we choose between; "automatic" leaves the choice to Aer
+SIM_METHODS = ("statevector", "stabilizer", "matrix_product_state")
+
+# Gates the stabilizer method simulates exactly (rz only at multiples of pi/2)
+_CLIFFORD_GATES = frozenset({
+    "id", "x", "y", "z", "h", "s", "sdg", "sx", "sxdg",
+    "cx", "cy", "cz", "swap", "ecr", "pauli",
+})
+_NON_GATE_OPS = frozenset({"measure", "reset", "delay", "store", "break_loop", "continue_loop"})
+
+
+def _is_clifford(op) -> bool:
+    if op.name in _CLIFFORD_GATES or op.name in _NON_GATE_OPS:
+        return True
+    if op.name == "rz":
+        try:
+            quarter_turns = float(op.params[0]) / (math.pi / 2)
+        except (TypeError, ValueError):
+            return False  # unbound parameter
+        return math.isclose(quarter_turns, round(quarter_turns), abs_tol=1e-9)
+    return False
+
+
+def _walk_ops(qc: QuantumCircuit, qubit_map: Sequence[int], multiplicity: int, acc: Dict) -> None:
+    for instr in qc.data:
+        op = instr.operation
+        qubits = [qubit_map[qc.find_bit(q).index] for q in instr.qubits]
+        if isinstance(op, ControlFlowOp):
+            acc["dynamic"] = True
+            # Loop bodies count once per iteration; while-loops and both if/else
+            # branches are counted once (an estimate, not a bound)
+            reps = len(op.params[0]) if isinstance(op, ForLoopOp) else 1
+            for block in op.blocks:
+                _walk_ops(block, qubits, multiplicity * reps, acc)
+            continue
+        if op.name == "barrier":
+            continue
+        if op.name == "reset":
+            acc["dynamic"] = True
+        acc["num_ops"] += multiplicity
+        if not _is_clifford(op):
+            acc["clifford"] = False
+        if len(qubits) >= 2:
+            acc["spans"].append((min(qubits), max(qubits), multiplicity))
+
+
+def analyze_circuit(qc: QuantumCircuit) -> Dict:
+    """Static summary of ``qc`` used to pick a simulation method.
+
+    ``max_bond_log2`` bounds log2 of the MPS bond dimension: each entangling
+    gate across a cut can at most quadruple the bond there, and no bond exceeds
+    the smaller side of the cut.
+    """
+    acc = {"num_ops": 0, "clifford": True, "dynamic": False, "spans": []}
+    _walk_ops(qc, range(qc.num_qubits), 1, acc)
+
+    n = qc.num_qubits
+    crossings = [0] * max(n - 1, 0)
+    for lo, hi, mult in acc["spans"]:
+        for cut in range(lo, hi):
+            crossings[cut] += mult
+    max_bond_log2 = max(
+        (min(2 * c, cut + 1, n - cut - 1) for cut, c in enumerate(crossings)),
+        default=0,
+    )
+    return {
+        "num_qubits": n,
+        "num_ops": acc["num_ops"],
+        "num_multi_qubit_ops": sum(mult for _, _, mult in acc["spans"]),
+        "clifford": acc["clifford"],
+        "dynamic": acc["dynamic"],
+        "depth": qc.depth(),
+        "max_bond_log2": max_bond_log2,
+    }
+
+
+def estimate_memory_mb(analysis: Dict, method: str) -> float:
+    """Rough peak simulator memory for ``method``, in MB.
+
+    statevector: 2^n complex amplitudes of 16 bytes; matrix_product_state: two
+    chi x chi complex tensors per qubit, chi bounded by ``max_bond_log2``;
+    stabilizer: a 2n x 2n bit tableau.
+    """
+    n = max(analysis["num_qubits"], 1)
+    if method == "statevector":
+        size = 16.0 * 2.0 ** n
+    elif method == "matrix_product_state":
+        size = 16.0 * 2 * n * 4.0 ** analysis["max_bond_log2"]
+    else:
+        size = (2.0 * n) ** 2 / 8
+    return size / 2 ** 20
+
+
+def memory_limit_mb() -> int:
+    """The most memory any worker tier gives a single task."""
+    return max(settings.max_memory_mb, settings.heavy_max_memory_mb)
+
+
+def method_costs(analysis: Dict) -> Dict[str, float]:
+    """Rough operation counts per method for the methods able to run the circuit.
+
+    statevector: every op touches 2^n amplitudes;
+    stabilizer: O(n) per op on the tableau, Clifford circuits only;
+    matrix_product_state: O(chi^3) per op with chi bounded by ``max_bond_log2``.
+    Methods whose :func:`estimate_memory_mb` exceeds every worker tier are left out.
+    """
+    n = analysis["num_qubits"]
+    ops = max(analysis["num_ops"], 1)
+    costs = {"matrix_product_state": float(ops) * max(n, 1) * 2.0 ** (3 * analysis["max_bond_log2"])}
+    if n <= settings.statevector_max_qubits:
+        costs["statevector"] = float(ops) * 2.0 ** n
+    if analysis["clifford"]:
+        costs["stabilizer"] = float(ops) * max(n, 1)
+    limit = memory_limit_mb()
+    return {method: cost for method, cost in costs.items() if estimate_memory_mb(analysis, method) <= limit}
+
+
+def select_method(analysis: Dict, requested: Optional[str] = None) -> Tuple[str, float]:
+    """Pick the cheapest exact method, or validate an explicitly requested one.
+
+    Returns ``(method, estimated_cost)``; raises ``ValueError`` if the requested
+    method cannot run the circuit.
+    """
+    costs = method_costs(analysis)
+    if requested is None or requested == "automatic":
+        if not costs:
+            raise ValueError(
+                f"Circuit needs more than {memory_limit_mb()} MB of simulator memory with every method"
+            )
+        method = min(costs, key=costs.__getitem__)
+        return method, costs[method]
+    if requested not in SIM_METHODS:
+        raise ValueError(f"Unknown simulation method: {requested}")
+    if requested not in costs:
+        if requested == "stabilizer" and not analysis["clifford"]:
+            raise ValueError("stabilizer method requires a Clifford-only circuit")
+        if requested == "statevector" and analysis["num_qubits"] > settings.statevector_max_qubits:
+            raise ValueError(
+                f"statevector method supports at most {settings.statevector_max_qubits} qubits "
+                f"(circuit has {analysis['num_qubits']})"
+            )
+        raise ValueError(
+            f"{requested} method would need about {estimate_memory_mb(analysis, requested):.0f} MB "
+            f"of simulator memory (limit {memory_limit_mb()} MB)"
+        )
+    return requested, costs[requested]
+
+
+def estimate_task_cost(analysis: Dict, sim_cost: float, shots: int) -> float:
+    """Estimated work for a whole task, in the same units as :func:`method_costs`.
+
+    Aer evolves the state once and samples all shots from it, unless the
+    circuit is dynamic (control flow, resets): then every shot re-runs the
+    circuit. Loop bodies are already unrolled into ``sim_cost`` via the op
+    count, so depth and loop iterations both scale the estimate.
+    """
+    evolutions = shots if analysis["dynamic"] else 1
+    return sim_cost * evolutions + float(shots) * max(analysis["num_qubits"], 1)
+
+
+def estimate_expectation_cost(analysis: Dict, sim_cost: float, terms: int) -> float:
+    """Estimated work for exact expectation values of ``terms`` Pauli terms.
+
+    One evolution without sampling; each term is one more pass over the
+    state, about the cost of one gate (``sim_cost`` per op).
+    """
+    return sim_cost * (1 + terms / max(analysis["num_ops"], 1))
+
+
+def _compile(
+    qc: QuantumCircuit, qasm3_str: str, analysis: Dict, method: Optional[str], cost: Callable[[Dict, float], float],
+) -> Dict:
+    chosen, sim_cost = select_method(analysis, method)
+    return {
+        "qc_qasm3_zst": compress_qasm(qasm3_str),
+        "qc_qpy": circuit_to_qpy(qc),
+        "sim_method": chosen,
+        "sim_cost": sim_cost,
+        "cost_estimate": cost(analysis, sim_cost),
+        "memory_mb": estimate_memory_mb(analysis, chosen),
+    }
+
+
+def compile_submission(qasm3_str: str, method: Optional[str] = None, shots: Optional[int] = None) -> Dict:
+    """Validate a submitted circuit and prepare it for execution.
+
+    Runs in the API's process pool and returns the task's ``qc_qasm3_zst``, ``qc_qpy``,
+    ``sim_method``, ``sim_cost`` and ``cost_estimate``, plus the simulator
+    ``memory_mb`` estimate used for routing; raises ``ValueError`` for circuits
+    that can never execute (or cannot run on the requested method, or would
+    not fit in memory), so they are rejected before anything is queued.
+    """
+    qc = circuit_from_qasm3(qasm3_str)
+    if qc.parameters:
+        names = ", ".join(p.name for p in qc.parameters)
+        raise ValueError(f"circuit has unbound input parameters ({names}); submit it as a sweep")
+    return _compile(
+        qc, qasm3_str, analyze_circuit(qc), method,
+        lambda analysis, sim_cost: estimate_task_cost(analysis, sim_cost, shots or settings.num_shots),
+    )
+
+
+def compile_submissions(items: Sequence[Tuple[str, Optional[str], Optional[int]]]) -> List[Union[Dict, ValueError]]:
+    """:func:`compile_submission` for ``(qasm3_str, method, shots)`` items, in one pool job.
+
+    Stops at the first invalid circuit, whose ``ValueError`` ends the returned list.
+    """
+    results: List[Union[Dict, ValueError]] = []
+    for qasm3_str, method, shots in items:
+        try:
+            results.append(compile_submission(qasm3_str, method, shots))
+        except ValueError as exc:
+            results.append(exc)
+            break
+    return results
+
+
+def compile_sweep(
+    qasm3_str: str, bindings: Dict[str, List[float]], method: Optional[str] = None, shots: Optional[int] = None,
+) -> Dict:
+    """:func:`compile_submission` for a parameterized template and its ``bindings`` columns.
+
+    The bindings must set exactly the circuit's input parameters. The cost
+    estimate covers every binding; ``parameter_binds`` is added to the columns.
+    """
+    qc = circuit_from_qasm3(qasm3_str)
+    names = sorted(p.name for p in qc.parameters)
+    if not names:
+        raise ValueError("circuit has no input parameters to sweep")
+    if sorted(bindings) != names:
+        raise ValueError(f"bindings must set exactly the circuit's parameters ({', '.join(names)})")
+    runs = len(next(iter(bindings.values())))
+    compiled = _compile(
+        qc, qasm3_str, analyze_circuit(qc), method,
+        lambda analysis, sim_cost: runs * estimate_task_cost(analysis, sim_cost, shots or settings.num_shots),
+    )
+    compiled["parameter_binds"] = bindings
+    return compiled
+
+
+def pauli_sum(terms: Dict[str, float], num_qubits: int) -> SparsePauliOp:
+    """The observable ``{label: coefficient}`` as an operator on ``num_qubits`` qubits.
+
+    Labels are Qiskit-ordered: the rightmost character acts on qubit 0.
+    """
+    try:
+        op = SparsePauliOp.from_list([(label.upper(), float(coeff)) for label, coeff in terms.items()])
+    except Exception as e:
+        raise ValueError(f"invalid Pauli sum: {e}")
+    if op.num_qubits != num_qubits:
+        raise ValueError(f"acts on {op.num_qubits} qubits but the circuit has {num_qubits}")
+    return op
+
+
+def compile_expectation(qasm3_str: str, observables: List[Dict[str, float]], method: Optional[str] = None) -> Dict:
+    """:func:`compile_submission` for exact expectation values of Pauli-sum ``observables``.
+
+    Final measurements are ignored. Circuits that measure, reset or branch
+    mid-circuit are rejected: they do not end in a single state. The cost
+    estimate is one evolution plus a pass over the state per Pauli term;
+    ``observables`` is added to the columns.
+    """
+    qc = circuit_from_qasm3(qasm3_str)
+    if qc.parameters:
+        raise ValueError("circuit has unbound input parameters")
+    bare = qc.remove_final_measurements(inplace=False)
+    analysis = analyze_circuit(bare)
+    if analysis["dynamic"] or any(instr.operation.name == "measure" for instr in bare.data):
+        raise ValueError("expectation values need a circuit without mid-circuit measurements, resets or control flow")
+    for index, terms in enumerate(observables):
+        try:
+            pauli_sum(terms, bare.num_qubits)
+        except ValueError as e:
+            raise ValueError(f"observable {index}: {e}")
+    num_terms = sum(len(terms) for terms in observables)
+    compiled = _compile(
+        qc, qasm3_str, analysis, method,
+        lambda analysis, sim_cost: estimate_expectation_cost(analysis, sim_cost, num_terms),
+    )
+    compiled["observables"] = observables
+    return compiled
+
 def _ensure_measurements(qc: QuantumCircuit) -> Tuple[QuantumCircuit, bool]:
     """Add measure_all if the circuit has no classical bits or no measure ops."""
     has_measure = any(instr.operation.name == "measure" for instr in qc.data)
@@ -27,13 +460,39 @@ def circuit_to_qasm3(qc: QuantumCircuit) -> str:
     except Exception as e:
         raise ValueError(f"QASM3 dump error: {e}")
 
-def run_circuit(qc: QuantumCircuit) -> Dict[str, int]:
+def run_circuit(
+    qc: QuantumCircuit,
+    circuit_key: Optional[str] = None,
+    method: str = "automatic",
+    shots: Optional[int] = None,
+    seed: Optional[int] = None,
+    stats: Optional[Dict[str, Any]] = None,
+) -> Dict[str, int]:
+    """Execute ``qc`` on the process-wide simulator for ``method``.
+
+    ``circuit_key`` (e.g. the task's circuit hash) keys the transpile cache;
+    without it the circuit is fingerprinted. ``shots`` defaults to
+    ``NUM_SHOTS``; a ``seed`` makes the sampled counts reproducible.
+    If given, ``stats`` is filled with ``transpile_s``, ``simulate_s``,
+    ``transpile_cache_hit``, the ``threads`` Aer could use (see
+    :func:`aer_parallelism`) and Aer's ``required_memory_mb``.
+    """
     try:
-        simulator = AerSimulator()  # optionally: AerSimulator(method="statevector")
+        simulator = get_simulator(method)
         qc, added_meas = _ensure_measurements(qc)
-        tqc = transpile(qc, simulator, optimization_level=0)  # no smart rewrites
-        job = simulator.run(tqc, shots=settings.num_shots)
+        hits = _transpile_cache.hits
+        started = time.perf_counter()
+        tqc = transpile_cached(qc, simulator, circuit_key)
+        transpiled = time.perf_counter()
+        parallelism = aer_parallelism(tqc.num_qubits)
+        job = simulator.run(tqc, shots=shots or settings.num_shots, seed_simulator=seed, **parallelism)
         result = job.result()
+        if stats is not None:
+            stats["threads"] = parallelism["max_parallel_threads"]
+            stats["transpile_s"] = transpiled - started
+            stats["simulate_s"] = time.perf_counter() - transpiled
+            stats["transpile_cache_hit"] = _transpile_cache.hits > hits
+            stats["required_memory_mb"] = result.results[0].metadata.get("required_memory_mb", 0)
         counts = result.get_counts()
         # Ensure dict[str,int]
         return {str(k): int(v) for k, v in counts.items()}
@@ -42,6 +501,124 @@ def run_circuit(qc: QuantumCircuit) -> Dict[str, int]:
         raise RuntimeError(f"Execution error: {e}")
 
 
+def run_circuits(
+    qcs: Sequence[QuantumCircuit],
+    circuit_keys: Optional[Sequence[Optional[str]]] = None,
+    method: str = "automatic",
+    shots: Optional[int] = None,
+    stats: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, int]]:
+    """Execute several circuits in a single simulator ``run()`` call.
+
+    Aer parallelizes across the experiments of one job, which amortizes the
+    per-run overhead that dominates for small circuits. ``stats`` is filled
+    as in :func:`run_circuit`, with times for the whole job.
+    """
+    keys = list(circuit_keys) if circuit_keys is not None else [None] * len(qcs)
+    try:
+        simulator = get_simulator(method)
+        started = time.perf_counter()
+        tqcs = [
+            transpile_cached(_ensure_measurements(qc)[0], simulator, key)
+            for qc, key in zip(qcs, keys)
+        ]
+        transpiled = time.perf_counter()
+        parallelism = aer_parallelism(max(tqc.num_qubits for tqc in tqcs), len(tqcs))
+        result = simulator.run(tqcs, shots=shots or settings.num_shots, **parallelism).result()
+        if stats is not None:
+            stats["threads"] = parallelism["max_parallel_threads"]
+            stats["transpile_s"] = transpiled - started
+            stats["simulate_s"] = time.perf_counter() - transpiled
+            stats["required_memory_mb"] = max(r.metadata.get("required_memory_mb", 0) for r in result.results)
+        return [
+            {str(k): int(v) for k, v in result.get_counts(i).items()}
+            for i in range(len(tqcs))
+        ]
+    except Exception as e:
+        raise RuntimeError(f"Execution error: {e}")
+
+
+def run_sweep(
+    qc: QuantumCircuit,
+    bindings: Dict[str, Sequence[float]],
+    circuit_key: Optional[str] = None,
+    method: str = "automatic",
+    shots: Optional[int] = None,
+    seed: Optional[int] = None,
+    stats: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, int]]:
+    """Execute every binding of the parameterized ``qc`` in a single simulator ``run()``.
+
+    The template is transpiled once (through the transpile cache) and Aer binds
+    the values itself via ``parameter_binds``; ``bindings`` maps parameter
+    names to one value per binding. Returns one counts dict per binding.
+    ``stats`` is filled as in :func:`run_circuit`, with times for the whole job.
+    """
+    try:
+        simulator = get_simulator(method)
+        qc, added_meas = _ensure_measurements(qc)
+        hits = _transpile_cache.hits
+        started = time.perf_counter()
+        tqc = transpile_cached(qc, simulator, circuit_key)
+        transpiled = time.perf_counter()
+        by_name = {p.name: p for p in tqc.parameters}
+        binds = {by_name[name]: list(values) for name, values in bindings.items()}
+        parallelism = aer_parallelism(tqc.num_qubits, len(next(iter(bindings.values()), [])))
+        result = simulator.run(
+            tqc, parameter_binds=[binds], shots=shots or settings.num_shots, seed_simulator=seed, **parallelism,
+        ).result()
+        if stats is not None:
+            stats["threads"] = parallelism["max_parallel_threads"]
+            stats["transpile_s"] = transpiled - started
+            stats["simulate_s"] = time.perf_counter() - transpiled
+            stats["transpile_cache_hit"] = _transpile_cache.hits > hits
+            stats["required_memory_mb"] = max(r.metadata.get("required_memory_mb", 0) for r in result.results)
+        return [
+            {str(k): int(v) for k, v in result.get_counts(i).items()}
+            for i in range(len(result.results))
+        ]
+    except Exception as e:
+        raise RuntimeError(f"Execution error: {e}")
+
+
+def run_expectation(
+    qc: QuantumCircuit,
+    observables: Sequence[Dict[str, float]],
+    circuit_key: Optional[str] = None,
+    method: str = "automatic",
+    stats: Optional[Dict[str, Any]] = None,
+) -> List[float]:
+    """Exact expectation values of Pauli-sum ``observables`` in the final state of ``qc``.
+
+    Final measurements are dropped and the circuit is simulated once, without
+    sampling; Aer evaluates every observable on the saved state (statevector,
+    MPS or stabilizer tableau). ``stats`` is filled as in :func:`run_circuit`.
+    """
+    try:
+        simulator = get_simulator(method)
+        bare = qc.remove_final_measurements(inplace=False)
+        hits = _transpile_cache.hits
+        started = time.perf_counter()
+        # Cached without the save instructions, which depend on the observables
+        key = f"{circuit_key}|unmeasured" if circuit_key else None
+        tqc = transpile_cached(bare, simulator, key).copy()
+        transpiled = time.perf_counter()
+        for index, terms in enumerate(observables):
+            tqc.append(SaveExpectationValue(pauli_sum(terms, bare.num_qubits), label=f"obs{index}"), tqc.qubits)
+        parallelism = aer_parallelism(tqc.num_qubits)
+        result = simulator.run(tqc, shots=1, **parallelism).result()
+        if stats is not None:
+            stats["threads"] = parallelism["max_parallel_threads"]
+            stats["transpile_s"] = transpiled - started
+            stats["simulate_s"] = time.perf_counter() - transpiled
+            stats["transpile_cache_hit"] = _transpile_cache.hits > hits
+            stats["required_memory_mb"] = result.results[0].metadata.get("required_memory_mb", 0)
+        data = result.data(0)
+        return [float(data[f"obs{index}"]) for index in range(len(observables))]
+    except Exception as e:
+        raise RuntimeError(f"Execution error: {e}")
+
+
 def circuit_to_text_diagram(qc: QuantumCircuit) -> str:
     """Render a simple ASCII diagram for the circuit.
 
@@ -57,23 +634,50 @@ def circuit_to_text_diagram(qc: QuantumCircuit) -> str:
         raise ValueError(f"Diagram render error: {e}")
 
 
+def _mpl_figure_bytes(qc: QuantumCircuit, fmt: str, **savefig_kwargs) -> bytes:
+    import matplotlib
+    matplotlib.use("Agg")  # headless
+    import matplotlib.pyplot as plt
+
+    fig = qc.draw(output="mpl")  # returns a Matplotlib Figure
+    # Save to an in-memory buffer
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt, bbox_inches="tight", **savefig_kwargs)
+    plt.close(fig)
+    return buf.getvalue()
+
+
 def circuit_to_png_bytes(qc: QuantumCircuit) -> bytes:
     """Render the circuit to a PNG image and return its bytes.
 
     Uses Matplotlib backend in headless mode.
     """
     try:
-        import matplotlib
-        matplotlib.use("Agg")  # headless
-        import matplotlib.pyplot as plt
-
-        fig = qc.draw(output="mpl")  # returns a Matplotlib Figure
-        # Save to an in-memory buffer
-        import io
-
-        buf = io.BytesIO()
-        fig.savefig(buf, format="png", bbox_inches="tight", dpi=200)
-        plt.close(fig)
-        return buf.getvalue()
+        return _mpl_figure_bytes(qc, "png", dpi=200)
     except Exception as e:
         raise ValueError(f"PNG render error: {e}")
+
+
+def circuit_to_svg_bytes(qc: QuantumCircuit) -> bytes:
+    """Render the circuit to an SVG document (Matplotlib, headless)."""
+    try:
+        return _mpl_figure_bytes(qc, "svg")
+    except Exception as e:
+        raise ValueError(f"SVG render error: {e}")
+
+
+def render_circuit(stored: Union[bytes, str], fmt: str, max_qubits: int, max_depth: int) -> Tuple[str, bytes]:
+    """Load and render in one call (meant to run in a separate process).
+
+    Image formats fall back to the text diagram for circuits wider than
+    ``max_qubits`` or deeper than ``max_depth``, which Matplotlib would take
+    very long to draw. Returns the format actually produced and its bytes.
+    """
+    qc = load_stored_circuit(stored)
+    if fmt in ("png", "svg") and (qc.num_qubits > max_qubits or qc.depth() > max_depth):
+        fmt = "txt"
+    if fmt == "png":
+        return fmt, circuit_to_png_bytes(qc)
+    if fmt == "svg":
+        return fmt, circuit_to_svg_bytes(qc)
+    return "txt", circuit_to_text_diagram(qc).encode("utf-8")
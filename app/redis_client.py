@@ -0,0 +1,33 @@
+from typing import Optional
+
+import redis
+import redis.asyncio as aioredis
+
+from .config import settings
+
+_client: Optional[redis.Redis] = None
+_async_client: Optional[aioredis.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+	"""Return the process-wide Redis client (created lazily, fork-safe via its pool)."""
+	global _client
+	if _client is None:
+		_client = redis.Redis.from_url(
+			settings.redis_url,
+			socket_timeout=settings.redis_socket_timeout,
+			socket_connect_timeout=settings.redis_socket_timeout,
+		)
+	return _client
+
+
+def get_async_redis() -> aioredis.Redis:
+	"""Return the asyncio Redis client used by the API event loop."""
+	global _async_client
+	if _async_client is None:
+		_async_client = aioredis.Redis.from_url(
+			settings.redis_url,
+			socket_timeout=settings.redis_socket_timeout,
+			socket_connect_timeout=settings.redis_socket_timeout,
+		)
+	return _async_client
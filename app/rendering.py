@@ -0,0 +1,95 @@
+"""Circuit diagram rendering for the API.
+
+Diagrams depend only on the circuit, so they are cached in Redis under the
+task's circuit hash and rendered at most once per format. Rendering is
+CPU-bound and runs in the API's process pool (see ``app.process_pool``);
+concurrent requests for the same diagram share a single render.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Union
+
+from redis.exceptions import RedisError
+
+from .config import settings
+from .metrics import observe_cache
+from .process_pool import run_in_process
+from .redis_client import get_async_redis
+
+logger = logging.getLogger("rendering")
+
+MEDIA_TYPES = {
+	"png": "image/png",
+	"svg": "image/svg+xml",
+	"txt": "text/plain; charset=utf-8",
+}
+
+_KEY_PREFIX = "viz:"
+
+# QPY bytes, or QASM3 text for rows stored before QPY was kept
+StoredCircuit = Union[bytes, str]
+
+_inflight: Dict[str, "asyncio.Future[Tuple[str, bytes]]"] = {}
+
+
+def etag(circ_hash: str, fmt: str) -> str:
+	return f'"{circ_hash}-{fmt}"'
+
+
+def etag_matches(if_none_match: Optional[str], tag: str) -> bool:
+	if not if_none_match:
+		return False
+	candidates = [c.strip().removeprefix("W/") for c in if_none_match.split(",")]
+	return "*" in candidates or tag in candidates
+
+
+async def _cache_get(key: str) -> Optional[Tuple[str, bytes]]:
+	try:
+		raw = await get_async_redis().get(key)
+	except RedisError:
+		logger.warning("viz_cache_unavailable", exc_info=True)
+		return None
+	if raw is None:
+		return None
+	fmt, _, data = raw.partition(b"\n")
+	return fmt.decode(), data
+
+
+async def _cache_put(key: str, fmt: str, data: bytes) -> None:
+	try:
+		await get_async_redis().set(key, fmt.encode() + b"\n" + data, ex=settings.viz_cache_ttl_s)
+	except RedisError:
+		logger.warning("viz_cache_unavailable", exc_info=True)
+
+
+async def _render_and_store(key: str, fmt: str, load_circuit: Callable[[], Awaitable[StoredCircuit]]) -> Tuple[str, bytes]:
+	circuit = await load_circuit()
+	actual_fmt, data = await run_in_process(
+		"app.quantum:render_circuit", circuit, fmt, settings.viz_max_qubits, settings.viz_max_depth,
+		timeout=settings.render_timeout_s,
+	)
+	await _cache_put(key, actual_fmt, data)
+	logger.info("viz_rendered", extra={"key": key, "format": actual_fmt, "bytes": len(data)})
+	return actual_fmt, data
+
+
+async def get_rendering(circ_hash: str, fmt: str, load_circuit: Callable[[], Awaitable[StoredCircuit]]) -> Tuple[str, bytes]:
+	"""Return ``(actual_format, bytes)`` for the circuit, rendering it if needed.
+
+	``load_circuit`` returns the stored QPY bytes (or the QASM3 text for rows
+	without them) and is only awaited on a cache miss, so hits never read the
+	circuit from the database.
+	"""
+	key = f"{_KEY_PREFIX}{circ_hash}:{fmt}"
+	cached = await _cache_get(key)
+	observe_cache("viz", cached is not None)
+	if cached is not None:
+		return cached
+
+	task = _inflight.get(key)
+	if task is None:
+		task = asyncio.ensure_future(_render_and_store(key, fmt, load_circuit))
+		_inflight[key] = task
+		task.add_done_callback(lambda _: _inflight.pop(key, None))
+	# shield: one client disconnecting must not cancel the render others wait on
+	return await asyncio.shield(task)
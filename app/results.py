@@ -0,0 +1,156 @@
+"""Array-backed measurement counts and their compact binary encoding.
+
+Aer returns counts as ``{"<bitstring>": count}``. For wide circuits with many
+shots that dict has millions of entries, so large results are stored as a
+packed bit matrix (one row per distinct outcome) plus a ``uint64`` count
+vector, and queries such as top-k and marginals run on the arrays.
+
+Binary layout (little endian), as stored in ``Task.result_blob`` and served
+by ``GET /tasks/{id}/result?format=binary``::
+
+	magic   4s   b"QCNT"
+	version u8   1
+	flags   u8   bit 0: body is zlib-compressed
+	nregs   u16  number of classical registers (``nregs`` u32 sizes follow)
+	width   u32  total number of classical bits
+	n       u64  number of distinct outcomes
+	sizes   u32 * nregs, left to right as in the bitstring keys
+	body    counts (u64 * n) then bits (n rows of ceil(width / 8) bytes,
+	        ``numpy.packbits`` of the key's characters, leftmost first)
+"""
+import struct
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MAGIC = b"QCNT"
+VERSION = 1
+_FLAG_ZLIB = 0x01
+_HEADER = struct.Struct("<4sBBHIQ")
+# Bodies above this size are zlib-compressed
+_COMPRESS_MIN_BYTES = 4096
+
+
+class CountsArray:
+	"""Counts as ``bits`` (n x width, uint8 0/1) and ``counts`` (n, uint64)."""
+
+	def __init__(self, bits: np.ndarray, counts: np.ndarray, registers: Sequence[int]):
+		self.bits = bits
+		self.counts = counts
+		self.registers = list(registers)
+
+	@property
+	def width(self) -> int:
+		return int(self.bits.shape[1])
+
+	@property
+	def shots(self) -> int:
+		return int(self.counts.sum())
+
+	def __len__(self) -> int:
+		return int(self.counts.shape[0])
+
+	@classmethod
+	def from_dict(cls, counts: Dict[str, int]) -> "CountsArray":
+		if not counts:
+			return cls(np.zeros((0, 0), dtype=np.uint8), np.zeros(0, dtype=np.uint64), [])
+		first = next(iter(counts))
+		registers = [len(part) for part in first.split(" ")]
+		width = sum(registers)
+		keys = "".join(counts).replace(" ", "").encode("ascii")
+		bits = (np.frombuffer(keys, dtype=np.uint8) - ord("0")).reshape(len(counts), width)
+		values = np.fromiter(counts.values(), dtype=np.uint64, count=len(counts))
+		return cls(bits, values, registers)
+
+	def to_dict(self) -> Dict[str, int]:
+		if not len(self):
+			return {}
+		chars = np.ascontiguousarray(self.bits + ord("0"), dtype=np.uint8)
+		keys = [k.decode() for k in chars.view(f"S{self.width}").ravel()]
+		if len(self.registers) > 1:
+			edges = np.cumsum([0] + self.registers)
+			keys = [" ".join(k[a:b] for a, b in zip(edges[:-1], edges[1:])) for k in keys]
+		return dict(zip(keys, (int(c) for c in self.counts)))
+
+	def top(self, k: int) -> "CountsArray":
+		"""The ``k`` most frequent outcomes, most frequent first."""
+		if k >= len(self):
+			order = np.argsort(-self.counts.astype(np.int64), kind="stable")
+		else:
+			part = np.argpartition(-self.counts.astype(np.int64), k)[:k]
+			order = part[np.argsort(-self.counts[part].astype(np.int64), kind="stable")]
+		return CountsArray(self.bits[order], self.counts[order], self.registers)
+
+	def marginal(self, clbits: Sequence[int]) -> "CountsArray":
+		"""Counts over the given classical bits only (Qiskit order: bit 0 rightmost)."""
+		indices = sorted(set(clbits), reverse=True)
+		if not indices:
+			raise ValueError("marginal needs at least one bit index")
+		if indices[0] >= self.width or indices[-1] < 0:
+			raise ValueError(f"bit index out of range for a {self.width}-bit result")
+		sub = self.bits[:, [self.width - 1 - i for i in indices]]
+		if len(indices) <= 63:
+			# Fast path: reduce each row to an integer key
+			shifts = np.arange(len(indices) - 1, -1, -1, dtype=np.uint64)
+			keys = (sub.astype(np.uint64) << shifts).sum(axis=1, dtype=np.uint64)
+			unique, inverse = np.unique(keys, return_inverse=True)
+			out_bits = ((unique[:, None] >> shifts) & np.uint64(1)).astype(np.uint8)
+		else:
+			packed = np.ascontiguousarray(np.packbits(sub, axis=1))
+			rows = packed.view(np.dtype((np.void, packed.shape[1]))).ravel()
+			_, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+			out_bits = sub[first]
+		# float64 sums are exact for any total below 2^53 shots
+		summed = np.bincount(inverse.ravel(), weights=self.counts.astype(np.float64)).astype(np.uint64)
+		return CountsArray(out_bits, summed, [len(indices)])
+
+	def to_bytes(self, compress: Optional[bool] = None) -> bytes:
+		packed = np.packbits(self.bits, axis=1) if len(self) else np.zeros((0, 0), dtype=np.uint8)
+		body = self.counts.astype("<u8").tobytes() + packed.tobytes()
+		if compress is None:
+			compress = len(body) >= _COMPRESS_MIN_BYTES
+		flags = 0
+		if compress:
+			body = zlib.compress(body, 1)
+			flags |= _FLAG_ZLIB
+		header = _HEADER.pack(MAGIC, VERSION, flags, len(self.registers), self.width, len(self))
+		sizes = struct.pack(f"<{len(self.registers)}I", *self.registers)
+		return header + sizes + body
+
+	@classmethod
+	def from_bytes(cls, data: bytes) -> "CountsArray":
+		magic, version, flags, nregs, width, n = _HEADER.unpack_from(data)
+		if magic != MAGIC or version != VERSION:
+			raise ValueError("not a compact counts blob")
+		offset = _HEADER.size
+		registers = list(struct.unpack_from(f"<{nregs}I", data, offset))
+		offset += 4 * nregs
+		body = data[offset:]
+		if flags & _FLAG_ZLIB:
+			body = zlib.decompress(body)
+		counts = np.frombuffer(body, dtype="<u8", count=n).astype(np.uint64)
+		row_bytes = (width + 7) // 8
+		packed = np.frombuffer(body, dtype=np.uint8, offset=8 * n, count=n * row_bytes).reshape(n, row_bytes)
+		bits = np.unpackbits(packed, axis=1, count=width) if n else np.zeros((0, width), dtype=np.uint8)
+		return cls(bits, counts, registers)
+
+
+def split_for_storage(counts: Dict[str, int], inline_max: int) -> Tuple[Dict[str, int], Optional[bytes]]:
+	"""Return ``(result_json, result_blob)`` for a finished task.
+
+	Results with at most ``inline_max`` outcomes are stored as JSON only. Larger
+	ones keep their ``inline_max`` most frequent outcomes as a JSON preview and
+	the full counts in the compact binary form.
+	"""
+	if len(counts) <= inline_max:
+		return counts, None
+	array = CountsArray.from_dict(counts)
+	return array.top(inline_max).to_dict(), array.to_bytes()
+
+
+def parse_bit_indices(value: str) -> List[int]:
+	try:
+		return [int(part) for part in value.split(",") if part.strip()]
+	except ValueError:
+		raise ValueError("marginal must be a comma-separated list of bit indices")
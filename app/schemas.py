@@ -1,19 +1,117 @@
 from pydantic import BaseModel, Field
-from typing import Dict, Optional
+from typing import Dict, List, Literal, Optional, Union
+
+from .config import settings
 
 
 class SubmitTaskRequest(BaseModel):
 	qc: str = Field(..., description="Serialized quantum circuit in QASM3")
+	method: Literal["automatic", "statevector", "stabilizer", "matrix_product_state"] = Field(
+		"automatic",
+		description="Simulation method; 'automatic' picks the cheapest exact method for the circuit",
+	)
+	shots: Optional[int] = Field(None, ge=1, le=settings.max_shots, description="Number of shots (default NUM_SHOTS)")
+	seed: Optional[int] = Field(None, ge=0, lt=2**63, description="Simulator seed; the same seed reproduces the same counts")
+
+
+class SubmitSweepRequest(BaseModel):
+	qc: str = Field(..., description="Parameterized QASM3 template, e.g. declaring `input float[64] theta;`")
+	bindings: Union[List[Dict[str, float]], Dict[str, List[float]]] = Field(
+		...,
+		description="One {name: value} object per binding, or {name: [values]} with one value per binding",
+	)
+	method: Literal["automatic", "statevector", "stabilizer", "matrix_product_state"] = Field(
+		"automatic",
+		description="Simulation method; 'automatic' picks the cheapest exact method for the circuit",
+	)
+	shots: Optional[int] = Field(None, ge=1, le=settings.max_shots, description="Shots per binding (default NUM_SHOTS)")
+	seed: Optional[int] = Field(None, ge=0, lt=2**63, description="Simulator seed; the same seed reproduces the same counts")
+
+
+def binding_columns(bindings: Union[List[Dict[str, float]], Dict[str, List[float]]]) -> Dict[str, List[float]]:
+	"""A sweep's bindings as ``{name: [value per binding]}``.
+
+	Accepts that form or a list of ``{name: value}`` objects, one per binding.
+	"""
+	if isinstance(bindings, dict):
+		columns = {name: [float(v) for v in values] for name, values in bindings.items()}
+	else:
+		names = set(bindings[0]) if bindings else set()
+		for index, binding in enumerate(bindings):
+			if set(binding) != names:
+				raise ValueError(f"binding {index} does not set the same parameters as binding 0")
+		columns = {name: [float(binding[name]) for binding in bindings] for name in sorted(names)}
+	lengths = {len(values) for values in columns.values()}
+	if len(lengths) > 1:
+		raise ValueError("every parameter needs one value per binding")
+	if not columns or not lengths.pop():
+		raise ValueError("no bindings given")
+	return columns
+
+
+class SubmitExpectationRequest(BaseModel):
+	qc: str = Field(..., description="Serialized quantum circuit in QASM3; final measurements are ignored")
+	observables: List[Union[str, Dict[str, float]]] = Field(
+		...,
+		min_length=1,
+		description="Pauli sums such as {\"ZZ\": 1.0, \"XI\": 0.5}, or a bare Pauli label; the rightmost character is qubit 0",
+	)
+	method: Literal["automatic", "statevector", "stabilizer", "matrix_product_state"] = Field(
+		"automatic",
+		description="Simulation method; 'automatic' picks the cheapest exact method for the circuit",
+	)
 
 
 class SubmitTaskResponse(BaseModel):
 	task_id: str
 	message: str = "Task submitted successfully."
+	cached: bool = Field(False, description="True when an identical completed or in-flight task was reused")
+
+
+class SubmitBatchRequest(BaseModel):
+	tasks: List[SubmitTaskRequest] = Field(..., min_length=1, description="Circuits to submit together")
+
+
+class SubmitBatchResponse(BaseModel):
+	batch_id: str
+	task_ids: List[str]
+	message: str = "Batch submitted successfully."
+
+
+class BatchTaskStatus(BaseModel):
+	task_id: str
+	status: str
+	result: Optional[Dict[str, int]] = None
+	truncated: Optional[bool] = Field(
+		None, description="With a result: whether it holds only the most frequent outcomes; see GET /tasks/{id}/result"
+	)
+	message: Optional[str] = None
+
+
+class BatchStatusResponse(BaseModel):
+	batch_id: str
+	total: int
+	counts: Dict[str, int]
+	done: bool
+	tasks: List[BatchTaskStatus]
 
 
 class TaskCompletedResponse(BaseModel):
 	status: str = "completed"
 	result: Dict[str, int]
+	truncated: Optional[bool] = Field(
+		None, description="Set when only the most frequent outcomes are shown; see GET /tasks/{id}/result"
+	)
+
+
+class TaskSweepCompletedResponse(BaseModel):
+	status: str = "completed"
+	results: List[Dict[str, int]] = Field(..., description="Counts for each binding, in submission order")
+
+
+class TaskExpectationCompletedResponse(BaseModel):
+	status: str = "completed"
+	values: List[float] = Field(..., description="Exact expectation value of each observable, in submission order")
 
 
 class TaskPendingResponse(BaseModel):
@@ -24,3 +122,9 @@ class TaskPendingResponse(BaseModel):
 class TaskErrorResponse(BaseModel):
 	status: str = "error"
 	message: str
+
+
+class CancelTaskResponse(BaseModel):
+	task_id: str
+	status: str = "cancelled"
+	message: str = "Task cancelled."
@@ -0,0 +1,214 @@
+"""Incrementally maintained task statistics for ``GET /admin/stats``.
+
+Every status transition updates a few Redis counters in one pipeline, so the
+endpoint reads a fixed number of keys however many rows ``tasks`` holds:
+
+- ``qstats:status``: tasks in the ``tasks`` table per status. Archiving
+  subtracts the rows it moves out. Seeded once with a ``GROUP BY status``
+  when ``qstats:seeded`` is missing (first deploy, Redis flush); the flag is
+  set together with the seeded counts.
+- ``qstats:minute:<unix minute>``: tasks submitted, completed, failed and
+  cancelled during that minute, plus a histogram of completed tasks'
+  submit-to-completion time (``rt:<bucket index>``). Expires once it falls
+  out of the stats window.
+
+Like the result cache, the rollups are an accelerator: Redis errors are
+logged and ignored, and never fail a task.
+"""
+import bisect
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from redis.exceptions import RedisError
+
+from .config import settings
+from .db import TaskStatus
+from .redis_client import get_async_redis, get_redis
+
+logger = logging.getLogger("stats")
+
+STATUS_KEY = "qstats:status"
+_SEEDED_KEY = "qstats:seeded"
+_SEEDING_KEY = "qstats:seeding"
+# A seeding claim outlives a crashed or stuck seeder by at most this long
+_SEED_CLAIM_TTL_S = 30
+_MINUTE_PREFIX = "qstats:minute:"
+
+STATUSES = (TaskStatus.PENDING, TaskStatus.RUNNING, TaskStatus.COMPLETED, TaskStatus.ERROR, TaskStatus.CANCELLED)
+# Upper bounds, in seconds, of the runtime histogram; the last bucket is unbounded
+RUNTIME_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 900, 3600)
+_PERCENTILES = (50, 90, 99)
+
+
+def _minute(now: Optional[float] = None) -> int:
+	return int((time.time() if now is None else now) // 60)
+
+
+def _queue_updates(pipe, deltas: Dict[str, int], events: Dict[str, int], runtimes: Iterable[float] = ()) -> None:
+	"""Queue the counter updates on ``pipe`` (a sync or asyncio pipeline)."""
+	for status, delta in deltas.items():
+		if delta:
+			pipe.hincrby(STATUS_KEY, status, delta)
+	key = f"{_MINUTE_PREFIX}{_minute()}"
+	fields: Dict[str, int] = {field: n for field, n in events.items() if n}
+	for seconds in runtimes:
+		field = f"rt:{bisect.bisect_left(RUNTIME_BUCKETS, seconds)}"
+		fields[field] = fields.get(field, 0) + 1
+	for field, n in fields.items():
+		pipe.hincrby(key, field, n)
+	if fields:
+		pipe.expire(key, (settings.stats_window_minutes + 1) * 60)
+
+
+def _transition(old: Optional[str], new: str, count: int) -> tuple:
+	deltas = {new: count}
+	if old is not None:
+		deltas[old] = deltas.get(old, 0) - count
+	# A task counts once in "submitted" and once in the terminal status it reaches
+	events = {"submitted": count} if old is None else {}
+	if new in (TaskStatus.COMPLETED, TaskStatus.ERROR, TaskStatus.CANCELLED):
+		events[new] = count
+	return deltas, events
+
+
+def record_transition(old: Optional[str], new: str, count: int = 1, runtimes: Iterable[float] = ()) -> None:
+	"""Count ``count`` tasks moving from ``old`` (``None`` for new tasks) to ``new``.
+
+	``runtimes`` are submit-to-completion times of tasks that completed.
+	"""
+	if count <= 0:
+		return
+	try:
+		pipe = get_redis().pipeline(transaction=False)
+		_queue_updates(pipe, *_transition(old, new, count), runtimes)
+		pipe.execute()
+	except RedisError:
+		logger.warning("stats_update_failed", extra={"old": old, "new": new}, exc_info=True)
+
+
+async def record_transition_async(old: Optional[str], new: str, count: int = 1) -> None:
+	if count <= 0:
+		return
+	try:
+		pipe = get_async_redis().pipeline(transaction=False)
+		_queue_updates(pipe, *_transition(old, new, count))
+		await pipe.execute()
+	except RedisError:
+		logger.warning("stats_update_failed", extra={"old": old, "new": new}, exc_info=True)
+
+
+def record_removed(counts: Dict[str, int]) -> None:
+	"""Subtract tasks that left the ``tasks`` table (archiving), by status."""
+	try:
+		pipe = get_redis().pipeline(transaction=False)
+		_queue_updates(pipe, {status: -n for status, n in counts.items()}, {})
+		pipe.execute()
+	except RedisError:
+		logger.warning("stats_update_failed", extra={"removed": counts}, exc_info=True)
+
+
+async def ensure_seeded(count_statuses: Callable[[], Awaitable[Dict[str, int]]]) -> Optional[Dict[str, int]]:
+	"""Seed the status counts from ``count_statuses()`` (a ``GROUP BY status``) unless already seeded.
+
+	One caller at a time holds a short-lived claim; the counts and
+	``qstats:seeded`` are written in one transaction, and a failed seeding
+	releases the claim so the next request retries. The counts are applied as
+	deltas against those read before the query, so transitions counted while
+	it runs are kept. Returns the seeded counts, or None if nothing was done.
+	"""
+	redis = get_async_redis()
+	if await redis.exists(_SEEDED_KEY):
+		return None
+	if not await redis.set(_SEEDING_KEY, str(time.time()), nx=True, ex=_SEED_CLAIM_TTL_S):
+		return None
+	try:
+		before = {
+			(k.decode() if isinstance(k, bytes) else k): int(v)
+			for k, v in (await redis.hgetall(STATUS_KEY)).items()
+		}
+		counts = await count_statuses()
+		pipe = redis.pipeline(transaction=True)
+		for status in STATUSES:
+			delta = counts.get(status, 0) - before.get(status, 0)
+			if delta:
+				pipe.hincrby(STATUS_KEY, status, delta)
+		pipe.set(_SEEDED_KEY, str(time.time()))
+		pipe.delete(_SEEDING_KEY)
+		await pipe.execute()
+	except Exception:
+		try:
+			await redis.delete(_SEEDING_KEY)
+		except RedisError:
+			# The claim expires on its own
+			pass
+		raise
+	return counts
+
+
+def percentiles(histogram: List[int]) -> Dict[str, Optional[float]]:
+	"""Percentiles from bucket counts, interpolated linearly within a bucket.
+
+	The unbounded last bucket reports its lower bound.
+	"""
+	total = sum(histogram)
+	result: Dict[str, Optional[float]] = {}
+	for p in _PERCENTILES:
+		if total == 0:
+			result[f"p{p}"] = None
+			continue
+		rank = total * p / 100
+		seen = 0
+		for index, n in enumerate(histogram):
+			if n and seen + n >= rank:
+				lower = RUNTIME_BUCKETS[index - 1] if index > 0 else 0.0
+				if index == len(RUNTIME_BUCKETS):
+					result[f"p{p}"] = lower
+				else:
+					result[f"p{p}"] = lower + (RUNTIME_BUCKETS[index] - lower) * (rank - seen) / n
+				break
+			seen += n
+	return result
+
+
+async def read_stats(now: Optional[float] = None) -> Dict[str, Any]:
+	"""Status counts and the last ``STATS_WINDOW_MINUTES`` of per-minute rollups.
+
+	Reads one hash per minute of the window plus the status hash, in one round trip.
+	"""
+	window = settings.stats_window_minutes
+	current = _minute(now)
+	minutes = list(range(current - window + 1, current + 1))
+	pipe = get_async_redis().pipeline(transaction=False)
+	pipe.hgetall(STATUS_KEY)
+	for minute in minutes:
+		pipe.hgetall(f"{_MINUTE_PREFIX}{minute}")
+	status_raw, *minute_raw = await pipe.execute()
+
+	counts = {status: 0 for status in STATUSES}
+	for field, value in status_raw.items():
+		field = field.decode() if isinstance(field, bytes) else field
+		# Transitions racing the seeding can leave a count briefly below zero
+		counts[field] = max(int(value), 0)
+
+	per_minute = []
+	totals = {"submitted": 0, TaskStatus.COMPLETED: 0, TaskStatus.ERROR: 0, TaskStatus.CANCELLED: 0}
+	histogram = [0] * (len(RUNTIME_BUCKETS) + 1)
+	for minute, raw in zip(minutes, minute_raw):
+		fields = {(k.decode() if isinstance(k, bytes) else k): int(v) for k, v in raw.items()}
+		entry = {"minute": time.strftime("%Y-%m-%dT%H:%M:00Z", time.gmtime(minute * 60))}
+		for name in totals:
+			entry[name] = fields.get(name, 0)
+			totals[name] += entry[name]
+		for field, n in fields.items():
+			if field.startswith("rt:"):
+				histogram[int(field[3:])] += n
+		per_minute.append(entry)
+
+	return {
+		"counts": counts,
+		"window_minutes": window,
+		"per_minute": per_minute,
+		"per_minute_avg": {name: total / window for name, total in totals.items()},
+		"runtime_s": {"count": sum(histogram), **percentiles(histogram)},
+	}
@@ -1,50 +1,308 @@
 import json
 import logging
-from typing import Any
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
 
+from celery import chord
+from celery.exceptions import SoftTimeLimitExceeded, TimeLimitExceeded
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import undefer
 
-from .celery_app import celery
+from .cache import result_key, store_result, release_inflight
+from .celery_app import QUEUE_INTERACTIVE, celery, time_limits
+from .compression import stored_qasm
+from .config import settings
 from .db import SessionLocal, Task, TaskStatus
-from .quantum import circuit_from_qasm3, run_circuit
+from .dispatch import shard_ids, shard_plan
+from .events import publish_task_event
+from .metrics import TASK_LATENCY_SECONDS, TASKS_IN_PROGRESS, observe_cache, observe_memory, observe_task_timings
+from .quantum import load_stored_circuit, run_circuit, run_expectation, run_sweep, transpile_cache_stats
+from .results import split_for_storage
+from .stats import record_transition
 
 logger = logging.getLogger("worker_tasks")
 
+# Invalid circuits (ValueError), simulator failures (RuntimeError) and time limits fail
+# the same way on every attempt; only infrastructure errors (DB, broker) are worth retrying.
+_RETRY_POLICY = dict(
+	autoretry_for=(Exception,),
+	dont_autoretry_for=(ValueError, RuntimeError, SoftTimeLimitExceeded),
+	retry_backoff=True,
+	retry_kwargs={"max_retries": 3},
+)
 
-@celery.task(autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": 3})
-def execute_quantum_task(task_id: str) -> dict[str, Any]:
+
+def _task_shots(task) -> int:
+	return task.shots or settings.num_shots
+
+
+def _cache_key(task) -> Optional[str]:
+	# Sweeps and expectation tasks share the circuit's hash but not its results
+	if not task.circuit_hash or task.parameter_binds is not None or task.observables is not None:
+		return None
+	return result_key(task.circuit_hash, _task_shots(task), task.seed)
+
+
+def _queue_wait(task) -> float:
+	return max((datetime.utcnow() - task.submitted_at).total_seconds(), 0.0)
+
+
+def _record_run(timings: Dict[str, Any], stats: Dict[str, Any]) -> None:
+	timings["transpile_s"] = stats["transpile_s"]
+	timings["simulate_s"] = stats["simulate_s"]
+	timings["threads"] = stats["threads"]
+	observe_cache("transpile", stats["transpile_cache_hit"])
+	observe_memory(stats.get("required_memory_mb"))
+
+
+def _complete_task(session, task: Task, counts: Union[Dict[str, int], List[Any]], timings: Dict[str, Any]) -> None:
+	"""Store ``counts`` and mark the task completed.
+
+	Sweeps pass a list of counts, one per binding; expectation tasks a list of values.
+	"""
+	# Read what's needed up front: committing expires the instance
+	task_id, sim_method, queue = task.id, task.sim_method, task.queue or QUEUE_INTERACTIVE
+	cache_key = _cache_key(task)
+	total = _queue_wait(task)
+	started = time.perf_counter()
+	# Lock the row so a concurrent DELETE /tasks/{id} either lands first or waits
+	status = session.execute(select(Task.status).where(Task.id == task_id).with_for_update()).scalar_one()
+	# Cancelled while running, or a redelivered run of a task that already finished
+	if status in (TaskStatus.COMPLETED, TaskStatus.ERROR, TaskStatus.CANCELLED):
+		session.rollback()
+		logger.info("task_result_discarded", extra={"task_id": task_id, "reason": status})
+		return
+	if isinstance(counts, list):
+		# Sweep and expectation results stay inline; SWEEP_MAX_BINDINGS and EXPECTATION_MAX_TERMS bound them
+		result_json, result_blob = counts, None
+	else:
+		result_json, result_blob = split_for_storage(counts, settings.result_inline_max_outcomes)
+	# Result, status and timings go in one UPDATE; db_write_s covers the row lock and result encoding
+	db_write = time.perf_counter() - started
+	timings = {**timings, "db_write_s": db_write, "total_s": total + db_write}
+	task.result_json, task.result_blob = result_json, result_blob
+	task.status = TaskStatus.COMPLETED
+	task.timings_json = timings
+	session.commit()
+	# Count the completion before announcing it, so a client woken by the event sees it in the stats
+	record_transition(status, TaskStatus.COMPLETED, runtimes=[timings["total_s"]])
+	publish_task_event(task_id, TaskStatus.COMPLETED, result=result_json, truncated=result_blob is not None)
+	observe_task_timings(timings, sim_method)
+	TASK_LATENCY_SECONDS.labels(queue, TaskStatus.COMPLETED).observe(timings["total_s"])
+	logger.info("task_completed", extra={
+		"task_id": task_id,
+		"outcomes": len(counts),
+		"compact": result_blob is not None,
+		"timings": timings,
+		"transpile_cache": transpile_cache_stats(),
+	})
+	if cache_key:
+		store_result(cache_key, task_id)
+		release_inflight(cache_key, task_id)
+
+
+def _error_message(exc: BaseException) -> str:
+	if isinstance(exc, TimeLimitExceeded):
+		return f"Time limit exceeded ({exc.args[0]:g} s)" if exc.args else "Time limit exceeded"
+	# run_circuit wraps whatever interrupted the simulation in a RuntimeError
+	if isinstance(exc, SoftTimeLimitExceeded) or isinstance(exc.__context__, SoftTimeLimitExceeded):
+		return "Soft time limit exceeded"
+	return str(exc)
+
+
+def _will_retry(task, exc: BaseException) -> bool:
+	"""Whether :data:`_RETRY_POLICY` runs ``task`` again after ``exc``."""
+	if isinstance(exc, _RETRY_POLICY["dont_autoretry_for"]) or not isinstance(exc, _RETRY_POLICY["autoretry_for"]):
+		return False
+	return task.request.retries < _RETRY_POLICY["retry_kwargs"]["max_retries"]
+
+
+def _fail_task(session, task_id: str, exc: BaseException) -> None:
+	session.rollback()
+	try:
+		task = session.get(Task, task_id)
+		# Cancelled tasks stay cancelled; an error callback may also follow a failure already recorded
+		if task is not None and task.status not in (TaskStatus.COMPLETED, TaskStatus.ERROR, TaskStatus.CANCELLED):
+			previous = task.status
+			task.status = TaskStatus.ERROR
+			task.error_msg = _error_message(exc)
+			session.commit()
+			record_transition(previous, TaskStatus.ERROR)
+			publish_task_event(task_id, TaskStatus.ERROR, message=task.error_msg)
+			TASK_LATENCY_SECONDS.labels(task.queue or QUEUE_INTERACTIVE, TaskStatus.ERROR).observe(_queue_wait(task))
+			cache_key = _cache_key(task)
+			if cache_key:
+				release_inflight(cache_key, task_id)
+	except SQLAlchemyError:
+		pass
+
+
+@celery.task(bind=True, **_RETRY_POLICY)
+def execute_quantum_task(self, task_id: str) -> dict[str, Any]:
 	session = SessionLocal()
 	logger.info("task_received", extra={"task_id": task_id})
+	in_progress = None
 	try:
-		task = session.get(Task, task_id)
+		task = session.get(
+			Task, task_id, options=[undefer(Task.qc_qpy), undefer(Task.parameter_binds), undefer(Task.observables)],
+			with_for_update=True,
+		)
 		if task is None:
 			raise RuntimeError(f"Task {task_id} not found")
+		if task.status == TaskStatus.CANCELLED:
+			# Revoked while queued, but this worker never saw the revoke (e.g. it started later)
+			session.rollback()
+			logger.info("task_skipped", extra={"task_id": task_id, "reason": "cancelled"})
+			return {"task_id": task_id, "cancelled": True}
+		if task.status in (TaskStatus.COMPLETED, TaskStatus.ERROR):
+			# Redelivered (acks_late) or retried after the task already finished: never run it twice
+			status = task.status
+			session.rollback()
+			logger.info("task_skipped", extra={"task_id": task_id, "reason": status})
+			return {"task_id": task_id, "skipped": status}
+		in_progress = TASKS_IN_PROGRESS.labels(task.queue or QUEUE_INTERACTIVE)
+		in_progress.inc()
 
+		timings: Dict[str, Any] = {"queue_wait_s": _queue_wait(task)}
+		previous = task.status
 		task.status = TaskStatus.RUNNING
+		task.timings_json = timings
 		session.commit()
-		logger.info("task_running", extra={"task_id": task_id})
+		# A redelivered task is already running
+		if previous != TaskStatus.RUNNING:
+			record_transition(previous, TaskStatus.RUNNING)
+		publish_task_event(task_id, TaskStatus.RUNNING)
+		logger.info("task_running", extra={"task_id": task_id, "sim_method": task.sim_method})
 
-		qc = circuit_from_qasm3(task.qc_qasm3)
-		counts = run_circuit(qc)
-
-		task.result_json = counts
-		task.status = TaskStatus.COMPLETED
-		session.commit()
-		logger.info("task_completed", extra={"task_id": task_id, "result_keys": list(counts.keys())})
+		plan = shard_plan(_task_shots(task), task.seed)
+		# Sweeps and expectation tasks are one Aer job each and are never sharded
+		if len(plan) > 1 and task.parameter_binds is None and task.observables is None:
+			# Fan the shots out across the fleet; merge_shards completes the task
+			# Shards and the merge stay in the parent's cost tier
+			queue = task.queue or QUEUE_INTERACTIVE
+			limits = time_limits(queue)
+			header = [
+				run_shard.si(task_id, shots, seed).set(queue=queue, task_id=shard_id, **limits)
+				for (shots, seed), shard_id in zip(plan, shard_ids(task_id, len(plan)))
+			]
+			chord(header)(merge_shards.s(task_id).set(queue=queue, **limits).on_error(shards_failed.s(task_id)))
+			logger.info("task_sharded", extra={"task_id": task_id, "shards": len(plan)})
+			return {"task_id": task_id, "shards": len(plan)}
 
+		started = time.perf_counter()
+		qc = load_stored_circuit(task.qc_qpy if task.qc_qpy is not None else stored_qasm(task.qc_qasm3_zst, task.qc_qasm3))
+		timings["parse_s"] = time.perf_counter() - started
+		stats: Dict[str, Any] = {}
+		if task.observables is not None:
+			counts = run_expectation(
+				qc, task.observables, circuit_key=task.circuit_hash, method=task.sim_method or "automatic", stats=stats,
+			)
+			timings["observables"] = len(counts)
+		elif task.parameter_binds is not None:
+			counts = run_sweep(
+				qc, task.parameter_binds, circuit_key=task.circuit_hash, method=task.sim_method or "automatic",
+				shots=_task_shots(task), seed=task.seed, stats=stats,
+			)
+			timings["bindings"] = len(counts)
+		else:
+			shots, seed = plan[0]
+			counts = run_circuit(
+				qc, circuit_key=task.circuit_hash, method=task.sim_method or "automatic",
+				shots=shots, seed=seed, stats=stats,
+			)
+		_record_run(timings, stats)
+		_complete_task(session, task, counts, timings)
 		return {"task_id": task_id, "result": counts}
 
 	except Exception as exc:  # noqa: BLE001
 		logger.exception("task_error", extra={"task_id": task_id})
-		session.rollback()
-		try:
-			task = session.get(Task, task_id)
-			if task is not None:
-				task.status = TaskStatus.ERROR
-				task.error_msg = str(exc)
-				session.commit()
-		except SQLAlchemyError:
-			pass
+		# A task about to be retried is still running; it fails on its last attempt
+		if not _will_retry(self, exc):
+			_fail_task(session, task_id, exc)
+		raise
+	finally:
+		if in_progress is not None:
+			in_progress.dec()
+		session.close()
+
+
+@celery.task(**_RETRY_POLICY)
+def run_shard(task_id: str, shots: int, seed: Optional[int]) -> Dict[str, Any]:
+	"""Run ``shots`` shots of the task's circuit.
+
+	Returns ``{"counts": ..., "stats": ...}`` for :func:`merge_shards`.
+	"""
+	session = SessionLocal()
+	try:
+		task = session.get(Task, task_id, options=[undefer(Task.qc_qpy)])
+		if task is None:
+			raise RuntimeError(f"Task {task_id} not found")
+		if task.status == TaskStatus.CANCELLED:
+			# merge_shards discards the result anyway
+			return {"counts": {}, "stats": {}}
+		with TASKS_IN_PROGRESS.labels(task.queue or QUEUE_INTERACTIVE).track_inprogress():
+			started = time.perf_counter()
+			qc = load_stored_circuit(task.qc_qpy if task.qc_qpy is not None else stored_qasm(task.qc_qasm3_zst, task.qc_qasm3))
+			stats: Dict[str, Any] = {"parse_s": time.perf_counter() - started}
+			counts = run_circuit(
+				qc, circuit_key=task.circuit_hash, method=task.sim_method or "automatic",
+				shots=shots, seed=seed, stats=stats,
+			)
+		if "transpile_cache_hit" in stats:
+			observe_cache("transpile", stats["transpile_cache_hit"])
+		observe_memory(stats.get("required_memory_mb"))
+		return {"counts": counts, "stats": stats}
+	finally:
+		session.close()
+
+
+@celery.task(bind=True, **_RETRY_POLICY)
+def merge_shards(self, shard_results: List[Dict[str, Any]], task_id: str) -> dict[str, Any]:
+	session = SessionLocal()
+	try:
+		merged: Counter = Counter()
+		for shard in shard_results:
+			merged.update(shard["counts"])
+		task = session.get(Task, task_id)
+		if task is None:
+			raise RuntimeError(f"Task {task_id} not found")
+		# Phase times are summed over the shards, so they are CPU time rather than wall clock
+		timings: Dict[str, Any] = dict(task.timings_json or {}, shards=len(shard_results))
+		for shard in shard_results:
+			for phase in ("parse_s", "transpile_s", "simulate_s"):
+				timings[phase] = timings.get(phase, 0.0) + shard["stats"].get(phase, 0.0)
+		_complete_task(session, task, dict(merged), timings)
+		logger.info("task_shards_merged", extra={"task_id": task_id, "shards": len(shard_results)})
+		return {"task_id": task_id, "shards": len(shard_results)}
+	except Exception as exc:  # noqa: BLE001
+		logger.exception("task_error", extra={"task_id": task_id})
+		# A task about to be retried is still running; it fails on its last attempt
+		if not _will_retry(self, exc):
+			_fail_task(session, task_id, exc)
 		raise
 	finally:
 		session.close()
+
+
+@celery.task
+def task_failed(request, exc, traceback, task_id: str) -> None:
+	"""Error callback of :func:`execute_quantum_task` (see :func:`task_signature`)."""
+	session = SessionLocal()
+	try:
+		_fail_task(session, task_id, exc)
+	finally:
+		session.close()
+
+
+@celery.task
+def shards_failed(request, exc, traceback, task_id: str) -> None:
+	"""Chord error callback: a shard failed for good, so the task fails."""
+	session = SessionLocal()
+	try:
+		logger.error("task_shard_failed", extra={"task_id": task_id, "error": str(exc)})
+		_fail_task(session, task_id, exc)
+	finally:
+		session.close()
@@ -0,0 +1,68 @@
+"""Benchmark circuits, scaled by qubit count, depth and shots.
+
+Circuits are generated from a fixed seed so every run (and the stored
+baseline) times exactly the same work.
+"""
+import math
+import random
+from dataclasses import dataclass
+from typing import Iterator, Tuple
+
+from qiskit import QuantumCircuit
+from qiskit.qasm3 import dumps as qasm3_dumps
+
+# (qubits, depth) of the layered circuits; 20 qubits at depth 100 takes tens of seconds per run
+SIZES = ((2, 10), (2, 100), (8, 10), (8, 100), (16, 10), (16, 100), (20, 10))
+SHOTS = (1024, 100_000)
+# Matplotlib drawing time grows with the diagram area
+PNG_MAX_QUBITS = 8
+PNG_MAX_DEPTH = 10
+# Clifford-only circuits, run with the stabilizer method; it samples shot by shot,
+# so these get fewer shots
+GHZ_QUBITS = (32, 128)
+GHZ_SHOTS = (1024, 10_000)
+
+_SEED = 20240601
+
+
+@dataclass(frozen=True)
+class Case:
+	name: str
+	qasm: str
+	num_qubits: int
+	depth: int
+	shots: Tuple[int, ...]
+
+
+def layered_circuit(num_qubits: int, depth: int, seed: int = _SEED) -> QuantumCircuit:
+	"""``depth`` layers of random single-qubit rotations followed by a CX ladder."""
+	rng = random.Random(seed + 1000 * num_qubits + depth)
+	qc = QuantumCircuit(num_qubits, num_qubits)
+	for _ in range(depth):
+		for q in range(num_qubits):
+			getattr(qc, rng.choice(("rx", "ry", "rz")))(rng.uniform(0, 2 * math.pi), q)
+		for q in range(0, num_qubits - 1):
+			qc.cx(q, q + 1)
+	qc.measure(range(num_qubits), range(num_qubits))
+	return qc
+
+
+def ghz_circuit(num_qubits: int) -> QuantumCircuit:
+	qc = QuantumCircuit(num_qubits, num_qubits)
+	qc.h(0)
+	for q in range(num_qubits - 1):
+		qc.cx(q, q + 1)
+	qc.measure(range(num_qubits), range(num_qubits))
+	return qc
+
+
+def unmeasured(qc: QuantumCircuit) -> QuantumCircuit:
+	"""The same circuit without its measurements, to exercise ``_ensure_measurements``."""
+	return qc.remove_final_measurements(inplace=False)
+
+
+def cases() -> Iterator[Case]:
+	for n, depth in SIZES:
+		yield Case(f"layered-q{n}-d{depth}", qasm3_dumps(layered_circuit(n, depth)), n, depth, SHOTS)
+	for n in GHZ_QUBITS:
+		yield Case(f"ghz-q{n}", qasm3_dumps(ghz_circuit(n)), n, n, GHZ_SHOTS)
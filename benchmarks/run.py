@@ -0,0 +1,218 @@
+"""Time the quantum execution path in-process and compare against a baseline.
+
+No Docker, Redis or Postgres is needed. Run from the repository root::
+
+	python -m benchmarks.run                          # run and compare with benchmarks/baseline.json
+	python -m benchmarks.run --output results.json    # also write the results as JSON
+	python -m benchmarks.run --filter run_circuit     # only benchmarks whose id contains the text
+	python -m benchmarks.run --save-baseline          # record this machine's numbers as the baseline
+
+The exit status is 1 when a benchmark's median is slower than the baseline
+by more than ``--tolerance`` and by at least ``--min-delta-ms``, so
+microsecond-level noise on the fast benchmarks does not count. Baselines are
+machine specific and the baseline file is keyed by CPU count: a run is only
+compared with the baseline recorded on a machine with as many CPUs, since Aer
+spreads work across them, and the comparison is skipped when there is none.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from importlib import metadata
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from qiskit import transpile
+
+from app.quantum import (
+	_ensure_measurements,
+	analyze_circuit,
+	circuit_from_qasm3,
+	circuit_to_png_bytes,
+	circuit_to_qpy,
+	get_simulator,
+	load_stored_circuit,
+	run_circuit,
+	select_method,
+)
+
+from .corpus import PNG_MAX_DEPTH, PNG_MAX_QUBITS, Case, cases, unmeasured
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+_PACKAGES = ("qiskit", "qiskit-aer", "numpy", "matplotlib")
+
+Benchmark = Tuple[str, Callable[[], object]]
+
+
+def benchmarks(case: Case) -> Iterator[Benchmark]:
+	qc = circuit_from_qasm3(case.qasm)
+	qpy_bytes = circuit_to_qpy(qc)
+	bare = unmeasured(qc)
+	# The method the API would pick for this circuit at submission
+	method, _ = select_method(analyze_circuit(qc))
+	simulator = get_simulator(method)
+
+	yield f"parse_qasm3[{case.name}]", lambda: circuit_from_qasm3(case.qasm)
+	yield f"load_qpy[{case.name}]", lambda: load_stored_circuit(qpy_bytes)
+	yield f"ensure_measurements[{case.name}]", lambda: _ensure_measurements(bare)
+	# A transpile-cache miss, as in app.quantum.transpile_cached
+	yield f"transpile[{case.name}]", lambda: transpile(qc, simulator, optimization_level=0)
+	for shots in case.shots:
+		# Steady state of a worker: the transpiled circuit is cached after the warm-up run
+		yield f"run_circuit[{case.name}-s{shots}]", (
+			lambda shots=shots: run_circuit(qc, circuit_key=case.name, method=method, shots=shots, seed=1)
+		)
+	if case.num_qubits <= PNG_MAX_QUBITS and case.depth <= PNG_MAX_DEPTH:
+		yield f"render_png[{case.name}]", lambda: circuit_to_png_bytes(qc)
+
+
+def measure(fn: Callable[[], object], min_runs: int, min_time_s: float, max_runs: int) -> Dict[str, float]:
+	fn()  # warm-up: imports, simulator construction, caches
+	times: List[float] = []
+	started = time.perf_counter()
+	while len(times) < min_runs or (time.perf_counter() - started < min_time_s and len(times) < max_runs):
+		t0 = time.perf_counter()
+		fn()
+		times.append(time.perf_counter() - t0)
+	return {
+		"median_s": statistics.median(times),
+		"min_s": min(times),
+		"mean_s": statistics.fmean(times),
+		"stdev_s": statistics.stdev(times) if len(times) > 1 else 0.0,
+		"runs": len(times),
+	}
+
+
+def environment() -> Dict[str, object]:
+	versions = {}
+	for name in _PACKAGES:
+		try:
+			versions[name] = metadata.version(name)
+		except metadata.PackageNotFoundError:
+			versions[name] = None
+	return {
+		"timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+		"python": platform.python_version(),
+		"platform": platform.platform(),
+		"cpu_count": os.cpu_count(),
+		"packages": versions,
+	}
+
+
+def run(filter_text: Optional[str] = None, min_runs: int = 3, min_time_s: float = 0.5, max_runs: int = 50) -> Dict:
+	results: Dict[str, Dict[str, float]] = {}
+	for case in cases():
+		for bench_id, fn in benchmarks(case):
+			if filter_text and filter_text not in bench_id:
+				continue
+			results[bench_id] = measure(fn, min_runs, min_time_s, max_runs)
+			print(f"{bench_id:<48} {results[bench_id]['median_s'] * 1000:>10.3f} ms", file=sys.stderr)
+	return {"environment": environment(), "results": results}
+
+
+def baseline_for(baselines: Dict, cpu_count: Optional[int]) -> Optional[Dict]:
+	"""The baseline recorded on a machine with ``cpu_count`` CPUs, if any."""
+	return baselines.get("by_cpu_count", {}).get(str(cpu_count))
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float, min_delta_s: float) -> List[Dict]:
+	"""One row per benchmark with its status against the baseline.
+
+	Status is ``regressed``/``improved`` when the medians differ by more than
+	``tolerance`` (a fraction) and by at least ``min_delta_s``; otherwise ``ok``.
+	Benchmarks missing from the baseline are ``new``.
+	"""
+	rows = []
+	base_results = baseline.get("results", {})
+	for bench_id, current in results["results"].items():
+		base = base_results.get(bench_id)
+		if base is None:
+			rows.append({"id": bench_id, "status": "new", "median_s": current["median_s"]})
+			continue
+		ratio = current["median_s"] / base["median_s"] if base["median_s"] else float("inf")
+		delta = current["median_s"] - base["median_s"]
+		status = "ok"
+		if abs(delta) >= min_delta_s:
+			if ratio > 1 + tolerance:
+				status = "regressed"
+			elif ratio < 1 / (1 + tolerance):
+				status = "improved"
+		rows.append({
+			"id": bench_id,
+			"status": status,
+			"median_s": current["median_s"],
+			"baseline_s": base["median_s"],
+			"ratio": ratio,
+		})
+	return rows
+
+
+def _print_comparison(rows: List[Dict]) -> None:
+	print(f"{'benchmark':<48} {'median ms':>10} {'baseline':>10} {'ratio':>7}  status")
+	for row in rows:
+		baseline = f"{row['baseline_s'] * 1000:>10.3f}" if "baseline_s" in row else f"{'-':>10}"
+		ratio = f"{row['ratio']:>7.2f}" if "ratio" in row else f"{'-':>7}"
+		print(f"{row['id']:<48} {row['median_s'] * 1000:>10.3f} {baseline} {ratio}  {row['status']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--filter", help="only run benchmarks whose id contains this text")
+	parser.add_argument("--output", help="write the results as JSON to this path")
+	parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare with")
+	parser.add_argument("--save-baseline", action="store_true", help="write the results to --baseline instead of comparing")
+	parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown as a fraction (default 0.25)")
+	parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore differences smaller than this (default 1 ms)")
+	parser.add_argument("--min-runs", type=int, default=3)
+	parser.add_argument("--min-time", type=float, default=0.5, help="keep repeating each benchmark for at least this many seconds")
+	parser.add_argument("--max-runs", type=int, default=50)
+	args = parser.parse_args(argv)
+
+	results = run(args.filter, args.min_runs, args.min_time, args.max_runs)
+	if args.output:
+		with open(args.output, "w") as fh:
+			json.dump(results, fh, indent=2, sort_keys=True)
+	cpu_count = results["environment"]["cpu_count"]
+	baselines: Dict = {"by_cpu_count": {}}
+	if os.path.exists(args.baseline):
+		with open(args.baseline) as fh:
+			baselines = json.load(fh)
+	baseline = baseline_for(baselines, cpu_count)
+	if args.save_baseline:
+		# A filtered run only refreshes the benchmarks it ran
+		if baseline is None or not args.filter:
+			baseline = {"results": {}}
+		baseline["environment"] = results["environment"]
+		baseline["results"].update(results["results"])
+		baselines["by_cpu_count"][str(cpu_count)] = baseline
+		with open(args.baseline, "w") as fh:
+			json.dump(baselines, fh, indent=2, sort_keys=True)
+			fh.write("\n")
+		print(f"baseline for {cpu_count} CPU(s) written to {args.baseline}")
+		return 0
+	if baseline is None:
+		recorded = ", ".join(sorted(baselines["by_cpu_count"], key=int)) or "none"
+		print(
+			f"no baseline for {cpu_count} CPU(s) in {args.baseline} (recorded: {recorded}); "
+			"skipping the comparison, run with --save-baseline to record one"
+		)
+		return 0
+
+	base_packages = baseline.get("environment", {}).get("packages", {})
+	for name, version in results["environment"]["packages"].items():
+		if base_packages.get(name) != version:
+			print(f"note: {name} {base_packages.get(name)} in the baseline, {version} now")
+	rows = compare(results, baseline, args.tolerance, args.min_delta_ms / 1000)
+	_print_comparison(rows)
+	regressed = [row["id"] for row in rows if row["status"] == "regressed"]
+	if regressed:
+		print(f"{len(regressed)} benchmark(s) slower than the baseline by more than {args.tolerance:.0%}")
+		return 1
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
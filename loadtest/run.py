@@ -0,0 +1,381 @@
+"""Drive a mix of API traffic and report throughput and latency per endpoint.
+
+By default the API is started in a child process with local stand-ins (see
+``loadtest.standins``); ``--url`` targets an already running stack instead::
+
+	python -m loadtest.run --duration 30 --concurrency 16
+	python -m loadtest.run --mix submit=5,poll=10,wait=1,viz=1,result=1,admin=1 --output load.json
+	python -m loadtest.run --rate 50 --duration 60        # open loop: 50 requests/s
+	python -m loadtest.run --url http://localhost:8000    # against docker compose
+
+Closed-loop mode runs ``--concurrency`` virtual users back to back. With
+``--rate`` requests are started on a fixed schedule instead, and latency is
+measured from the scheduled start, so a slow server cannot hide its queueing
+(coordinated omission). After the run, submitted tasks are drained and their
+server-side timings (``timings_json``) are summarized as well.
+"""
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import random
+import socket
+import sys
+import time
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+import httpx
+
+DEFAULT_MIX = "submit=4,poll=10,wait=1,viz=1,result=1,admin=1"
+_TERMINAL = ("completed", "error", "cancelled")
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+	mix = {}
+	for part in text.split(","):
+		name, _, weight = part.partition("=")
+		if name.strip() not in OPERATIONS:
+			raise argparse.ArgumentTypeError(f"unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+		mix[name.strip()] = float(weight or 1)
+	return mix
+
+
+def circuit_qasm(num_qubits: int, depth: int, rng: random.Random) -> str:
+	"""A layered circuit with random rotation angles, written as QASM3 text directly."""
+	lines = ["OPENQASM 3.0;", 'include "stdgates.inc";', f"qubit[{num_qubits}] q;", f"bit[{num_qubits}] c;"]
+	for _ in range(depth):
+		for q in range(num_qubits):
+			lines.append(f"{rng.choice(('rx', 'ry', 'rz'))}({rng.uniform(0, 2 * math.pi):.6f}) q[{q}];")
+		for q in range(num_qubits - 1):
+			lines.append(f"cx q[{q}], q[{q + 1}];")
+	lines.extend(f"c[{q}] = measure q[{q}];" for q in range(num_qubits))
+	return "\n".join(lines) + "\n"
+
+
+class Recorder:
+	def __init__(self):
+		self.latencies: Dict[str, List[float]] = defaultdict(list)
+		self.errors: Dict[str, int] = defaultdict(int)
+		self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+	def record(self, label: str, started: float, status: Optional[int]) -> None:
+		self.latencies[label].append(time.perf_counter() - started)
+		if status is None:
+			self.errors[label] += 1
+			return
+		self.statuses[label][status] += 1
+		if status >= 400 and status != 404:
+			self.errors[label] += 1
+
+
+class State:
+	"""What the operations share: the HTTP client, recent task ids and the run options."""
+
+	def __init__(self, client: httpx.AsyncClient, args: argparse.Namespace, recorder: Recorder):
+		self.client = client
+		self.args = args
+		self.recorder = recorder
+		self.rng = random.Random(args.seed)
+		self.task_ids: Deque[str] = deque(maxlen=1000)
+		self.submitted: List[str] = []
+		# Repeated circuits exercise the result cache; fresh ones always simulate
+		self.pool = [circuit_qasm(args.qubits, args.depth, self.rng) for _ in range(args.circuit_pool)]
+
+	def some_task(self) -> Optional[str]:
+		return self.rng.choice(self.task_ids) if self.task_ids else None
+
+	async def request(self, label: str, method: str, url: str, started: float, **kwargs) -> Optional[httpx.Response]:
+		try:
+			response = await self.client.request(method, url, **kwargs)
+		except httpx.HTTPError:
+			self.recorder.record(label, started, None)
+			return None
+		self.recorder.record(label, started, response.status_code)
+		return response
+
+
+async def op_submit(state: State, started: float) -> None:
+	args = state.args
+	if state.rng.random() < args.unique:
+		qasm = circuit_qasm(args.qubits, args.depth, state.rng)
+	else:
+		qasm = state.rng.choice(state.pool)
+	response = await state.request("POST /tasks", "POST", "/tasks", started, json={"qc": qasm, "shots": args.shots})
+	if response is not None and response.status_code == 202:
+		task_id = response.json()["task_id"]
+		state.task_ids.append(task_id)
+		state.submitted.append(task_id)
+
+
+async def op_poll(state: State, started: float) -> None:
+	task_id = state.some_task()
+	if task_id:
+		await state.request("GET /tasks/{id}", "GET", f"/tasks/{task_id}", started)
+
+
+async def op_wait(state: State, started: float) -> None:
+	task_id = state.some_task()
+	if task_id:
+		await state.request("GET /tasks/{id}?wait", "GET", f"/tasks/{task_id}", started, params={"wait": state.args.wait})
+
+
+async def op_viz(state: State, started: float) -> None:
+	task_id = state.some_task()
+	if task_id:
+		fmt = state.args.viz_format
+		await state.request(f"GET /tasks/{{id}}/viz.{fmt}", "GET", f"/tasks/{task_id}/viz.{fmt}", started)
+
+
+async def op_result(state: State, started: float) -> None:
+	task_id = state.some_task()
+	if task_id:
+		await state.request("GET /tasks/{id}/result", "GET", f"/tasks/{task_id}/result", started, params={"top": 10})
+
+
+async def op_admin(state: State, started: float) -> None:
+	await state.request(
+		"GET /admin/tasks", "GET", "/admin/tasks", started,
+		params={"limit": 50}, headers={"x-admin-password": state.args.admin_password},
+	)
+
+
+OPERATIONS: Dict[str, Callable[[State, float], Awaitable[None]]] = {
+	"submit": op_submit,
+	"poll": op_poll,
+	"wait": op_wait,
+	"viz": op_viz,
+	"result": op_result,
+	"admin": op_admin,
+}
+
+
+def _pick(state: State, mix: Dict[str, float]) -> Callable[[State, float], Awaitable[None]]:
+	return OPERATIONS[state.rng.choices(list(mix), weights=list(mix.values()))[0]]
+
+
+async def closed_loop(state: State, mix: Dict[str, float], deadline: float, budget: List[int]) -> None:
+	async def user() -> None:
+		while time.perf_counter() < deadline and budget[0] > 0:
+			budget[0] -= 1
+			await _pick(state, mix)(state, time.perf_counter())
+
+	await asyncio.gather(*(user() for _ in range(state.args.concurrency)))
+
+
+async def open_loop(state: State, mix: Dict[str, float], deadline: float, budget: List[int]) -> None:
+	interval = 1.0 / state.args.rate
+	in_flight = asyncio.Semaphore(state.args.max_in_flight)
+	pending = set()
+	scheduled = time.perf_counter()
+
+	async def fire(op, at: float) -> None:
+		async with in_flight:
+			await op(state, at)
+
+	while scheduled < deadline and budget[0] > 0:
+		budget[0] -= 1
+		delay = scheduled - time.perf_counter()
+		if delay > 0:
+			await asyncio.sleep(delay)
+		task = asyncio.ensure_future(fire(_pick(state, mix), scheduled))
+		pending.add(task)
+		task.add_done_callback(pending.discard)
+		scheduled += interval
+	await asyncio.gather(*pending)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+	"""Nearest-rank percentile of an ascending list."""
+	if not sorted_values:
+		return float("nan")
+	rank = max(math.ceil(q / 100 * len(sorted_values)) - 1, 0)
+	return sorted_values[rank]
+
+
+def summarize(values: List[float], elapsed: Optional[float] = None) -> Dict[str, float]:
+	ordered = sorted(values)
+	summary = {
+		"count": len(ordered),
+		"p50_ms": percentile(ordered, 50) * 1000,
+		"p95_ms": percentile(ordered, 95) * 1000,
+		"p99_ms": percentile(ordered, 99) * 1000,
+		"max_ms": (ordered[-1] if ordered else float("nan")) * 1000,
+	}
+	if elapsed:
+		summary["throughput_rps"] = len(ordered) / elapsed
+	return summary
+
+
+async def drain(state: State, timeout: float) -> Dict[str, object]:
+	"""Wait for the submitted tasks to finish and summarize their server-side timings."""
+	remaining = set(state.submitted)
+	deadline = time.perf_counter() + timeout
+	statuses: Dict[str, str] = {}
+	while remaining and time.perf_counter() < deadline:
+		for task_id in list(remaining)[:200]:
+			try:
+				response = await state.client.get(f"/tasks/{task_id}")
+			except httpx.HTTPError:
+				continue
+			status = response.json().get("status") if response.status_code in (200, 202) else "missing"
+			if status in _TERMINAL or status == "missing":
+				statuses[task_id] = status
+				remaining.discard(task_id)
+		if remaining:
+			await asyncio.sleep(0.5)
+
+	timings: Dict[str, List[float]] = defaultdict(list)
+	cursor = None
+	wanted = set(state.submitted)
+	# The admin listing is newest first; stop once every submitted task has been seen
+	while wanted:
+		params = {"limit": 1000}
+		if cursor:
+			params["cursor"] = cursor
+		page = (await state.client.get(
+			"/admin/tasks", params=params, headers={"x-admin-password": state.args.admin_password},
+		)).json()
+		for row in page["tasks"]:
+			if row["id"] in wanted:
+				wanted.discard(row["id"])
+				for phase, seconds in (row.get("timings") or {}).items():
+					if phase.endswith("_s"):
+						timings[phase].append(seconds)
+		cursor = page.get("next_cursor")
+		if not cursor:
+			break
+
+	counts: Dict[str, int] = defaultdict(int)
+	for status in statuses.values():
+		counts[status] += 1
+	counts["unfinished"] = len(remaining)
+	return {
+		"submitted": len(state.submitted),
+		"distinct": len(set(state.submitted)),
+		"statuses": dict(counts),
+		"timings": {phase: summarize(values) for phase, values in sorted(timings.items())},
+	}
+
+
+async def run_load(args: argparse.Namespace, base_url: str) -> Dict[str, object]:
+	mix = args.mix
+	recorder = Recorder()
+	limits = httpx.Limits(max_connections=max(args.concurrency, args.max_in_flight if args.rate else 0, 10))
+	async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+		state = State(client, args, recorder)
+		# Seed some tasks so reads have something to hit from the first second
+		for _ in range(args.seed_tasks):
+			await op_submit(state, time.perf_counter())
+		recorder.__init__()
+		state.submitted.clear()
+
+		budget = [args.requests or sys.maxsize]
+		started = time.perf_counter()
+		deadline = started + args.duration
+		if args.rate:
+			await open_loop(state, mix, deadline, budget)
+		else:
+			await closed_loop(state, mix, deadline, budget)
+		elapsed = time.perf_counter() - started
+
+		endpoints = {}
+		for label in sorted(recorder.latencies):
+			endpoints[label] = summarize(recorder.latencies[label], elapsed)
+			endpoints[label]["errors"] = recorder.errors[label]
+			endpoints[label]["statuses"] = {str(k): v for k, v in sorted(recorder.statuses[label].items())}
+		total = summarize([v for values in recorder.latencies.values() for v in values], elapsed)
+		total["errors"] = sum(recorder.errors.values())
+		tasks = await drain(state, args.drain_timeout) if args.drain_timeout > 0 else None
+
+	return {
+		"config": {k: v for k, v in vars(args).items() if k != "mix"} | {"mix": mix, "base_url": base_url},
+		"elapsed_s": elapsed,
+		"endpoints": endpoints,
+		"total": total,
+		"tasks": tasks,
+	}
+
+
+def print_report(report: Dict[str, object]) -> None:
+	header = f"{'endpoint':<28} {'count':>7} {'errors':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+	print(header)
+	rows = list(report["endpoints"].items()) + [("total", report["total"])]
+	for label, s in rows:
+		print(
+			f"{label:<28} {s['count']:>7} {s['errors']:>6} {s['throughput_rps']:>8.1f} "
+			f"{s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f} {s['max_ms']:>9.1f}"
+		)
+	tasks = report.get("tasks")
+	if tasks:
+		print(f"\ntasks: {tasks['submitted']} submitted ({tasks['distinct']} distinct), {tasks['statuses']}")
+		for phase, s in tasks["timings"].items():
+			print(f"  {phase:<26} p50 {s['p50_ms']:>9.1f} ms  p95 {s['p95_ms']:>9.1f} ms  p99 {s['p99_ms']:>9.1f} ms")
+
+
+def _free_port() -> int:
+	with socket.socket() as sock:
+		sock.bind(("127.0.0.1", 0))
+		return sock.getsockname()[1]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--url", help="target a running API instead of starting one with stand-ins")
+	parser.add_argument("--database-url", help="stand-in database (default: a temporary SQLite file)")
+	parser.add_argument("--worker-concurrency", type=int, default=4, help="threads in the stand-in Celery worker")
+	parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"operation weights (default {DEFAULT_MIX})")
+	parser.add_argument("--duration", type=float, default=30, help="seconds of load (default 30)")
+	parser.add_argument("--requests", type=int, help="stop after this many requests")
+	parser.add_argument("--concurrency", type=int, default=16, help="closed-loop virtual users (default 16)")
+	parser.add_argument("--rate", type=float, help="open loop: start this many requests per second")
+	parser.add_argument("--max-in-flight", type=int, default=500, help="open loop: cap on concurrent requests")
+	parser.add_argument("--qubits", type=int, default=3)
+	parser.add_argument("--depth", type=int, default=5)
+	parser.add_argument("--shots", type=int, default=1024)
+	parser.add_argument("--unique", type=float, default=0.5, help="fraction of submits with a fresh circuit (default 0.5)")
+	parser.add_argument("--circuit-pool", type=int, default=20, help="distinct circuits reused by the other submits")
+	parser.add_argument("--viz-format", choices=("png", "svg", "txt"), default="png")
+	parser.add_argument("--wait", type=float, default=5, help="long-poll seconds for the wait operation")
+	parser.add_argument("--seed-tasks", type=int, default=10, help="tasks submitted before measuring starts")
+	parser.add_argument("--drain-timeout", type=float, default=60, help="seconds to wait for submitted tasks (0 skips)")
+	parser.add_argument("--timeout", type=float, default=60, help="per-request timeout")
+	parser.add_argument("--admin-password", default="classiq")
+	parser.add_argument("--seed", type=int, default=1234)
+	parser.add_argument("--output", help="write the report as JSON to this path")
+	args = parser.parse_args(argv)
+
+	server = None
+	base_url = args.url
+	if base_url is None:
+		from .standins import serve
+
+		port = _free_port()
+		ctx = multiprocessing.get_context("spawn")
+		ready = ctx.Event()
+		server = ctx.Process(target=serve, args=(port, args.database_url, args.worker_concurrency, ready))
+		server.start()
+		# Not a daemon: the API starts its own process pool for rendering
+		if not ready.wait(120) or not server.is_alive():
+			server.terminate()
+			print("stand-in API did not start", file=sys.stderr)
+			return 1
+		base_url = f"http://127.0.0.1:{port}"
+
+	try:
+		report = asyncio.run(run_load(args, base_url))
+	finally:
+		if server is not None:
+			server.terminate()
+			server.join(30)
+
+	print_report(report)
+	if args.output:
+		with open(args.output, "w") as fh:
+			json.dump(report, fh, indent=2)
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
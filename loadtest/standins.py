@@ -0,0 +1,100 @@
+"""Run the API and a Celery worker in one process without Docker.
+
+Postgres is replaced by SQLite (or any SQLAlchemy URL, e.g. a local or
+embedded Postgres), Redis by fakeredis, and the broker by Celery's in-memory
+transport with a worker thread consuming every queue. Tasks still run
+asynchronously, so submit latency does not include simulation time.
+
+Everything here must run before ``app.main`` (and ``app.celery_app``) are
+imported: those modules bind the session factories at import time.
+"""
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+logger = logging.getLogger("loadtest")
+
+
+def _engine_urls(database_url: Optional[str]) -> Tuple[str, str]:
+	"""Return ``(sync_url, async_url)`` for the stand-in database."""
+	if database_url is None:
+		path = os.path.join(tempfile.mkdtemp(prefix="qtask-loadtest-"), "tasks.db")
+		return f"sqlite:///{path}", f"sqlite+aiosqlite:///{path}"
+	if database_url.startswith("sqlite"):
+		path = database_url.split("///", 1)[1]
+		return f"sqlite:///{path}", f"sqlite+aiosqlite:///{path}"
+	base = database_url.split("://", 1)[1]
+	return f"postgresql+psycopg2://{base}", f"postgresql+asyncpg://{base}"
+
+
+def install(database_url: Optional[str] = None) -> None:
+	import fakeredis
+	import fakeredis.aioredis
+	from sqlalchemy import create_engine
+	from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+	from sqlalchemy.orm import sessionmaker
+
+	from app import db, redis_client
+
+	sync_url, async_url = _engine_urls(database_url)
+	if sync_url.startswith("sqlite"):
+		# SQLite serializes writers; wait for the lock instead of failing under load
+		db.engine = create_engine(sync_url, connect_args={"check_same_thread": False, "timeout": 30})
+		db.async_engine = create_async_engine(async_url, connect_args={"timeout": 30})
+	else:
+		db.engine = create_engine(sync_url, pool_pre_ping=True, pool_size=20, max_overflow=20)
+		db.async_engine = create_async_engine(async_url, pool_pre_ping=True, pool_size=20, max_overflow=20)
+	db.SessionLocal = sessionmaker(bind=db.engine, autoflush=False, autocommit=False)
+	db.AsyncSessionLocal = async_sessionmaker(bind=db.async_engine, autoflush=False, expire_on_commit=False)
+	db.init_db()
+
+	server = fakeredis.FakeServer()
+	redis_client._client = fakeredis.FakeRedis(server=server)
+	redis_client._async_client = fakeredis.aioredis.FakeRedis(server=server)
+
+	from app.celery_app import celery
+
+	celery.conf.update(broker_url="memory://", result_backend="cache+memory://")
+	logger.info("standins_installed", extra={"database": sync_url})
+
+
+@contextmanager
+def celery_worker(concurrency: int) -> Iterator[None]:
+	"""Consume every queue in a thread-pool worker inside this process."""
+	from celery.contrib.testing.worker import start_worker
+
+	from app.celery_app import QUEUE_BATCH, QUEUE_HEAVY, QUEUE_INTERACTIVE, celery
+
+	with start_worker(
+		celery,
+		pool="threads",
+		concurrency=concurrency,
+		perform_ping_check=False,
+		loglevel="WARNING",
+		queues=[QUEUE_INTERACTIVE, QUEUE_BATCH, QUEUE_HEAVY],
+		shutdown_timeout=60.0,
+	):
+		yield
+
+
+def serve(port: int, database_url: Optional[str], worker_concurrency: int, ready) -> None:
+	"""Process entry point: install the stand-ins, start a worker and serve the API on ``port``."""
+	import uvicorn
+
+	install(database_url)
+	from app.main import app
+
+	with celery_worker(worker_concurrency):
+		config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on")
+		server = uvicorn.Server(config)
+		original_startup = server.startup
+
+		async def startup(sockets=None):
+			await original_startup(sockets=sockets)
+			if not server.should_exit:
+				ready.set()
+
+		server.startup = startup
+		server.run()
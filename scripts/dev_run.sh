@@ -11,8 +11,8 @@ usage() {
 Usage: scripts/dev_run.sh <command> [--with-logs]
 
 Commands:
-  up               Build and start containers (api, worker, db, redis)
-  logs             Follow api and worker logs
+  up               Build and start containers (api, workers, db, redis)
+  logs             Follow api and worker logs (all queues)
   submit-example   Submit examples/basic.qasm3 and poll until completion
   async-test       Run tests/test_async_multi_submit.py inside the api container
   e2e-test         Run tests/test_api_end_to_end.py inside the api container
@@ -32,13 +32,13 @@ USAGE
 
 up() {
 	echo "[dev] building images..."
-	docker compose build api worker >/dev/null
+	docker compose build api worker worker-batch worker-heavy beat >/dev/null
 	echo "[dev] starting services..."
 	docker compose up -d
 }
 
 stream_logs() {
-	docker compose logs -f api worker
+	docker compose logs -f api worker worker-batch worker-heavy
 }
 
 submit_example() {
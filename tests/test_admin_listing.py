@@ -0,0 +1,35 @@
+import requests
+
+BASE = "http://localhost:8000"
+PASSWORD = "classiq"
+
+
+def _list(**params) -> requests.Response:
+    return requests.get(f"{BASE}/admin/tasks", params={"password": PASSWORD, **params})
+
+
+def test_admin_listing_requires_password():
+    assert requests.get(f"{BASE}/admin/tasks").status_code == 401
+
+
+def test_admin_listing_pages_do_not_overlap():
+    first = _list(limit=2)
+    assert first.status_code == 200
+    page1 = first.json()
+    assert len(page1["tasks"]) <= 2
+    if not page1["next_cursor"]:
+        return  # fewer than three tasks in the store
+
+    page2 = _list(limit=2, cursor=page1["next_cursor"]).json()
+    ids1 = {t["id"] for t in page1["tasks"]}
+    ids2 = {t["id"] for t in page2["tasks"]}
+    assert ids1.isdisjoint(ids2)
+    # Newest first across the page boundary
+    assert page1["tasks"][-1]["submitted_at"] >= page2["tasks"][0]["submitted_at"]
+
+
+def test_admin_listing_status_filter_and_bad_cursor():
+    data = _list(status="completed", limit=20).json()
+    assert all(t["status"] == "completed" for t in data["tasks"])
+    assert all(t["has_result"] for t in data["tasks"])
+    assert _list(cursor="not-a-cursor").status_code == 400
@@ -0,0 +1,65 @@
+import random
+
+import pytest
+import requests
+from qiskit import QuantumCircuit
+from qiskit.qasm3 import dumps as qasm3_dumps
+
+from app.stats import RUNTIME_BUCKETS, percentiles
+
+BASE = "http://localhost:8000"
+ADMIN_HEADERS = {"x-admin-password": "classiq"}
+
+
+def build_unique_qasm3() -> str:
+    qc = QuantumCircuit(2, 2)
+    qc.rz(random.random(), 0)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    return qasm3_dumps(qc)
+
+
+def test_percentiles_from_histogram():
+    histogram = [0] * (len(RUNTIME_BUCKETS) + 1)
+    assert percentiles(histogram) == {"p50": None, "p90": None, "p99": None}
+    # 100 runs between 0.5 s and 1 s
+    histogram[RUNTIME_BUCKETS.index(1)] = 100
+    result = percentiles(histogram)
+    assert result["p50"] == pytest.approx(0.75)
+    assert result["p99"] == pytest.approx(0.995)
+    # Runs past the last bound report that bound
+    histogram[-1] = 900
+    assert percentiles(histogram)["p99"] == RUNTIME_BUCKETS[-1]
+
+
+def test_stats_requires_password():
+    assert requests.get(f"{BASE}/admin/stats").status_code == 401
+
+
+def test_stats_follow_submissions_and_completions():
+    before = requests.get(f"{BASE}/admin/stats", headers=ADMIN_HEADERS).json()
+    task_id = requests.post(f"{BASE}/tasks", json={"qc": build_unique_qasm3()}).json()["task_id"]
+    r = requests.get(f"{BASE}/tasks/{task_id}", params={"wait": 30}, timeout=40)
+    assert r.json()["status"] == "completed"
+
+    after = requests.get(f"{BASE}/admin/stats", headers=ADMIN_HEADERS).json()
+    assert after["counts"]["completed"] >= before["counts"]["completed"] + 1
+    assert len(after["per_minute"]) == after["window_minutes"]
+    # Submitted this minute or, across a minute boundary, the one before
+    assert sum(m["submitted"] for m in after["per_minute"][-2:]) >= 1
+    assert after["runtime_s"]["count"] >= 1
+    assert after["runtime_s"]["p50"] > 0
+    # None when the broker's queues cannot be read (e.g. an in-memory broker)
+    depth = after["queue_depth"]
+    assert depth is None or set(depth) >= {"interactive", "batch", "heavy", "microbatch"}
+
+
+def test_stats_count_cancellations():
+    before = requests.get(f"{BASE}/admin/stats", headers=ADMIN_HEADERS).json()["counts"]
+    r = requests.post(f"{BASE}/tasks", json={"qc": build_unique_qasm3()})
+    task_id = r.json()["task_id"]
+    if requests.delete(f"{BASE}/tasks/{task_id}").status_code != 200:
+        pytest.skip("task finished before it could be cancelled")
+    after = requests.get(f"{BASE}/admin/stats", headers=ADMIN_HEADERS).json()["counts"]
+    assert after["cancelled"] == before["cancelled"] + 1
@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from app.archive import deserialize, read_archived, serialize, write_archive
+from app.db import Task
+
+
+def _task(i: int) -> Task:
+    return Task(
+        id=f"task-{i}",
+        status="completed",
+        submitted_at=datetime(2024, 1, 1, 12, 0, i % 60),
+        updated_at=datetime(2024, 1, 1, 12, 1),
+        qc_qasm3="OPENQASM 3.0;\nqubit[1] q;\n",
+        result_json={"0": 1024},
+        result_blob=b"\x00\x01binary" if i % 2 else None,
+        shots=1024,
+        seed=i,
+    )
+
+
+def test_serialized_rows_round_trip():
+    task = _task(1)
+    row = deserialize(serialize(task))
+    assert row["submitted_at"] == task.submitted_at
+    assert row["result_blob"] == task.result_blob
+    assert row["result_json"] == {"0": 1024}
+
+
+def test_rows_are_found_in_their_block(tmp_path):
+    rows = [serialize(_task(i)) for i in range(150)]
+    relative, entries = write_archive(str(tmp_path), rows)
+    assert relative.endswith(".jsonl.gz")
+    # Several blocks, each readable on its own
+    assert len({offset for _, offset, _ in entries}) > 1
+    for task_id, offset, length in (entries[0], entries[99], entries[-1]):
+        row = read_archived(str(tmp_path), relative, offset, length, task_id)
+        assert row["id"] == task_id
+    _, offset, length = entries[0]
+    assert read_archived(str(tmp_path), relative, offset, length, "task-149") is None
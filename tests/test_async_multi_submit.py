@@ -8,8 +8,10 @@ from qiskit.qasm3 import dumps as qasm3_dumps
 BASE = "http://localhost:8000"
 
 
-def build_qasm3() -> str:
+def build_qasm3(variant: int = 0) -> str:
     qc = QuantumCircuit(2, 2)
+    # Distinct (but equivalent) circuits so result deduplication doesn't merge them
+    qc.rz(0.001 * variant, 0)
     qc.h(0)
     qc.cx(0, 1)
     qc.measure([0, 1], [0, 1])
@@ -31,17 +33,15 @@ def get(task_id: str) -> dict:
 
 
 def test_concurrent_submissions_complete_without_loss():
-    qasm = build_qasm3()
-
     num_tasks = 8
     task_ids: list[str] = []
 
     # submit concurrently
-    def worker():
-        tid = submit(qasm)
+    def worker(variant: int):
+        tid = submit(build_qasm3(variant))
         task_ids.append(tid)
 
-    threads = [threading.Thread(target=worker) for _ in range(num_tasks)]
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(num_tasks)]
     for t in threads:
         t.start()
     for t in threads:
@@ -0,0 +1,50 @@
+import time
+
+import requests
+from qiskit import QuantumCircuit
+from qiskit.qasm3 import dumps as qasm3_dumps
+
+BASE = "http://localhost:8000"
+
+
+def build_qasm3(flip: bool) -> str:
+    qc = QuantumCircuit(2, 2)
+    if flip:
+        qc.x(0)
+    else:
+        qc.h(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    return qasm3_dumps(qc)
+
+
+def test_batch_submit_and_aggregate_status():
+    payload = {"tasks": [{"qc": build_qasm3(flip=i % 2 == 1)} for i in range(10)]}
+    r = requests.post(f"{BASE}/tasks/batch", json=payload)
+    assert r.status_code == 202
+    data = r.json()
+    batch_id = data["batch_id"]
+    assert len(data["task_ids"]) == 10
+    assert len(set(data["task_ids"])) == 10
+
+    deadline = time.time() + 90
+    while time.time() < deadline:
+        status = requests.get(f"{BASE}/tasks/batch/{batch_id}").json()
+        assert status["total"] == 10
+        if status["done"]:
+            break
+        time.sleep(0.5)
+    else:
+        raise AssertionError("Batch did not finish in time")
+
+    assert status["counts"]["completed"] == 10
+    # Results come back in submission order
+    assert [t["task_id"] for t in status["tasks"]] == data["task_ids"]
+    assert status["tasks"][1]["result"] == {"11": 1024}
+
+
+def test_batch_rejects_empty_and_unknown():
+    assert requests.post(f"{BASE}/tasks/batch", json={"tasks": []}).status_code == 422
+    r = requests.get(f"{BASE}/tasks/batch/does-not-exist")
+    assert r.status_code == 404
+    assert r.json()["status"] == "error"
@@ -0,0 +1,52 @@
+import json
+
+from benchmarks import run
+from benchmarks.corpus import cases, layered_circuit
+from benchmarks.run import baseline_for, compare
+
+
+def _results(**medians):
+    return {"results": {k: {"median_s": v} for k, v in medians.items()}}
+
+
+def test_corpus_is_deterministic():
+    assert layered_circuit(4, 3) == layered_circuit(4, 3)
+    names = [case.name for case in cases()]
+    assert len(names) == len(set(names))
+
+
+def test_compare_flags_regressions_beyond_tolerance():
+    baseline = _results(fast=0.100, slow=0.100, same=0.100, tiny=0.0001)
+    current = _results(fast=0.050, slow=0.200, same=0.110, tiny=0.0005, added=1.0)
+    status = {row["id"]: row["status"] for row in compare(current, baseline, tolerance=0.25, min_delta_s=0.001)}
+    assert status == {
+        "fast": "improved",
+        "slow": "regressed",
+        "same": "ok",
+        # 5x slower but below min_delta_s: noise
+        "tiny": "ok",
+        "added": "new",
+    }
+
+
+def test_baselines_are_keyed_by_cpu_count(tmp_path, monkeypatch):
+    single = {"environment": {"cpu_count": 1}, "results": {"slow": {"median_s": 0.100}}}
+    baselines = {"by_cpu_count": {"1": single}}
+    assert baseline_for(baselines, 1) is single
+    assert baseline_for(baselines, 8) is None
+
+    # A much slower run on another CPU count is not compared with the 1-CPU numbers
+    current = {"environment": {"cpu_count": 8, "packages": {}}, "results": {"slow": {"median_s": 1.0}}}
+    monkeypatch.setattr(run, "run", lambda *args: current)
+    path = tmp_path / "baseline.json"
+    path.write_text(json.dumps(baselines))
+    assert run.main(["--baseline", str(path)]) == 0
+
+    # Saving adds this machine's baseline next to the others
+    assert run.main(["--baseline", str(path), "--save-baseline"]) == 0
+    saved = json.loads(path.read_text())["by_cpu_count"]
+    assert saved["1"] == single
+    assert saved["8"]["results"] == current["results"]
+    assert run.main(["--baseline", str(path)]) == 0
+    current["results"]["slow"]["median_s"] = 2.0
+    assert run.main(["--baseline", str(path)]) == 1
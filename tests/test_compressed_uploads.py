@@ -0,0 +1,101 @@
+import gzip
+import json
+
+import pytest
+import requests
+import zstandard
+
+from app.compression import _GzipInflater, _TooLarge, _ZstdInflater, compress_qasm, stored_qasm
+
+BASE = "http://localhost:8000"
+
+BELL_QASM = (
+    "OPENQASM 3.0;\n"
+    "include \"stdgates.inc\";\n"
+    "qubit[2] q;\n"
+    "bit[2] c;\n"
+    "h q[0];\n"
+    "cx q[0], q[1];\n"
+    "c[0] = measure q[0];\n"
+    "c[1] = measure q[1];\n"
+)
+
+
+def test_stored_qasm_prefers_the_compressed_column():
+    assert stored_qasm(compress_qasm(BELL_QASM), None) == BELL_QASM
+    # Rows from before compressed storage
+    assert stored_qasm(None, BELL_QASM) == BELL_QASM
+
+
+@pytest.mark.parametrize("inflater, compress", [
+    (_GzipInflater, gzip.compress),
+    (_ZstdInflater, lambda data: zstandard.ZstdCompressor().compress(data)),
+])
+def test_inflaters_stop_at_the_limit(inflater, compress):
+    data = compress(BELL_QASM.encode())
+    decoder = inflater(len(BELL_QASM))
+    assert decoder.feed(data[:10]) + decoder.feed(data[10:]) == BELL_QASM.encode()
+    decoder.finish()
+
+    bomb = compress(b" " * 10_000_000)
+    with pytest.raises(_TooLarge):
+        inflater(1000).feed(bomb)
+
+
+def test_submit_gzip_encoded_json():
+    body = gzip.compress(json.dumps({"qc": BELL_QASM, "seed": 2020}).encode())
+    r = requests.post(
+        f"{BASE}/tasks",
+        data=body,
+        headers={"Content-Encoding": "gzip", "Content-Type": "application/json"},
+    )
+    assert r.status_code == 202, r.text
+    task_id = r.json()["task_id"]
+    g = requests.get(f"{BASE}/tasks/{task_id}", params={"wait": 30}, timeout=40)
+    assert g.json()["status"] == "completed"
+    assert sum(g.json()["result"].values()) == 1024
+
+
+def test_upload_raw_and_zstd_circuit():
+    r = requests.post(f"{BASE}/tasks/upload", params={"shots": 100, "seed": 2021}, data=BELL_QASM.encode())
+    assert r.status_code == 202, r.text
+
+    compressed = zstandard.ZstdCompressor().compress(BELL_QASM.encode())
+    r = requests.post(
+        f"{BASE}/tasks/upload",
+        params={"shots": 100, "seed": 2022},
+        data=compressed,
+        headers={"Content-Encoding": "zstd"},
+    )
+    assert r.status_code == 202, r.text
+    task_id = r.json()["task_id"]
+    g = requests.get(f"{BASE}/tasks/{task_id}", params={"wait": 30}, timeout=40)
+    assert g.json()["status"] == "completed"
+    assert sum(g.json()["result"].values()) == 100
+
+    # The admin download serves the text back from compressed storage
+    q = requests.get(f"{BASE}/admin/tasks/{task_id}/qasm3", headers={"x-admin-password": "classiq"})
+    assert q.text == BELL_QASM
+
+
+def test_rejected_encodings_and_bodies():
+    r = requests.post(f"{BASE}/tasks", data=b"x", headers={"Content-Encoding": "br"})
+    assert r.status_code == 415
+    r = requests.post(f"{BASE}/tasks/upload", data=b"not gzip", headers={"Content-Encoding": "gzip"})
+    assert r.status_code == 400
+    # Inflates past MAX_DECOMPRESSED_BYTES (16 MiB by default) from well under 100 KiB
+    bomb = gzip.compress(b" " * (64 * 1024 * 1024))
+    r = requests.post(f"{BASE}/tasks/upload", data=bomb, headers={"Content-Encoding": "gzip"})
+    assert r.status_code == 413
+
+
+@pytest.mark.parametrize("encoding, compress", [
+    ("gzip", gzip.compress),
+    ("zstd", lambda data: zstandard.ZstdCompressor().compress(data)),
+])
+def test_truncated_bodies_are_rejected(encoding, compress):
+    body = compress(BELL_QASM.encode())[:-4]
+    r = requests.post(f"{BASE}/tasks/upload", data=body, headers={"Content-Encoding": encoding})
+    assert r.status_code == 400, r.text
+    # Refused by the decoder, not passed on as a shorter body
+    assert r.json()["detail"].startswith(f"Invalid {encoding} body"), r.text
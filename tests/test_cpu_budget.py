@@ -0,0 +1,97 @@
+import multiprocessing
+import random
+
+import requests
+from qiskit import QuantumCircuit
+from qiskit.qasm3 import dumps as qasm3_dumps
+
+from app import celery_app, quantum
+from app.celery_app import cpu_budget
+from app.config import settings
+from app.quantum import (
+    aer_parallelism, run_circuit, run_circuits, set_thread_budget, set_thread_lease, thread_budget,
+)
+
+BASE = "http://localhost:8000"
+ADMIN_HEADERS = {"x-admin-password": "classiq"}
+
+
+def bell() -> QuantumCircuit:
+    qc = QuantumCircuit(2, 2)
+    qc.rz(random.random(), 0)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    return qc
+
+
+def test_cpu_budget_setting_overrides_detection(monkeypatch):
+    assert cpu_budget() >= 1
+    monkeypatch.setattr(settings, "worker_cpu_budget", 3)
+    assert cpu_budget() == 3
+
+
+def test_parallelism_depends_on_circuit_size():
+    previous = thread_budget()
+    set_thread_budget(8)
+    try:
+        large = aer_parallelism(settings.aer_parallel_min_qubits)
+        assert large == {"max_parallel_threads": 8, "max_parallel_experiments": 1, "max_parallel_shots": 1}
+        assert aer_parallelism(settings.aer_parallel_min_qubits, experiments=4)["max_parallel_experiments"] == 1
+        assert aer_parallelism(2)["max_parallel_threads"] == 1
+        assert aer_parallelism(2, experiments=3)["max_parallel_experiments"] == 3
+        assert aer_parallelism(2, experiments=100)["max_parallel_threads"] == 8
+        # Simulators created earlier follow the new budget
+        assert quantum.get_simulator().options.max_parallel_threads == 8
+    finally:
+        set_thread_budget(previous)
+
+
+def test_prefork_processes_lease_free_threads(monkeypatch):
+    # Two prefork children sharing an 8-thread budget
+    monkeypatch.setattr(celery_app, "_leases", multiprocessing.Array("i", 2))
+    monkeypatch.setattr(celery_app, "_lease_budget", 8)
+    previous = thread_budget()
+    set_thread_budget(8)
+    set_thread_lease(celery_app._lease_threads)
+    try:
+        # Alone, a large circuit gets the whole budget rather than half of it
+        monkeypatch.setattr(celery_app, "_lease_index", 0)
+        assert aer_parallelism(settings.aer_parallel_min_qubits)["max_parallel_threads"] == 8
+        # The other child gets what is left, and never less than one thread
+        monkeypatch.setattr(celery_app, "_lease_index", 1)
+        assert aer_parallelism(settings.aer_parallel_min_qubits)["max_parallel_threads"] == 1
+        monkeypatch.setattr(celery_app, "_lease_index", 0)
+        assert aer_parallelism(2, experiments=3)["max_parallel_threads"] == 3
+        monkeypatch.setattr(celery_app, "_lease_index", 1)
+        assert aer_parallelism(settings.aer_parallel_min_qubits)["max_parallel_threads"] == 5
+        # Finishing a task frees its threads
+        monkeypatch.setattr(celery_app, "_lease_index", 0)
+        celery_app._release_threads()
+        monkeypatch.setattr(celery_app, "_lease_index", 1)
+        assert aer_parallelism(settings.aer_parallel_min_qubits)["max_parallel_threads"] == 8
+    finally:
+        set_thread_lease(None)
+        set_thread_budget(previous)
+
+
+def test_runs_report_their_threads():
+    previous = thread_budget()
+    set_thread_budget(4)
+    try:
+        stats = {}
+        run_circuit(bell(), shots=10, stats=stats)
+        assert stats["threads"] == 1
+        run_circuits([bell(), bell()], shots=10, stats=stats)
+        assert stats["threads"] == 2
+    finally:
+        set_thread_budget(previous)
+
+
+def test_completed_task_records_threads():
+    task_id = requests.post(f"{BASE}/tasks", json={"qc": qasm3_dumps(bell())}).json()["task_id"]
+    r = requests.get(f"{BASE}/tasks/{task_id}", params={"wait": 30}, timeout=40)
+    assert r.json()["status"] == "completed"
+    tasks = requests.get(f"{BASE}/admin/tasks", headers=ADMIN_HEADERS, params={"limit": 50}).json()["tasks"]
+    timings = next(t for t in tasks if t["id"] == task_id)["timings"]
+    assert timings["threads"] == 1
@@ -0,0 +1,66 @@
+import pytest
+import requests
+
+from app.quantum import circuit_from_qasm3, compile_expectation, compile_submission, run_expectation
+
+BASE = "http://localhost:8000"
+
+BELL_QASM = (
+    "OPENQASM 3.0;\n"
+    "include \"stdgates.inc\";\n"
+    "qubit[2] q;\n"
+    "bit[2] c;\n"
+    "h q[0];\n"
+    "cx q[0], q[1];\n"
+    "c[0] = measure q[0];\n"
+    "c[1] = measure q[1];\n"
+)
+
+MID_CIRCUIT_QASM = (
+    "OPENQASM 3.0;\n"
+    "include \"stdgates.inc\";\n"
+    "qubit[2] q;\n"
+    "bit[2] c;\n"
+    "h q[0];\n"
+    "c[0] = measure q[0];\n"
+    "cx q[0], q[1];\n"
+)
+
+OBSERVABLES = [{"ZZ": 1.0}, {"XX": 1.0, "ZI": 0.5}, {"IZ": 2.0}]
+
+
+@pytest.mark.parametrize("method", ["statevector", "stabilizer", "matrix_product_state"])
+def test_bell_expectations_are_exact(method):
+    values = run_expectation(circuit_from_qasm3(BELL_QASM), OBSERVABLES, method=method)
+    assert values == pytest.approx([1.0, 1.0, 0.0], abs=1e-9)
+
+
+def test_compile_expectation_validates_observables_and_circuit():
+    compiled = compile_expectation(BELL_QASM, OBSERVABLES)
+    assert compiled["observables"] == OBSERVABLES
+    # No sampling: far cheaper than the same circuit with the default shots
+    assert compiled["cost_estimate"] < compile_submission(BELL_QASM)["cost_estimate"]
+    with pytest.raises(ValueError, match="3 qubits"):
+        compile_expectation(BELL_QASM, [{"ZZZ": 1.0}])
+    with pytest.raises(ValueError, match="Pauli"):
+        compile_expectation(BELL_QASM, [{"AB": 1.0}])
+    with pytest.raises(ValueError, match="mid-circuit"):
+        compile_expectation(MID_CIRCUIT_QASM, [{"ZZ": 1.0}])
+
+
+def test_submit_expectation_task():
+    r = requests.post(f"{BASE}/tasks/expectation", json={"qc": BELL_QASM, "observables": ["ZZ", {"XX": 1.0, "ZI": 0.5}]})
+    assert r.status_code == 202, r.text
+    task_id = r.json()["task_id"]
+    g = requests.get(f"{BASE}/tasks/{task_id}", params={"wait": 30}, timeout=40)
+    body = g.json()
+    assert body["status"] == "completed"
+    assert body["values"] == pytest.approx([1.0, 1.0], abs=1e-9)
+    assert requests.get(f"{BASE}/tasks/{task_id}/result").status_code == 400
+
+
+def test_expectation_rejects_bad_observables():
+    r = requests.post(f"{BASE}/tasks/expectation", json={"qc": BELL_QASM, "observables": ["ZZZ"]})
+    assert r.status_code == 422
+    r = requests.post(f"{BASE}/tasks/expectation", json={"qc": MID_CIRCUIT_QASM, "observables": ["ZZ"]})
+    assert r.status_code == 422
@@ -0,0 +1,29 @@
+import argparse
+import random
+
+import pytest
+
+from app.quantum import circuit_from_qasm3
+from loadtest.run import circuit_qasm, parse_mix, percentile, summarize
+
+
+def test_generated_circuits_parse():
+    qc = circuit_from_qasm3(circuit_qasm(3, 4, random.Random(1)))
+    assert qc.num_qubits == 3
+    assert qc.count_ops()["measure"] == 3
+
+
+def test_parse_mix():
+    assert parse_mix("submit=2,poll=10,admin") == {"submit": 2.0, "poll": 10.0, "admin": 1.0}
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_mix("submit=1,delete=1")
+
+
+def test_percentiles_use_nearest_rank():
+    values = [i / 1000 for i in range(1, 101)]
+    assert percentile(values, 50) == 0.050
+    assert percentile(values, 99) == 0.099
+    summary = summarize(values, elapsed=2.0)
+    assert summary["count"] == 100
+    assert summary["throughput_rps"] == 50
+    assert summary["max_ms"] == 100
@@ -0,0 +1,38 @@
+import random
+import time
+
+import requests
+from qiskit import QuantumCircuit
+from qiskit.qasm3 import dumps as qasm3_dumps
+
+BASE = "http://localhost:8000"
+
+
+def build_unique_qasm3() -> str:
+    qc = QuantumCircuit(2, 2)
+    qc.rz(random.random(), 0)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    return qasm3_dumps(qc)
+
+
+def test_wait_returns_completed_result():
+    task_id = requests.post(f"{BASE}/tasks", json={"qc": build_unique_qasm3()}).json()["task_id"]
+    r = requests.get(f"{BASE}/tasks/{task_id}", params={"wait": 30}, timeout=40)
+    assert r.status_code == 200
+    data = r.json()
+    assert data["status"] == "completed"
+    assert set(data["result"].keys()).issubset({"00", "11"})
+
+
+def test_wait_on_unknown_task_returns_404_immediately():
+    start = time.time()
+    r = requests.get(f"{BASE}/tasks/does-not-exist", params={"wait": 10}, timeout=15)
+    assert r.status_code == 404
+    assert time.time() - start < 5
+
+
+def test_wait_is_bounded():
+    r = requests.get(f"{BASE}/tasks/does-not-exist", params={"wait": 100000})
+    assert r.status_code == 422
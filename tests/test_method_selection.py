@@ -0,0 +1,77 @@
+import pytest
+import requests
+from qiskit import QuantumCircuit
+from qiskit.qasm3 import dumps as qasm3_dumps
+
+from app.quantum import analyze_circuit, compile_submission, select_method
+
+BASE = "http://localhost:8000"
+
+
+def ghz(num_qubits: int, t_gate: bool = False) -> QuantumCircuit:
+    qc = QuantumCircuit(num_qubits, num_qubits)
+    qc.h(0)
+    for i in range(num_qubits - 1):
+        qc.cx(i, i + 1)
+    if t_gate:
+        qc.t(0)
+    qc.measure(range(num_qubits), range(num_qubits))
+    return qc
+
+
+def test_wide_clifford_circuit_uses_stabilizer():
+    method, _ = select_method(analyze_circuit(ghz(40)))
+    assert method == "stabilizer"
+
+
+def test_wide_low_entanglement_circuit_uses_mps():
+    analysis = analyze_circuit(ghz(40, t_gate=True))
+    assert not analysis["clifford"]
+    assert analysis["max_bond_log2"] <= 2
+    method, _ = select_method(analysis)
+    assert method == "matrix_product_state"
+
+
+def test_dense_circuit_uses_statevector():
+    qc = QuantumCircuit(6, 6)
+    for layer in range(6):
+        for i in range(6):
+            qc.t(i)
+            qc.h(i)
+        for i in range(6):
+            for j in range(i + 1, 6):
+                qc.cx(i, j)
+    qc.measure(range(6), range(6))
+    method, _ = select_method(analyze_circuit(qc))
+    assert method == "statevector"
+
+
+def test_loop_bodies_count_per_iteration():
+    qc = QuantumCircuit(2, 2)
+    with qc.for_loop(range(5)):
+        qc.h(0)
+        qc.cx(0, 1)
+    assert analyze_circuit(qc)["num_ops"] == 10
+
+
+def test_requested_method_is_validated():
+    with pytest.raises(ValueError):
+        compile_submission(qasm3_dumps(ghz(3, t_gate=True)), "stabilizer")
+    compiled = compile_submission(qasm3_dumps(ghz(3)), "statevector")
+    assert compiled["sim_method"] == "statevector"
+    assert compiled["sim_cost"] > 0
+
+
+def test_submit_rejects_stabilizer_for_non_clifford_circuit():
+    r = requests.post(f"{BASE}/tasks", json={"qc": qasm3_dumps(ghz(3, t_gate=True)), "method": "stabilizer"})
+    assert r.status_code == 422
+    assert "clifford" in r.json()["detail"].lower()
+
+
+def test_wide_clifford_task_completes():
+    r = requests.post(f"{BASE}/tasks", json={"qc": qasm3_dumps(ghz(34))})
+    assert r.status_code == 202
+    task_id = r.json()["task_id"]
+    g = requests.get(f"{BASE}/tasks/{task_id}", params={"wait": 30}, timeout=40)
+    assert g.json()["status"] == "completed"
+    assert set(g.json()["result"]) == {"0" * 34, "1" * 34}
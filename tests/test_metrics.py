@@ -0,0 +1,92 @@
+import gzip
+import random
+import subprocess
+import sys
+
+import requests
+from qiskit import QuantumCircuit
+from qiskit.qasm3 import dumps as qasm3_dumps
+
+from app.quantum import run_circuit
+
+BASE = "http://localhost:8000"
+ADMIN_HEADERS = {"x-admin-password": "classiq"}
+PHASES = ("queue_wait_s", "parse_s", "transpile_s", "simulate_s", "db_write_s", "total_s")
+
+
+def build_unique_qasm3() -> str:
+    qc = QuantumCircuit(2, 2)
+    qc.rz(random.random(), 0)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    return qasm3_dumps(qc)
+
+
+def test_run_circuit_reports_phase_stats():
+    qc = QuantumCircuit(2, 2)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    stats = {}
+    run_circuit(qc, shots=10, stats=stats)
+    assert stats["transpile_s"] >= 0 and stats["simulate_s"] > 0
+    run_circuit(qc, shots=10, stats=stats)
+    assert stats["transpile_cache_hit"] is True
+
+
+def test_completed_task_records_timings():
+    task_id = requests.post(f"{BASE}/tasks", json={"qc": build_unique_qasm3()}).json()["task_id"]
+    r = requests.get(f"{BASE}/tasks/{task_id}", params={"wait": 30}, timeout=40)
+    assert r.json()["status"] == "completed"
+    tasks = requests.get(f"{BASE}/admin/tasks", headers=ADMIN_HEADERS, params={"limit": 50}).json()["tasks"]
+    timings = next(t for t in tasks if t["id"] == task_id)["timings"]
+    for phase in PHASES:
+        assert timings[phase] >= 0
+    assert timings["total_s"] >= timings["simulate_s"]
+
+
+def test_metrics_endpoint_exposes_api_series():
+    requests.get(f"{BASE}/healthz")
+    r = requests.get(f"{BASE}/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    assert 'quantum_http_request_seconds_count{method="GET",route="/healthz",status="200"}' in r.text
+    assert "quantum_queue_depth" in r.text
+
+
+def _request_count(metrics: str, method: str, route: str, status: int) -> float:
+    series = f'quantum_http_request_seconds_count{{method="{method}",route="{route}",status="{status}"}} '
+    for line in metrics.splitlines():
+        if line.startswith(series):
+            return float(line[len(series):])
+    return 0.0
+
+
+def test_compressed_requests_keep_their_route_label():
+    before = requests.get(f"{BASE}/metrics").text
+    r = requests.post(
+        f"{BASE}/tasks/upload",
+        data=gzip.compress(build_unique_qasm3().encode()),
+        headers={"Content-Encoding": "gzip"},
+    )
+    assert r.status_code == 202, r.text
+    after = requests.get(f"{BASE}/metrics").text
+    assert _request_count(after, "POST", "/tasks/upload", 202) == _request_count(before, "POST", "/tasks/upload", 202) + 1
+    assert _request_count(after, "POST", "unmatched", 202) == _request_count(before, "POST", "unmatched", 202)
+
+
+def test_api_import_leaves_qiskit_unloaded():
+    # The API publishes tasks by name and renders in the process pool
+    code = (
+        "import sys, app.main; "
+        "print(sorted(m for m in ('qiskit', 'qiskit_aer', 'matplotlib', 'app.worker_tasks') if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "[]"
+
+
+def test_metrics_endpoint_exposes_startup_series():
+    r = requests.get(f"{BASE}/metrics")
+    assert 'quantum_startup_seconds{phase="ready",role="api"}' in r.text
+    assert 'quantum_startup_rss_bytes{role="api"}' in r.text
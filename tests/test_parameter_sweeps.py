@@ -0,0 +1,82 @@
+import math
+
+import pytest
+import requests
+
+from app.quantum import circuit_from_qasm3, compile_submission, compile_sweep, run_sweep
+from app.schemas import binding_columns
+
+BASE = "http://localhost:8000"
+
+TEMPLATE = (
+    "OPENQASM 3.0;\n"
+    "include \"stdgates.inc\";\n"
+    "input float[64] theta;\n"
+    "input float[64] phi;\n"
+    "qubit[2] q;\n"
+    "bit[2] c;\n"
+    "rx(theta) q[0];\n"
+    "ry(phi) q[1];\n"
+    "cx q[0], q[1];\n"
+    "c = measure q;\n"
+)
+
+
+def test_binding_columns_accepts_rows_or_columns():
+    rows = [{"theta": 0, "phi": 1}, {"theta": 2, "phi": 3}]
+    assert binding_columns(rows) == {"phi": [1.0, 3.0], "theta": [0.0, 2.0]}
+    assert binding_columns({"theta": [0, 2], "phi": [1, 3]}) == {"theta": [0.0, 2.0], "phi": [1.0, 3.0]}
+    with pytest.raises(ValueError):
+        binding_columns([{"theta": 0}, {"phi": 1}])
+    with pytest.raises(ValueError):
+        binding_columns({"theta": [0, 1], "phi": [0]})
+    with pytest.raises(ValueError):
+        binding_columns([])
+
+
+def test_compile_sweep_checks_parameters_and_scales_cost():
+    one = compile_sweep(TEMPLATE, {"theta": [0.0], "phi": [0.0]})
+    many = compile_sweep(TEMPLATE, {"theta": [0.0] * 10, "phi": [0.0] * 10})
+    assert many["cost_estimate"] == pytest.approx(10 * one["cost_estimate"])
+    assert many["parameter_binds"]["theta"] == [0.0] * 10
+    with pytest.raises(ValueError, match="phi, theta"):
+        compile_sweep(TEMPLATE, {"theta": [0.0]})
+    # A template is only accepted as a sweep
+    with pytest.raises(ValueError, match="unbound input parameters"):
+        compile_submission(TEMPLATE)
+
+
+def test_run_sweep_returns_counts_per_binding():
+    qc = circuit_from_qasm3(TEMPLATE)
+    results = run_sweep(
+        qc, {"theta": [0.0, math.pi, math.pi / 2], "phi": [0.0, 0.0, 0.0]},
+        method="statevector", shots=200, seed=7,
+    )
+    assert results[0] == {"00": 200}
+    assert results[1] == {"11": 200}
+    assert set(results[2]) == {"00", "11"} and sum(results[2].values()) == 200
+
+
+def test_submit_sweep_and_query_one_binding():
+    bindings = [{"theta": theta, "phi": 0.0} for theta in (0.0, math.pi, math.pi / 2)]
+    r = requests.post(f"{BASE}/tasks/sweep", json={"qc": TEMPLATE, "bindings": bindings, "shots": 100, "seed": 11})
+    assert r.status_code == 202, r.text
+    task_id = r.json()["task_id"]
+
+    g = requests.get(f"{BASE}/tasks/{task_id}", params={"wait": 30}, timeout=40)
+    body = g.json()
+    assert body["status"] == "completed"
+    assert body["results"][0] == {"00": 100}
+    assert body["results"][1] == {"11": 100}
+    assert len(body["results"]) == 3
+
+    q = requests.get(f"{BASE}/tasks/{task_id}/result", params={"binding": 1})
+    assert q.json()["result"] == {"11": 100}
+    assert requests.get(f"{BASE}/tasks/{task_id}/result").status_code == 400
+
+
+def test_sweep_rejects_mismatched_bindings():
+    r = requests.post(f"{BASE}/tasks/sweep", json={"qc": TEMPLATE, "bindings": [{"theta": 0.0}]})
+    assert r.status_code == 422
+    r = requests.post(f"{BASE}/tasks", json={"qc": TEMPLATE})
+    assert r.status_code == 422
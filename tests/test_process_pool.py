@@ -0,0 +1,57 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from app.config import settings
+from app.process_pool import run_in_process, shutdown_pool
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def test_timed_out_job_is_killed_and_the_pool_recovers():
+    async def scenario():
+        before = await run_in_process("os:getpid", timeout=60)
+        with pytest.raises(asyncio.TimeoutError):
+            await run_in_process("time:sleep", 60, timeout=0.5)
+        # The next job runs on a fresh pool instead of waiting behind the stuck one
+        after = await run_in_process("os:getpid", timeout=60)
+        return before, after
+
+    try:
+        before, after = asyncio.run(scenario())
+    finally:
+        shutdown_pool()
+    assert after != before
+    # The timed-out pool's children were killed, not left running
+    deadline = time.monotonic() + 10
+    while _alive(before) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert not _alive(before)
+
+
+def test_bulk_jobs_leave_a_worker_to_single_jobs(monkeypatch):
+    monkeypatch.setattr(settings, "cpu_pool_workers", 2)
+
+    async def scenario():
+        await run_in_process("os:getpid", timeout=60)
+        # More bulk work than the pool has workers
+        bulk = [asyncio.ensure_future(run_in_process("time:sleep", 3, timeout=60, bulk=True)) for _ in range(2)]
+        await asyncio.sleep(0.2)
+        started = time.perf_counter()
+        await run_in_process("os:getpid", timeout=60)
+        waited = time.perf_counter() - started
+        await asyncio.gather(*bulk)
+        return waited
+
+    try:
+        assert asyncio.run(scenario()) < 2
+    finally:
+        shutdown_pool()
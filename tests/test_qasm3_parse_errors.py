@@ -1,4 +1,3 @@
-import time
 import requests
 
 
@@ -45,58 +44,51 @@ UNKNOWN_GATE_QASM = (
 )
 
 
-def _submit(qasm: str) -> str:
+def _rejected_message(qasm: str) -> str:
+    # Circuits are parsed at submission: invalid ones never reach the queue
     r = requests.post(f"{BASE}/tasks", json={"qc": qasm})
-    assert r.status_code in (200, 202)
-    return r.json()["task_id"]
+    assert r.status_code == 422
+    return r.json()["detail"].lower()
 
 
-def _wait_for_terminal(task_id: str, timeout_s: float = 20.0) -> dict:
-    deadline = time.time() + timeout_s
-    while time.time() < deadline:
-        g = requests.get(f"{BASE}/tasks/{task_id}")
-        assert g.status_code in (200, 202, 404)
-        data = g.json()
-        if data.get("status") != "pending":
-            return data
-        time.sleep(0.5)
-    return {"status": "pending"}
+def test_qasm_size_mismatch_is_rejected():
+    msg = _rejected_message(SIZE_MISMATCH_QASM)
+    assert "register size" in msg or "parse" in msg
 
 
-def test_qasm_size_mismatch_returns_error():
-    tid = _submit(SIZE_MISMATCH_QASM)
-    data = _wait_for_terminal(tid)
-    assert data.get("status") == "error"
-    assert "register size" in data.get("message", "").lower() or "parse" in data.get("message", "").lower()
+def test_qasm_out_of_range_is_rejected():
+    msg = _rejected_message(OUT_OF_RANGE_QASM)
+    assert "out of range" in msg or "parse" in msg
 
 
-def test_qasm_out_of_range_returns_error():
-    tid = _submit(OUT_OF_RANGE_QASM)
-    data = _wait_for_terminal(tid)
-    assert data.get("status") == "error"
-    assert "out of range" in data.get("message", "").lower() or "parse" in data.get("message", "").lower()
-
-
-def test_qasm_invalid_constant_expression_returns_error():
-    tid = _submit(INVALID_CONST_QASM)
-    data = _wait_for_terminal(tid)
-    assert data.get("status") == "error"
+def test_qasm_invalid_constant_expression_is_rejected():
+    msg = _rejected_message(INVALID_CONST_QASM)
     # message may vary; look for divide/zero or parse
-    msg = data.get("message", "").lower()
     assert any(k in msg for k in ["divide", "division", "zero", "parse"])
 
 
-def test_qasm_unsupported_control_flow_returns_error():
-    tid = _submit(UNSUPPORTED_CONTROL_FLOW_QASM)
-    data = _wait_for_terminal(tid)
-    assert data.get("status") == "error"
-    assert "parse" in data.get("message", "").lower() or "unsupported" in data.get("message", "").lower()
+def test_qasm_unsupported_control_flow_is_rejected():
+    msg = _rejected_message(UNSUPPORTED_CONTROL_FLOW_QASM)
+    assert "parse" in msg or "unsupported" in msg
+
+
+def test_qasm_unknown_gate_is_rejected():
+    msg = _rejected_message(UNKNOWN_GATE_QASM)
+    assert "cu1" in msg or "unknown" in msg
+
 
+def test_invalid_circuit_in_batch_rejects_whole_batch():
+    good = "OPENQASM 3.0;\ninclude \"stdgates.inc\";\nqubit[1] q;\nbit[1] c;\nh q[0];\nc[0] = measure q[0];\n"
+    r = requests.post(f"{BASE}/tasks/batch", json={"tasks": [{"qc": good}, {"qc": UNKNOWN_GATE_QASM}]})
+    assert r.status_code == 422
+    assert "index 1" in r.json()["detail"]
 
-def test_qasm_unknown_gate_returns_error():
-    tid = _submit(UNKNOWN_GATE_QASM)
-    data = _wait_for_terminal(tid)
-    assert data.get("status") == "error"
-    assert "cu1" in data.get("message", "").lower() or "unknown" in data.get("message", "").lower()
 
+def test_invalid_circuit_late_in_batch_reports_its_index():
+    # Batches are compiled in several pool jobs; the index counts across them
+    good = "OPENQASM 3.0;\ninclude \"stdgates.inc\";\nqubit[1] q;\nbit[1] c;\nh q[0];\nc[0] = measure q[0];\n"
+    tasks = [{"qc": good}] * 6 + [{"qc": UNKNOWN_GATE_QASM}, {"qc": good}]
+    r = requests.post(f"{BASE}/tasks/batch", json={"tasks": tasks})
+    assert r.status_code == 422
+    assert "index 6" in r.json()["detail"]
 
@@ -1,5 +1,6 @@
+import pytest
 from qiskit import QuantumCircuit
-from app.quantum import circuit_to_qasm3, circuit_from_qasm3
+from app.quantum import circuit_to_qasm3, circuit_from_qasm3, compile_submission, load_stored_circuit
 
 
 def create_bell() -> QuantumCircuit:
@@ -21,3 +22,17 @@ def test_qasm3_roundtrip_structure():
 
     # Basic instruction sequence length matches
     assert len(restored.data) == len(original.data)
+
+
+def test_compile_submission_roundtrips_through_qpy():
+    original = create_bell()
+    restored = load_stored_circuit(compile_submission(circuit_to_qasm3(original))["qc_qpy"])
+
+    assert restored.num_qubits == original.num_qubits
+    assert restored.num_clbits == original.num_clbits
+    assert len(restored.data) == len(original.data)
+
+
+def test_compile_submission_rejects_invalid_qasm():
+    with pytest.raises(ValueError):
+        compile_submission("OPENQASM 3.0;\nqubit q;\ncu1(pi/2) q, q;\n")
@@ -0,0 +1,59 @@
+import random
+
+import requests
+from qiskit import QuantumCircuit
+from qiskit.qasm3 import dumps as qasm3_dumps
+
+from app.celery_app import QUEUE_BATCH, QUEUE_HEAVY, QUEUE_INTERACTIVE, queue_for_cost
+from app.quantum import compile_submission
+
+BASE = "http://localhost:8000"
+ADMIN_HEADERS = {"x-admin-password": "classiq"}
+
+LOOP_QASM = (
+    "OPENQASM 3.0;\n"
+    "include \"stdgates.inc\";\n"
+    "qubit[2] q;\n"
+    "bit[2] c;\n"
+    "for int i in [0:9999] {\n"
+    "    h q[0];\n"
+    "    t q[0];\n"
+    "    cx q[0], q[1];\n"
+    "}\n"
+    "c[0] = measure q[0];\n"
+    "c[1] = measure q[1];\n"
+)
+
+
+def bell_qasm3() -> str:
+    qc = QuantumCircuit(2, 2)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    return qasm3_dumps(qc)
+
+
+def test_small_circuit_is_interactive():
+    assert queue_for_cost(compile_submission(bell_qasm3())["cost_estimate"]) == QUEUE_INTERACTIVE
+
+
+def test_shots_raise_the_estimate():
+    low = compile_submission(bell_qasm3(), shots=100)["cost_estimate"]
+    high = compile_submission(bell_qasm3(), shots=1_000_000)["cost_estimate"]
+    assert high > low
+    assert queue_for_cost(high) == QUEUE_BATCH
+
+
+def test_long_loop_is_heavy():
+    # Loop bodies are unrolled and dynamic circuits re-run per shot
+    assert queue_for_cost(compile_submission(LOOP_QASM)["cost_estimate"]) == QUEUE_HEAVY
+
+
+def test_estimate_and_queue_are_recorded():
+    # A fresh seed so the result cache does not hand back a task from an earlier run
+    seed = random.randrange(2 ** 31)
+    task_id = requests.post(f"{BASE}/tasks", json={"qc": LOOP_QASM, "seed": seed}).json()["task_id"]
+    tasks = requests.get(f"{BASE}/admin/tasks", headers=ADMIN_HEADERS, params={"limit": 50}).json()["tasks"]
+    row = next(t for t in tasks if t["id"] == task_id)
+    assert row["queue"] == QUEUE_HEAVY
+    assert row["cost_estimate"] > 0
@@ -0,0 +1,62 @@
+import random
+import threading
+import time
+
+import requests
+from qiskit import QuantumCircuit
+from qiskit.qasm3 import dumps as qasm3_dumps
+
+BASE = "http://localhost:8000"
+
+
+def build_unique_qasm3() -> str:
+    # Random angle keeps the circuit unseen by the cache across test runs
+    qc = QuantumCircuit(2, 2)
+    qc.rz(random.random(), 0)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    return qasm3_dumps(qc)
+
+
+def _wait_completed(task_id: str, timeout_s: float = 60.0) -> dict:
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        data = requests.get(f"{BASE}/tasks/{task_id}").json()
+        if data.get("status") == "completed":
+            return data
+        time.sleep(0.5)
+    raise AssertionError("Task did not complete in time")
+
+
+def test_resubmission_returns_cached_task():
+    qasm = build_unique_qasm3()
+    first = requests.post(f"{BASE}/tasks", json={"qc": qasm}).json()
+    assert first["cached"] is False
+    done = _wait_completed(first["task_id"])
+
+    # Cosmetic whitespace/comment changes hash to the same circuit
+    again = requests.post(f"{BASE}/tasks", json={"qc": "// resubmit\n" + qasm + "\n\n"}).json()
+    assert again["cached"] is True
+    assert again["task_id"] == first["task_id"]
+    assert requests.get(f"{BASE}/tasks/{again['task_id']}").json()["result"] == done["result"]
+
+
+def test_concurrent_identical_submissions_share_one_task():
+    qasm = build_unique_qasm3()
+    task_ids: list[str] = []
+
+    def worker():
+        r = requests.post(f"{BASE}/tasks", json={"qc": qasm})
+        assert r.status_code == 202
+        task_ids.append(r.json()["task_id"])
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(task_ids) == 6
+    assert len(set(task_ids)) == 1
+    _wait_completed(task_ids[0])
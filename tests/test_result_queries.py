@@ -0,0 +1,103 @@
+import json
+import random
+
+import requests
+from qiskit import QuantumCircuit
+from qiskit.qasm3 import dumps as qasm3_dumps
+from qiskit.result import marginal_counts
+
+from app.results import CountsArray, split_for_storage
+
+BASE = "http://localhost:8000"
+
+COUNTS = {"0101": 5, "1100": 3, "0000": 10, "1111": 1}
+
+
+def test_binary_roundtrip():
+    array = CountsArray.from_dict(COUNTS)
+    assert CountsArray.from_bytes(array.to_bytes()).to_dict() == COUNTS
+    assert CountsArray.from_bytes(array.to_bytes(compress=True)).to_dict() == COUNTS
+
+
+def test_multi_register_keys_roundtrip():
+    counts = {"01 1": 4, "11 0": 2}
+    assert CountsArray.from_bytes(CountsArray.from_dict(counts).to_bytes()).to_dict() == counts
+
+
+def test_top_k_is_sorted_by_count():
+    assert list(CountsArray.from_dict(COUNTS).top(2).to_dict().items()) == [("0000", 10), ("0101", 5)]
+
+
+def test_marginal_matches_qiskit():
+    assert CountsArray.from_dict(COUNTS).marginal([0, 3]).to_dict() == marginal_counts(COUNTS, [0, 3])
+
+
+def test_large_results_are_split():
+    preview, blob = split_for_storage(COUNTS, inline_max=2)
+    assert preview == {"0000": 10, "0101": 5}
+    assert CountsArray.from_bytes(blob).to_dict() == COUNTS
+    assert split_for_storage(COUNTS, inline_max=10) == (COUNTS, None)
+
+
+def _completed_task(num_qubits: int = 3) -> str:
+    qc = QuantumCircuit(num_qubits, num_qubits)
+    qc.rz(random.random(), 0)
+    qc.h(range(num_qubits))
+    qc.measure(range(num_qubits), range(num_qubits))
+    task_id = requests.post(f"{BASE}/tasks", json={"qc": qasm3_dumps(qc), "shots": 2000}).json()["task_id"]
+    assert requests.get(f"{BASE}/tasks/{task_id}", params={"wait": 30}, timeout=40).json()["status"] == "completed"
+    return task_id
+
+
+def test_result_query_endpoint():
+    task_id = _completed_task()
+    full = requests.get(f"{BASE}/tasks/{task_id}/result").json()
+    assert full["shots"] == 2000
+    assert full["num_outcomes"] == len(full["result"])
+
+    top = requests.get(f"{BASE}/tasks/{task_id}/result", params={"top": 2}).json()
+    assert len(top["result"]) == 2
+
+    marginal = requests.get(f"{BASE}/tasks/{task_id}/result", params={"marginal": "0,2"}).json()
+    assert set(marginal["result"]) <= {"00", "01", "10", "11"}
+    assert sum(marginal["result"].values()) == 2000
+
+    binary = requests.get(f"{BASE}/tasks/{task_id}/result", params={"format": "binary"})
+    assert binary.headers["content-type"] == "application/octet-stream"
+    assert CountsArray.from_bytes(binary.content).to_dict() == full["result"]
+
+
+def test_result_query_validation():
+    task_id = _completed_task()
+    assert requests.get(f"{BASE}/tasks/{task_id}/result", params={"marginal": "7"}).status_code == 400
+    assert requests.get(f"{BASE}/tasks/does-not-exist/result").status_code == 404
+
+
+def _uniform_qasm3(num_qubits: int) -> str:
+    qc = QuantumCircuit(num_qubits, num_qubits)
+    qc.rz(random.random(), 0)
+    qc.h(range(num_qubits))
+    qc.measure(range(num_qubits), range(num_qubits))
+    return qasm3_dumps(qc)
+
+
+def test_batch_and_events_flag_truncated_results():
+    # 4096 shots over 4096 equally likely outcomes leave far more than RESULT_INLINE_MAX_OUTCOMES
+    tasks = [{"qc": _uniform_qasm3(12), "shots": 4096}, {"qc": _uniform_qasm3(2), "shots": 100}]
+    r = requests.post(f"{BASE}/tasks/batch", json={"tasks": tasks})
+    assert r.status_code == 202, r.text
+    batch_id = r.json()["batch_id"]
+    large, small = r.json()["task_ids"]
+    for task_id in (large, small):
+        assert requests.get(f"{BASE}/tasks/{task_id}", params={"wait": 30}, timeout=40).json()["status"] == "completed"
+
+    rows = requests.get(f"{BASE}/tasks/batch/{batch_id}").json()["tasks"]
+    assert rows[0]["truncated"] is True
+    assert rows[0]["result"] != requests.get(f"{BASE}/tasks/{large}/result").json()["result"]
+    assert rows[1]["truncated"] is False
+    assert requests.get(f"{BASE}/tasks/batch/{batch_id}", params={"include_results": False}).json()["tasks"][0]["truncated"] is None
+
+    with requests.get(f"{BASE}/tasks/{large}/events", stream=True, timeout=10) as stream:
+        line = next(line for line in stream.iter_lines() if line.startswith(b"data:"))
+    event = json.loads(line[len(b"data:"):])
+    assert event["status"] == "completed" and event["truncated"] is True
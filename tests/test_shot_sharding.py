@@ -0,0 +1,74 @@
+import random
+
+import requests
+from qiskit import QuantumCircuit
+from qiskit.qasm3 import dumps as qasm3_dumps
+
+from app.config import settings
+from app.quantum import circuit_from_qasm3, run_circuit
+from app.worker_tasks import shard_plan
+
+BASE = "http://localhost:8000"
+
+
+def build_unique_qasm3() -> str:
+    qc = QuantumCircuit(2, 2)
+    qc.rz(random.random(), 0)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    return qasm3_dumps(qc)
+
+
+def test_small_jobs_are_not_sharded():
+    assert shard_plan(settings.shots_per_shard, None) == [(settings.shots_per_shard, None)]
+
+
+def test_shard_plan_covers_all_shots():
+    shots = settings.shots_per_shard * 3 + 7
+    plan = shard_plan(shots, 1234)
+    assert len(plan) == 4
+    assert sum(s for s, _ in plan) == shots
+    assert len({seed for _, seed in plan}) == 4
+
+
+def test_shard_count_is_capped():
+    plan = shard_plan(settings.shots_per_shard * settings.max_shards * 10, None)
+    assert len(plan) == settings.max_shards
+
+
+def test_shard_seeds_are_reproducible():
+    shots = settings.shots_per_shard * 2 + 1
+    assert shard_plan(shots, 99) == shard_plan(shots, 99)
+    assert shard_plan(shots, 99) != shard_plan(shots, 100)
+
+
+def _run(payload: dict) -> dict:
+    r = requests.post(f"{BASE}/tasks", json=payload)
+    assert r.status_code == 202
+    g = requests.get(f"{BASE}/tasks/{r.json()['task_id']}", params={"wait": 60}, timeout=70)
+    data = g.json()
+    assert data["status"] == "completed"
+    return data["result"]
+
+
+def test_per_task_shots():
+    result = _run({"qc": build_unique_qasm3(), "shots": 300})
+    assert sum(result.values()) == 300
+
+
+def test_seeded_runs_are_reproducible():
+    qc = circuit_from_qasm3(build_unique_qasm3())
+    first = run_circuit(qc, shots=2000, seed=7)
+    assert run_circuit(qc, shots=2000, seed=7) == first
+    assert sum(first.values()) == 2000
+
+
+def test_high_shot_task_is_sharded_and_merged():
+    shots = settings.shots_per_shard * 2 + 1
+    result = _run({"qc": build_unique_qasm3(), "shots": shots, "seed": 3})
+    assert sum(result.values()) == shots
+
+
+def test_shots_are_validated():
+    assert requests.post(f"{BASE}/tasks", json={"qc": build_unique_qasm3(), "shots": 0}).status_code == 422
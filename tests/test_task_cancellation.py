@@ -0,0 +1,154 @@
+import random
+import time
+from types import SimpleNamespace
+
+import pytest
+import requests
+from celery.exceptions import SoftTimeLimitExceeded
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import worker_tasks
+from app.celery_app import QUEUE_HEAVY, QUEUE_INTERACTIVE, queue_for_cost, time_limits
+from app.db import Base, Task, TaskStatus
+from app.quantum import estimate_memory_mb, select_method
+from app.worker_tasks import _will_retry
+
+BASE = "http://localhost:8000"
+
+# Mid-circuit resets make Aer re-run the whole loop for every shot
+SLOW_QASM = (
+    "OPENQASM 3.0;\n"
+    "include \"stdgates.inc\";\n"
+    "qubit[2] q;\n"
+    "bit[2] c;\n"
+    "for int i in [0:9999] {\n"
+    "    h q[0];\n"
+    "    cx q[0], q[1];\n"
+    "    reset q[1];\n"
+    "}\n"
+    "c[0] = measure q[0];\n"
+    "c[1] = measure q[1];\n"
+)
+
+BELL_QASM = (
+    "OPENQASM 3.0;\n"
+    "include \"stdgates.inc\";\n"
+    "qubit[2] q;\n"
+    "bit[2] c;\n"
+    "h q[0];\n"
+    "cx q[0], q[1];\n"
+    "c[0] = measure q[0];\n"
+    "c[1] = measure q[1];\n"
+)
+
+
+def _analysis(num_qubits: int, max_bond_log2: int, clifford: bool = False) -> dict:
+    return {
+        "num_qubits": num_qubits,
+        "num_ops": 100,
+        "num_multi_qubit_ops": 50,
+        "clifford": clifford,
+        "dynamic": False,
+        "depth": 50,
+        "max_bond_log2": max_bond_log2,
+    }
+
+
+def test_statevector_memory_estimate():
+    assert estimate_memory_mb(_analysis(28, 14), "statevector") == 4096
+    assert estimate_memory_mb(_analysis(1000, 2, clifford=True), "stabilizer") < 1
+
+
+def test_circuits_over_every_memory_limit_are_rejected():
+    with pytest.raises(ValueError, match="memory"):
+        select_method(_analysis(60, 30))
+
+
+def test_large_memory_routes_to_heavy_and_limits_follow_the_tier():
+    assert queue_for_cost(1.0, memory_mb=1.0) == QUEUE_INTERACTIVE
+    assert queue_for_cost(1.0, memory_mb=1e6) == QUEUE_HEAVY
+    limits = time_limits(QUEUE_INTERACTIVE)
+    assert limits["soft_time_limit"] < limits["time_limit"]
+    assert time_limits(QUEUE_HEAVY)["time_limit"] > limits["time_limit"]
+
+
+def test_cancel_pending_or_running_task():
+    r = requests.post(f"{BASE}/tasks", json={"qc": SLOW_QASM, "shots": 5000})
+    assert r.status_code == 202
+    task_id = r.json()["task_id"]
+
+    d = requests.delete(f"{BASE}/tasks/{task_id}")
+    assert d.status_code == 200
+    assert d.json()["status"] == "cancelled"
+    g = requests.get(f"{BASE}/tasks/{task_id}")
+    assert g.json()["status"] == "cancelled"
+
+    # Idempotent, and the status sticks once the worker notices
+    assert requests.delete(f"{BASE}/tasks/{task_id}").status_code == 200
+    time.sleep(2)
+    assert requests.get(f"{BASE}/tasks/{task_id}").json()["status"] == "cancelled"
+
+
+def test_shared_task_is_cancelled_by_its_last_submitter():
+    payload = {"qc": SLOW_QASM, "shots": 5000, "seed": random.randrange(2 ** 31)}
+    task_id = requests.post(f"{BASE}/tasks", json=payload).json()["task_id"]
+    # An identical submission attaches to the task in flight
+    attached = requests.post(f"{BASE}/tasks", json=payload).json()
+    assert attached["task_id"] == task_id and attached["cached"] is True
+
+    d = requests.delete(f"{BASE}/tasks/{task_id}")
+    assert d.status_code == 200
+    assert d.json()["status"] in ("pending", "running")
+    assert requests.get(f"{BASE}/tasks/{task_id}").status_code == 202
+
+    d = requests.delete(f"{BASE}/tasks/{task_id}")
+    assert d.json()["status"] == "cancelled"
+    assert requests.get(f"{BASE}/tasks/{task_id}").json()["status"] == "cancelled"
+
+
+def test_cancel_finished_or_unknown_task():
+    r = requests.post(f"{BASE}/tasks", json={"qc": BELL_QASM, "seed": 4242})
+    task_id = r.json()["task_id"]
+    g = requests.get(f"{BASE}/tasks/{task_id}", params={"wait": 30}, timeout=40)
+    assert g.json()["status"] == "completed"
+    assert requests.delete(f"{BASE}/tasks/{task_id}").status_code == 409
+    assert requests.delete(f"{BASE}/tasks/does-not-exist").status_code == 404
+
+
+def attempt(retries: int) -> SimpleNamespace:
+    return SimpleNamespace(request=SimpleNamespace(retries=retries))
+
+
+def test_only_the_last_attempt_fails_the_task():
+    db_error = OperationalError("UPDATE tasks", {}, Exception("connection reset"))
+    assert _will_retry(attempt(0), db_error)
+    assert _will_retry(attempt(2), db_error)
+    assert not _will_retry(attempt(3), db_error)
+    # Failures that repeat on every attempt are never retried
+    for exc in (ValueError("bad circuit"), RuntimeError("simulator"), SoftTimeLimitExceeded()):
+        assert not _will_retry(attempt(0), exc)
+
+
+def test_redelivered_completed_task_is_not_run_again(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tasks.db'}")
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    with session_factory() as session:
+        session.add(Task(id="done", status=TaskStatus.COMPLETED, qc_qasm3=BELL_QASM, result_json={"00": 1024}))
+        session.commit()
+
+    events = []
+    monkeypatch.setattr(worker_tasks, "SessionLocal", session_factory)
+    monkeypatch.setattr(worker_tasks, "record_transition", lambda *args, **kwargs: events.append(args))
+    monkeypatch.setattr(worker_tasks, "publish_task_event", lambda *args, **kwargs: events.append(args))
+
+    # What a broker redelivery (acks_late) or a retry after the result commit looks like
+    result = worker_tasks.execute_quantum_task.apply(args=["done"])
+    assert result.get() == {"task_id": "done", "skipped": TaskStatus.COMPLETED}
+    assert events == []
+    with session_factory() as session:
+        task = session.get(Task, "done")
+        assert task.status == TaskStatus.COMPLETED
+        assert task.result_json == {"00": 1024}
@@ -0,0 +1,54 @@
+import json
+import uuid
+
+import requests
+from qiskit import QuantumCircuit
+from qiskit.qasm3 import dumps as qasm3_dumps
+
+BASE = "http://localhost:8000"
+
+
+def build_qasm3(angle: float) -> str:
+    qc = QuantumCircuit(2, 2)
+    qc.rz(angle, 0)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    return qasm3_dumps(qc)
+
+
+def _read_events(url: str, timeout_s: float = 60.0) -> list[dict]:
+    events = []
+    with requests.get(url, stream=True, timeout=timeout_s) as r:
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("text/event-stream")
+        for line in r.iter_lines(decode_unicode=True):
+            if line and line.startswith("data: "):
+                events.append(json.loads(line[len("data: "):]))
+    return events
+
+
+def test_event_stream_ends_with_result():
+    task_id = requests.post(f"{BASE}/tasks", json={"qc": build_qasm3(0.11)}).json()["task_id"]
+    events = _read_events(f"{BASE}/tasks/{task_id}/events")
+    assert events, "expected at least one event"
+    assert all(e["task_id"] == task_id for e in events)
+    final = events[-1]
+    assert final["status"] == "completed"
+    assert set(final["result"].keys()).issubset({"00", "11"})
+
+
+def test_multiplexed_stream_follows_many_tasks():
+    task_ids = [
+        requests.post(f"{BASE}/tasks", json={"qc": build_qasm3(0.2 + i / 100)}).json()["task_id"]
+        for i in range(3)
+    ]
+    bogus = str(uuid.uuid4())
+    events = _read_events(f"{BASE}/tasks/events?ids={','.join(task_ids + [bogus])}")
+
+    final = {}
+    for e in events:
+        final[e["task_id"]] = e
+    assert final[bogus]["status"] == "error"
+    for task_id in task_ids:
+        assert final[task_id]["status"] == "completed"
@@ -0,0 +1,27 @@
+from qiskit import QuantumCircuit
+
+from app.quantum import get_simulator, run_circuit, transpile_cache_stats
+
+
+def create_bell() -> QuantumCircuit:
+    qc = QuantumCircuit(2, 2)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    return qc
+
+
+def test_simulator_is_reused():
+    assert get_simulator() is get_simulator()
+
+
+def test_repeated_runs_hit_transpile_cache():
+    qc = create_bell()
+    before = transpile_cache_stats()
+    first = run_circuit(qc, circuit_key="bell-cache-test")
+    second = run_circuit(qc, circuit_key="bell-cache-test")
+    after = transpile_cache_stats()
+
+    assert after["misses"] == before["misses"] + 1
+    assert after["hits"] == before["hits"] + 1
+    assert set(first) <= {"00", "11"} and set(second) <= {"00", "11"}
@@ -0,0 +1,59 @@
+import random
+
+import requests
+from qiskit import QuantumCircuit
+from qiskit.qasm3 import dumps as qasm3_dumps
+
+from app.quantum import render_circuit
+
+BASE = "http://localhost:8000"
+
+
+def build_unique_qasm3(num_qubits: int = 2) -> str:
+    qc = QuantumCircuit(num_qubits, num_qubits)
+    qc.rz(random.random(), 0)
+    qc.h(0)
+    for i in range(num_qubits - 1):
+        qc.cx(i, i + 1)
+    qc.measure(range(num_qubits), range(num_qubits))
+    return qasm3_dumps(qc)
+
+
+def test_render_falls_back_to_text_for_wide_circuits():
+    fmt, data = render_circuit(build_unique_qasm3(4), "png", max_qubits=2, max_depth=100)
+    assert fmt == "txt"
+    assert b"q_3" in data
+
+
+def test_render_svg_within_limits():
+    fmt, data = render_circuit(build_unique_qasm3(2), "svg", max_qubits=8, max_depth=100)
+    assert fmt == "svg"
+    assert b"<svg" in data
+
+
+def test_viz_etag_and_not_modified():
+    task_id = requests.post(f"{BASE}/tasks", json={"qc": build_unique_qasm3()}).json()["task_id"]
+    r = requests.get(f"{BASE}/tasks/{task_id}/viz.png", timeout=60)
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "image/png"
+    assert "max-age" in r.headers["cache-control"]
+    etag = r.headers["etag"]
+
+    r2 = requests.get(f"{BASE}/tasks/{task_id}/viz.png", headers={"If-None-Match": etag})
+    assert r2.status_code == 304
+    assert r2.content == b""
+
+
+def test_viz_svg_and_text_formats():
+    task_id = requests.post(f"{BASE}/tasks", json={"qc": build_unique_qasm3()}).json()["task_id"]
+    svg = requests.get(f"{BASE}/tasks/{task_id}/viz.svg", timeout=60)
+    assert svg.status_code == 200
+    assert svg.headers["content-type"].startswith("image/svg+xml")
+    txt = requests.get(f"{BASE}/tasks/{task_id}/viz.txt", timeout=60)
+    assert txt.status_code == 200
+    assert "q_0" in txt.text
+
+
+def test_viz_unknown_format_and_task():
+    assert requests.get(f"{BASE}/tasks/does-not-exist/viz.gif").status_code == 422
+    assert requests.get(f"{BASE}/tasks/does-not-exist/viz.png").status_code == 404